@@ -0,0 +1,6 @@
+# benchmarks/__init__.py
+"""
+Capacity benchmarks: synthetic flight data, a stub LLM with configurable latency,
+an in-process load test of /transcript and micro-benchmarks of the hot helpers.
+Run with `python -m benchmarks --help`.
+"""
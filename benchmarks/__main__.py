@@ -0,0 +1,160 @@
+# benchmarks/__main__.py
+"""
+Runs the benchmark suite and writes the results as JSON.
+
+    python -m benchmarks --rows 100000 --requests 500 --concurrency 16 --llm-latency 0.3
+    python -m benchmarks --rows 1000000 --output after.json --compare before.json
+
+Everything happens in a scratch working directory (the app opens ./flight.db and
+loads ./flight-price.json), so the repository's own database is never touched.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, previous: dict) -> None:
+    """Prints p50/p95/p99 side by side for every latency summary both runs have."""
+    def summaries(result, prefix=""):
+        for key, value in result.items():
+            if isinstance(value, dict) and "p50_ms" in value:
+                yield prefix + key, value
+            elif isinstance(value, dict):
+                yield from summaries(value, f"{prefix}{key}.")
+
+    before = dict(summaries(previous))
+    print(f"{'metric':48} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18}")
+    for name, after in summaries(current):
+        if name not in before:
+            continue
+        cells = [f"{before[name][k]:>8.2f} -> {after[k]:<8.2f}" for k in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"{name:48} " + " ".join(cells))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load and micro benchmarks against synthetic data.")
+    parser.add_argument("--rows", type=int, default=50_000, help="Synthetic flights to generate (10k-10M).")
+    parser.add_argument("--cities", type=int, default=30, help="Cities; every ordered pair is a route.")
+    parser.add_argument("--requests", type=int, default=500, help="/transcript requests in the load test.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients in the load test.")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds the stub LLM takes per call.")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="+/- seconds of deterministic jitter.")
+    parser.add_argument("--no-index", action="store_true", help="Serve the load test from SQLite (FLIGHT_INDEX=0).")
+    parser.add_argument("--micro-queries", type=int, default=5000, help="Queries for the classifier benchmark.")
+    parser.add_argument("--micro-words", type=int, default=10000, help="Near-miss words for the keyword matcher benchmark.")
+    parser.add_argument("--leg-cases", type=int, default=2000, help="Lookups for the get_flights_by_params benchmark.")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--workdir", help="Scratch directory to use (default: a new temp directory).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    previous_path = os.path.abspath(args.compare) if args.compare else None
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="flight-bench-"))
+    os.makedirs(workdir, exist_ok=True)
+
+    # Spans stay local, and the app's per-request prints don't drown the report
+    os.environ.setdefault("LOGFIRE_SEND_TO_LOGFIRE", "false")
+    os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+    if args.no_index:
+        os.environ["FLIGHT_INDEX"] = "0"
+
+    from benchmarks import synthetic
+
+    cities = synthetic.make_cities(args.cities, seed=args.seed)
+    json_path = os.path.join(workdir, "flight-price.json")
+    print(f"Generating {args.rows} flights over {len(cities) * (len(cities) - 1)} routes in {workdir}")
+    started = time.perf_counter()
+    synthetic.write_flight_json(json_path, args.rows, cities, seed=args.seed)
+    generate_seconds = time.perf_counter() - started
+
+    # The app resolves ./flight.db and ./flight-price.json against the working directory
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(workdir)
+    import crud
+    import main as app_main
+    import models
+    import query_classifier
+    from benchmarks import micro
+    from database import SessionLocal, engine
+    from benchmarks.load import run_load
+    from benchmarks.stub_llm import StubIntentChain
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "workdir")},
+        "generate_seconds": round(generate_seconds, 3),
+    }
+
+    if not args.skip_load:
+        stub = StubIntentChain(cities, latency=args.llm_latency, jitter=args.llm_jitter)
+        app_main.intent_extraction_chain = stub
+        queries = synthetic.make_queries(cities, args.requests, seed=args.seed + 1)
+        print(f"Load test: {args.requests} requests, {args.concurrency} clients")
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            results["load"] = asyncio.run(run_load(app_main, queries, args.concurrency))
+
+    if not args.skip_micro:
+        print("Micro benchmarks: populate_db_from_json, get_flights_by_params, is_flight_related_query, KeywordMatcher")
+        queries = synthetic.make_queries(cities, args.micro_queries, other_ratio=0.3, seed=args.seed + 2)
+        queries = synthetic.add_typos(queries, seed=args.seed + 3)
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            populate = micro.bench_populate(json_path, os.path.join(workdir, "populate.db"), args.rows)
+            # Tables are created by the app's startup, which --skip-load never runs
+            models.Base.metadata.create_all(bind=engine)
+            db = SessionLocal()
+            try:
+                if db.query(models.Flight.id).first() is None:
+                    crud.populate_db_from_json(db, json_path)
+                legs = micro.bench_leg_lookup(db, args.leg_cases)
+            finally:
+                db.close()
+            classifier = micro.bench_classifier(queries)
+            matcher = micro.bench_keyword_matcher(synthetic.perturbed_words(
+                query_classifier.FLIGHT_KEYWORDS | query_classifier.TIME_KEYWORDS, args.micro_words, seed=args.seed + 4
+            ))
+        results["micro"] = {
+            "populate_db_from_json": populate,
+            "get_flights_by_params": legs,
+            "is_flight_related_query": classifier,
+            "keyword_matcher": matcher,
+        }
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+    if previous_path:
+        with open(previous_path, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
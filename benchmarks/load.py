@@ -0,0 +1,125 @@
+# benchmarks/load.py
+
+import asyncio
+import functools
+import inspect
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import httpx
+import numpy as np
+
+
+def summarize(samples: list[float]) -> dict:
+    """Count, mean and tail latencies in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ms = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+class StageTimer:
+    """Records wall time per pipeline stage by wrapping the functions that implement them."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, fn, stage: str):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - started)
+        else:
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - started)
+        return timed
+
+    @contextmanager
+    def patch(self, targets: list[tuple[object, str, str]]):
+        """Temporarily replaces each (owner, attribute) with a timed wrapper recorded as `stage`."""
+        originals = [(owner, attr, getattr(owner, attr)) for owner, attr, _ in targets]
+        try:
+            for owner, attr, stage in targets:
+                setattr(owner, attr, self.wrap(getattr(owner, attr), stage))
+            yield self
+        finally:
+            for owner, attr, original in originals:
+                setattr(owner, attr, original)
+
+    def report(self) -> dict:
+        return {stage: summarize(samples) for stage, samples in self.samples.items()}
+
+
+async def run_load(main, queries: list[str], concurrency: int, warmup: int = 10) -> dict:
+    """
+    Starts the app in-process (running its lifespan), then sends every query to /transcript
+    from `concurrency` concurrent clients. Returns startup time, throughput, per-stage
+    latency summaries and the mix of response types.
+    """
+    timer = StageTimer()
+    started = time.perf_counter()
+    async with main.lifespan(main.app):
+        startup_seconds = time.perf_counter() - started
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for query in queries[:warmup]:
+                await client.post("/transcript", json={"text": f"warmup {query}"})
+
+            pending = iter(queries)
+            query_types: Counter = Counter()
+            http_errors = 0
+
+            async def client_loop():
+                nonlocal http_errors
+                for query in pending:
+                    sent = time.perf_counter()
+                    response = await client.post("/transcript", json={"text": query})
+                    timer.record("request", time.perf_counter() - sent)
+                    if response.status_code != 200:
+                        http_errors += 1
+                    else:
+                        query_types[response.json()["query_type"]] += 1
+
+            targets = [
+                (main, "is_flight_related_query", "classify"),
+                (main, "lookup_intent", "cache_and_fast_path"),
+                (main, "extract_intent", "intent"),
+                (main.intent_extraction_chain, "ainvoke", "llm"),
+                (main, "search_flights", "search"),
+            ]
+            with timer.patch(targets):
+                run_started = time.perf_counter()
+                await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+                elapsed = time.perf_counter() - run_started
+
+    return {
+        "startup_seconds": round(startup_seconds, 3),
+        "requests": len(queries),
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(queries) / elapsed, 2) if elapsed else None,
+        "http_errors": http_errors,
+        "query_types": dict(query_types),
+        "stages": timer.report(),
+    }
@@ -0,0 +1,137 @@
+# benchmarks/micro.py
+
+import random
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+
+import crud
+import models
+import query_classifier
+from benchmarks.load import summarize
+from flight_index import FlightIndex
+from query_classifier import (
+    FLIGHT_KEYWORD_MATCHER, FLIGHT_KEYWORDS, PRICE_CONTEXT_MATCHER, TIME_KEYWORDS, get_fuzzy_matches,
+)
+from tests.classifier_reference import reference_is_flight_related_query
+
+
+def _time_each(fn, inputs) -> tuple[list, list[float]]:
+    results, samples = [], []
+    for item in inputs:
+        started = time.perf_counter()
+        results.append(fn(item))
+        samples.append(time.perf_counter() - started)
+    return results, samples
+
+
+def bench_classifier(queries: list[str], reference_sample: int = 2000) -> dict:
+    """
+    is_flight_related_query cold (empty match cache) and warm, against the original
+    get_fuzzy_matches implementation on a sample. Any disagreement is reported.
+    """
+    FLIGHT_KEYWORD_MATCHER.matches.cache_clear()
+    PRICE_CONTEXT_MATCHER.matches.cache_clear()
+    cold, cold_samples = _time_each(query_classifier.is_flight_related_query, queries)
+    _, warm_samples = _time_each(query_classifier.is_flight_related_query, queries)
+
+    sample = queries[:reference_sample]
+    expected, reference_samples = _time_each(reference_is_flight_related_query, sample)
+    mismatches = [q for q, got, want in zip(sample, cold, expected) if got != want]
+    return {
+        "queries": len(queries),
+        "cold": summarize(cold_samples),
+        "warm": summarize(warm_samples),
+        "reference": summarize(reference_samples),
+        "parity_checked": len(sample),
+        "parity_mismatches": len(mismatches),
+        "mismatch_examples": mismatches[:5],
+    }
+
+
+def bench_keyword_matcher(words: list[str]) -> dict:
+    """
+    KeywordMatcher against get_fuzzy_matches word by word, uncached, at the classifier's
+    two thresholds. Any disagreement is reported.
+    """
+    matcher = query_classifier.KeywordMatcher(FLIGHT_KEYWORDS | TIME_KEYWORDS)
+    cases = [(word, threshold) for word in words for threshold in (0.75, 0.8)]
+    got, matcher_samples = _time_each(lambda case: matcher._matches(*case), cases)
+    expected, reference_samples = _time_each(
+        lambda case: get_fuzzy_matches(case[0], FLIGHT_KEYWORDS | TIME_KEYWORDS, case[1]), cases
+    )
+    mismatches = [case for case, a, b in zip(cases, got, expected) if a != b]
+    return {
+        "cases": len(cases),
+        "matcher": summarize(matcher_samples),
+        "reference": summarize(reference_samples),
+        "parity_mismatches": len(mismatches),
+        "mismatch_examples": mismatches[:5],
+    }
+
+
+def _leg_cases(db: Session, count: int, seed: int = 3) -> list[tuple]:
+    rng = random.Random(seed)
+    routes = db.query(models.Flight.origin, models.Flight.destination).distinct().all()
+    first_day, last_day = db.query(func.min(models.Flight.date), func.max(models.Flight.date)).one()
+    span = max((last_day - first_day).days, 1)
+    cases = []
+    for _ in range(count):
+        origin, destination = rng.choice(routes)
+        start = first_day + timedelta(days=rng.randrange(span))
+        shape = rng.random()
+        if shape < 0.4:
+            window = (start, start + timedelta(days=rng.randrange(7, 31)), None)
+        elif shape < 0.6:
+            window = (start, start, None)
+        elif shape < 0.8:
+            window = (None, None, start)
+        else:
+            window = (None, None, None)
+        cases.append((origin, destination, rng.choice((1, 1, 3, 5))) + window)
+    return cases
+
+
+def bench_leg_lookup(db: Session, count: int = 2000) -> dict:
+    """get_flights_by_params over random routes and date windows, through SQLite and through the index."""
+    cases = _leg_cases(db, count)
+    previous_index = crud.flight_index
+
+    def lookup(case):
+        origin, destination, limit, start, end, after = case
+        return crud.get_flights_by_params(db, origin, destination, limit, start, end, after)
+
+    try:
+        crud.set_flight_index(None)
+        _, sql_samples = _time_each(lookup, cases)
+        started = time.perf_counter()
+        crud.set_flight_index(FlightIndex.build(db))
+        build_seconds = time.perf_counter() - started
+        _, index_samples = _time_each(lookup, cases)
+    finally:
+        crud.set_flight_index(previous_index)
+    return {
+        "cases": len(cases),
+        "sql": summarize(sql_samples),
+        "index": summarize(index_samples),
+        "index_build_seconds": round(build_seconds, 3),
+    }
+
+
+def bench_populate(json_path: str, db_path: str, rows: int) -> dict:
+    """populate_db_from_json into an empty database file."""
+    engine = create_engine(f"sqlite:///{db_path}")
+    models.Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        started = time.perf_counter()
+        crud.populate_db_from_json(db, json_path)
+        elapsed = time.perf_counter() - started
+    engine.dispose()
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed else None,
+    }
+
@@ -0,0 +1,57 @@
+# benchmarks/stub_llm.py
+
+import asyncio
+import hashlib
+import random
+from typing import Optional
+
+import schemas
+from fast_intent import FastIntentParser
+
+
+class StubIntentChain:
+    """
+    Deterministic stand-in for llm_logic's Ollama chain.
+
+    Answers with the rule-based parser's reading of the query, filling in whatever it
+    misses from a hash of the text, after sleeping `latency` seconds (+/- `jitter`,
+    also derived from the text). The same query always gets the same answer and the
+    same delay, so runs are comparable. Implements the ainvoke/abatch calls main.py makes.
+    """
+
+    def __init__(self, cities: list[tuple[str, str]], latency: float = 0.5, jitter: float = 0.0):
+        self.parser = FastIntentParser([c for c, _ in cities], {country for _, country in cities})
+        self.cities = [c for c, _ in cities]
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+
+    def _rng(self, query: str) -> random.Random:
+        return random.Random(int.from_bytes(hashlib.blake2b(query.encode(), digest_size=8).digest(), "big"))
+
+    def answer(self, query: str) -> schemas.FlightSearchParameters:
+        params, _ = self.parser.parse(query)
+        rng = self._rng(query)
+        if params.origin is None or params.destination is None or params.origin == params.destination:
+            params.origin, params.destination = rng.sample(self.cities, 2)
+        if params.trip_type is None:
+            params.trip_type = rng.choice(["one_way", "round_trip"])
+        return params
+
+    async def ainvoke(self, inputs: dict, config: Optional[dict] = None, **kwargs) -> schemas.FlightSearchParameters:
+        query = inputs["query"]
+        delay = self.latency + self.jitter * (2 * self._rng(query).random() - 1)
+        self.calls += 1
+        await asyncio.sleep(max(delay, 0.0))
+        return self.answer(query)
+
+    async def abatch(
+        self, inputs: list[dict], config: Optional[dict] = None, return_exceptions: bool = False, **kwargs
+    ) -> list:
+        semaphore = asyncio.Semaphore((config or {}).get("max_concurrency") or len(inputs) or 1)
+
+        async def one(item):
+            async with semaphore:
+                return await self.ainvoke(item)
+
+        return await asyncio.gather(*(one(item) for item in inputs), return_exceptions=return_exceptions)
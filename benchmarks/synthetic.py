@@ -0,0 +1,189 @@
+# benchmarks/synthetic.py
+"""
+Deterministic synthetic data in the shapes the service consumes: flight records
+like flight-price.json, and transcripts like the ones the frontend sends.
+Kept free of app imports so it can run before the working directory is chosen.
+"""
+
+import base64
+import json
+import random
+import uuid
+from datetime import date, timedelta
+from typing import Iterator
+
+# The cities in the real scrape come first so aliases ("delhi", "saigon") keep working
+REAL_CITIES = [
+    ("New Delhi", "India"), ("Mumbai", "India"), ("Kolkata", "India"), ("Bangalore", "India"),
+    ("Hyderabad", "India"), ("Ahmedabad", "India"),
+    ("Hanoi", "Vietnam"), ("Ho Chi Minh City", "Vietnam"), ("Da Nang", "Vietnam"),
+]
+AIRLINES = ["Vietjet", "Vietnam Airlines", "IndiGo", "Air India", "Bamboo Airways", "AirAsia"]
+SYLLABLES = ["ka", "ro", "vi", "ta", "me", "lo", "su", "na", "de", "ri", "po", "zan", "tel", "mor", "bal", "quin"]
+
+
+def _name(rng: random.Random, syllables: int) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(syllables)).capitalize()
+
+
+def make_cities(count: int, countries: int = 8, seed: int = 1) -> list[tuple[str, str]]:
+    """`count` (city, country) pairs: the real ones first, then generated names."""
+    rng = random.Random(seed)
+    cities = list(REAL_CITIES[:count])
+    country_names = ["India", "Vietnam"]
+    while len(country_names) < countries:
+        name = _name(rng, 3)
+        if name not in country_names:
+            country_names.append(name)
+    taken = {c.lower() for c, _ in cities} | {c.lower() for c in country_names}
+    while len(cities) < count:
+        name = _name(rng, rng.choice((2, 3)))
+        if name.lower() not in taken:
+            taken.add(name.lower())
+            cities.append((name, country_names[len(cities) % len(country_names)]))
+    return cities
+
+
+def _link(rng: random.Random) -> str:
+    # Same template as the scraped Google Flights links; only the session tokens vary
+    sca = "%016x" % rng.getrandbits(64)
+    sxsrf = base64.urlsafe_b64encode(rng.randbytes(24)).decode().rstrip("=")
+    tfs = base64.urlsafe_b64encode(rng.randbytes(150)).decode().rstrip("=")
+    return (
+        f"https://www.google.com/travel/flights?sca_esv={sca}&sxsrf={sxsrf}:{rng.randrange(10**12, 10**13)}"
+        f"&source=flun&uitype=cuAA&hl=en&gl=in&curr=INR&ep=CAE&tfs={tfs}&ved=1t:2773&ictx=111"
+    )
+
+
+def iter_flight_records(
+    rows: int,
+    cities: list[tuple[str, str]],
+    days: int = 180,
+    first_day: date = date(2025, 8, 1),
+    seed: int = 1,
+) -> Iterator[dict]:
+    """Yields `rows` camelCase flight records spread evenly over every city pair."""
+    rng = random.Random(seed)
+    routes = [(o, d) for o in cities for d in cities if o != d]
+    # A fixed base fare per route, so prices look like distances rather than noise
+    base_fares = [rng.randrange(4000, 40000) for _ in routes]
+    for i in range(rows):
+        r = i % len(routes)
+        (origin, origin_country), (destination, destination_country) = routes[r]
+        price = int(base_fares[r] * rng.uniform(0.6, 1.8))
+        record = {
+            "airline": rng.choice(AIRLINES),
+            "date": (first_day + timedelta(days=rng.randrange(days))).isoformat(),
+            "destination": destination,
+            "destinationCountry": destination_country,
+            "duration": f"{rng.randrange(1, 14)}h {rng.randrange(0, 60, 5)}m",
+            "flightType": "Nonstop" if rng.random() < 0.7 else "1 stop",
+            "link": _link(rng),
+            "origin": origin,
+            "originCountry": origin_country,
+            "price_inr": price,
+            "uuid": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "rainProbability": round(rng.uniform(0, 100), 2),
+            "freeMeal": rng.random() < 0.4,
+        }
+        if rng.random() < 0.7:
+            luggage = rng.randrange(1000, 4000)
+            record.update(
+                minCheckedLuggagePrice=luggage,
+                minCheckedLuggageWeight=rng.choice(["15kg", "20kg", "23kg"]),
+                totalWithMinLuggage=price + luggage,
+            )
+        yield record
+
+
+def write_flight_json(path: str, rows: int, cities: list[tuple[str, str]], seed: int = 1) -> int:
+    """Streams records into a JSON array file, one record at a time. Returns the row count."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i, record in enumerate(iter_flight_records(rows, cities, seed=seed)):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(record))
+        f.write("\n]\n")
+    return rows
+
+
+# Transcript templates, from fully-specified (rule-based fast path) to vague (needs the LLM)
+QUERY_TEMPLATES = [
+    "one way flight from {o} to {d} on {day} {month}",
+    "round trip from {o} to {d} in {month} for {n} days",
+    "cheapest one way flight {o} to {d} next week",
+    "show me {n} options for a one way flight from {o} to {d}",
+    "return trip from {o} to {d} for a week in {month}",
+    "hey so um i kinda need to get over to {d}, leaving {o} sometime around {month}",
+    "what would it cost to fly {o} {d} and come back later",
+    "any cheap deals out of {o} heading {d} side",
+]
+OTHER_QUERIES = [
+    "what's the weather like today",
+    "tell me a joke",
+    "how do I reset my password",
+    "play some music",
+    "who won the match yesterday",
+]
+MONTH_NAMES = ["january", "february", "march", "april", "may", "june", "july", "august",
+               "september", "october", "november", "december"]
+
+
+def make_queries(cities: list[tuple[str, str]], count: int, other_ratio: float = 0.1, seed: int = 2) -> list[str]:
+    """`count` transcripts over the given cities, with `other_ratio` of them not about flights."""
+    rng = random.Random(seed)
+    names = [city for city, _ in cities]
+    queries = []
+    for _ in range(count):
+        if rng.random() < other_ratio:
+            queries.append(rng.choice(OTHER_QUERIES))
+            continue
+        o, d = rng.sample(names, 2)
+        queries.append(rng.choice(QUERY_TEMPLATES).format(
+            o=o, d=d, day=rng.randrange(1, 29), month=rng.choice(MONTH_NAMES), n=rng.randrange(2, 15)
+        ))
+    return queries
+
+
+def add_typos(queries: list[str], rate: float = 0.15, seed: int = 4) -> list[str]:
+    """Copies of `queries` with a fraction of words misspelled, to exercise fuzzy matching."""
+    rng = random.Random(seed)
+    noisy = []
+    for query in queries:
+        words = query.split()
+        for i, word in enumerate(words):
+            if len(word) > 3 and rng.random() < rate:
+                j = rng.randrange(len(word))
+                words[i] = word[:j] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[j + 1:]
+        noisy.append(" ".join(words))
+    return noisy
+
+
+def perturbed_words(keywords, count: int, seed: int = 5) -> list[str]:
+    """
+    Near misses of `keywords` (one to three edits: insert, delete, substitute or swap)
+    mixed with random words, for checking fuzzy matching right around its threshold.
+    """
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    keywords = sorted(keywords)
+    words = []
+    for _ in range(count):
+        if rng.random() < 0.2:
+            words.append("".join(rng.choice(letters) for _ in range(rng.randint(1, 14))))
+            continue
+        word = rng.choice(keywords)
+        for _ in range(rng.randint(1, 3)):
+            j = rng.randrange(len(word) + 1)
+            edit = rng.randrange(4)
+            if edit == 0:
+                word = word[:j] + rng.choice(letters) + word[j:]
+            elif edit == 1 and len(word) > 1:
+                word = word[:j] + word[j + 1:]
+            elif edit == 2:
+                word = word[:j] + rng.choice(letters) + word[j + 1:]
+            elif j < len(word) - 1:
+                word = word[:j] + word[j + 1] + word[j] + word[j + 2:]
+        words.append(word)
+    return words
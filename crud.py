@@ -1,67 +1,634 @@
 # crud.py
 
-import json
-from datetime import datetime, date
+import asyncio
+import heapq
+import logging
+from datetime import date, timedelta
 from typing import Optional
-import re
+import numpy as np
+from sqlalchemy import and_, func, or_, select, true, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
 import models
+from flexible_dates import FlexibleDates, cheapest_per_day, cheapest_round_trips_per_day, weekday_mask
+from flight_index import INDEX_COLUMNS, ROW_COLUMNS, FlightIndex, FlightRow
+from ingest import ingest_json
+from ranking import RankingOptions, columns_from_rows, rank, ranked_round_trips
+from round_trip import cheapest_round_trips
 
-# ... (keep to_snake_case and populate_db_from_json as they are) ...
-def to_snake_case(name):
-    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
-    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+logger = logging.getLogger(__name__)
 
-def populate_db_from_json(db: Session, json_path: str = "flight-price.json"):
-    if db.query(models.Flight).count() > 0:
-        print("Database already populated. Skipping population.")
+# Optional in-process index (see flight_index.py). When set, leg lookups are
+# answered from memory instead of going through SQLite and the ORM.
+flight_index = None
+
+def set_flight_index(index) -> None:
+    global flight_index
+    flight_index = index
+
+# Known cities and countries (see locations.py). When set, an origin or destination may
+# also be a country name or a wildcard such as "anywhere".
+location_catalog = None
+
+def set_location_catalog(catalog) -> None:
+    global location_catalog
+    location_catalog = catalog
+
+
+def _place_filter(city_column, country_column, place: Optional[str]):
+    """Predicate for one side of a route: an exact city, every city of a country, or anything."""
+    if location_catalog is None:
+        return city_column == place
+    kind, value = location_catalog.resolve(place)
+    if kind == "anywhere":
+        return true()
+    if kind == "country":
+        return country_column == value
+    return city_column == value
+
+
+def _route_filter(origin: Optional[str], destination: Optional[str]):
+    return and_(
+        _place_filter(models.Flight.origin, models.Flight.origin_country, origin),
+        _place_filter(models.Flight.destination, models.Flight.destination_country, destination),
+    )
+
+def populate_db_from_json(db: Session, json_path: str = "flight-price.json", refresh: bool = False):
+    """
+    Loads flight data from JSON into the database.
+    - On an empty table (or with refresh=True) the file is streamed in with batched upserts.
+    - Otherwise loading is skipped; use refresh=True to merge a new scrape keyed by uuid.
+    """
+    if not refresh and db.query(models.Flight.id).first() is not None:
+        logger.info("Database already populated. Skipping population.")
         return
-    db.query(models.Flight).delete()
-    db.commit()
-    print("Flight table cleared.")
-    with open(json_path, 'r') as f:
-        flight_data = json.load(f)
-    for flight_dict in flight_data:
-        if 'date' in flight_dict:
-            flight_dict['date'] = datetime.strptime(flight_dict['date'], '%Y-%m-%d').date()
-        snake_case_dict = {to_snake_case(k): v for k, v in flight_dict.items()}
-        db_flight = models.Flight(**snake_case_dict)
-        db.add(db_flight)
-    db.commit()
-    print(f"Successfully populated DB with {len(flight_data)} records.")
+    count = ingest_json(db, json_path)
+    logger.info("Successfully loaded %d records from %s.", count, json_path)
 
 
-def get_flights_by_params(
-    db: Session,
+def _flights_statement(
     origin: str,
     destination: str,
     limit: int,
-    departure_start: Optional[date] = None, # <-- NEW
-    departure_end: Optional[date] = None,   # <-- NEW
-    after_date: Optional[date] = None
-) -> list[models.Flight]:
+    departure_start: Optional[date] = None,
+    departure_end: Optional[date] = None,
+    after_date: Optional[date] = None,
+    page_after: Optional[tuple[int, int]] = None,
+    min_price: Optional[int] = None
+):
     """
-    Safely queries for flights.
-    - If departure_start and departure_end are provided, it searches within that range.
-    - If only after_date is provided, it searches for return flights after that date.
+    Builds the leg query shared by the sync and async lookups. Only the FlightRow
+    columns are selected, so results skip the ORM identity map and unused columns.
+    Results are ordered by (price_inr, id), which the route indexes store in that
+    order, so `page_after` (the key of the previous page's last flight) is a seek.
     """
-    query = (
-        db.query(models.Flight)
-        .filter(models.Flight.origin == origin, models.Flight.destination == destination)
-    )
+    stmt = select(*ROW_COLUMNS).where(_route_filter(origin, destination))
+    if page_after is not None:
+        stmt = stmt.where(tuple_(models.Flight.price_inr, models.Flight.id) > tuple_(*page_after))
+    if min_price is not None:
+        stmt = stmt.where(models.Flight.price_inr >= min_price)
 
     # --- NEW DATE FILTERING LOGIC ---
     if departure_start and departure_end:
         if departure_start == departure_end:
             # If start and end are the same, it's a query for an exact date
-            query = query.filter(models.Flight.date == departure_start)
+            stmt = stmt.where(models.Flight.date == departure_start)
         else:
             # If they are different, it's a range query
-            query = query.filter(models.Flight.date.between(departure_start, departure_end))
+            stmt = stmt.where(models.Flight.date.between(departure_start, departure_end))
     elif after_date:
         # This is used for the return leg
-        query = query.filter(models.Flight.date > after_date)
+        stmt = stmt.where(models.Flight.date > after_date)
     
     # If no date parameters are given, it searches all dates (for "cheapest overall").
 
-    return query.order_by(models.Flight.price_inr.asc()).limit(limit).all()
\ No newline at end of file
+    return stmt.order_by(models.Flight.price_inr.asc(), models.Flight.id.asc()).limit(limit)
+
+
+def get_flights_by_params(
+    db: Session,
+    origin: str,
+    destination: str,
+    limit: int,
+    departure_start: Optional[date] = None, # <-- NEW
+    departure_end: Optional[date] = None,   # <-- NEW
+    after_date: Optional[date] = None,
+    page_after: Optional[tuple[int, int]] = None,
+    min_price: Optional[int] = None
+) -> list[FlightRow]:
+    """
+    Safely queries for flights, cheapest first (ties broken by id).
+    - If departure_start and departure_end are provided, it searches within that range.
+    - If only after_date is provided, it searches for return flights after that date.
+    - page_after=(price_inr, id) of the last flight already shown returns the next page.
+    - min_price skips fares known to be absent (e.g. below the fare calendar's cheapest).
+    - If a FlightIndex is installed, it answers from memory.
+    Either way the results are FlightRow tuples.
+    """
+    if flight_index is not None:
+        return flight_index.search(
+            origin, destination, limit,
+            departure_start=departure_start, departure_end=departure_end, after_date=after_date,
+            page_after=page_after
+        )
+
+    stmt = _flights_statement(
+        origin, destination, limit, departure_start, departure_end, after_date, page_after, min_price
+    )
+    return [FlightRow(*row) for row in db.execute(stmt)]
+
+
+async def aget_flights_by_params(
+    db: AsyncSession,
+    origin: str,
+    destination: str,
+    limit: int,
+    departure_start: Optional[date] = None,
+    departure_end: Optional[date] = None,
+    after_date: Optional[date] = None,
+    page_after: Optional[tuple[int, int]] = None,
+    min_price: Optional[int] = None
+) -> list[FlightRow]:
+    """Async variant of get_flights_by_params for use on the event loop."""
+    if flight_index is not None:
+        return flight_index.search(
+            origin, destination, limit,
+            departure_start=departure_start, departure_end=departure_end, after_date=after_date,
+            page_after=page_after
+        )
+
+    stmt = _flights_statement(
+        origin, destination, limit, departure_start, departure_end, after_date, page_after, min_price
+    )
+    return [FlightRow(*row) for row in (await db.execute(stmt)).all()]
+
+
+def _leg_filters(origin: str, destination: str, departure_start: Optional[date], departure_end: Optional[date]):
+    """Outbound and inbound predicates for a round trip search."""
+    outbound_filter = _route_filter(origin, destination)
+    inbound_filter = _route_filter(destination, origin)
+    if departure_start and departure_end:
+        outbound_filter = and_(outbound_filter, models.Flight.date.between(departure_start, departure_end))
+        inbound_filter = and_(inbound_filter, models.Flight.date > departure_start)
+    return outbound_filter, inbound_filter
+
+
+SERIES_COLUMNS = (
+    models.Flight.id, models.Flight.origin, models.Flight.destination, models.Flight.date, models.Flight.price_inr
+)
+
+
+def _pair_series(
+    outbound_series, inbound_series, limit: int, trip_duration_days: Optional[int]
+) -> list[tuple[int, int]]:
+    """
+    Runs the round trip optimiser over (id, origin, destination, date, price) rows and returns
+    the cheapest id pairs. Each outbound route is paired with its own reverse route, so
+    country and wildcard searches are solved per route and then merged by
+    (total, outbound date, outbound id, inbound id), the order FlightIndex.round_trips uses.
+    """
+    def by_route(series):
+        routes: dict[tuple[str, str], list] = {}
+        for row in series:
+            routes.setdefault((row[1], row[2]), []).append(row)
+        # Sorted like the FlightIndex, so equal fares resolve to the same flights
+        return {route: _series_arrays(rows) for route, rows in routes.items()}
+
+    inbound_routes = by_route(inbound_series)
+    candidates = []
+    for (o, d), (out_ids, out_dates, out_prices) in by_route(outbound_series).items():
+        if (d, o) not in inbound_routes:
+            continue
+        in_ids, in_dates, in_prices = inbound_routes[(d, o)]
+        out_pos, in_pos, totals = cheapest_round_trips(
+            out_dates, out_prices, in_dates, in_prices, limit, trip_duration_days, out_ids
+        )
+        candidates.extend(zip(
+            totals.tolist(), out_dates[out_pos].tolist(), out_ids[out_pos].tolist(), in_ids[in_pos].tolist()
+        ))
+    return [(out_id, in_id) for _, _, out_id, in_id in heapq.nsmallest(limit, candidates)]
+
+
+
+async def _aleg_series(db: AsyncSession, leg_filter, columns=SERIES_COLUMNS) -> list:
+    # Each leg gets its own session so both queries can be in flight at once. It is bound
+    # to the request's engine rather than AsyncSessionLocal's, so after a data swap the
+    # series still comes from the database the request hydrates its results from.
+    async with AsyncSession(db.bind) as session:
+        return (await session.execute(select(*columns).where(leg_filter))).all()
+
+
+async def aget_round_trip_flights(
+    db: AsyncSession,
+    origin: str,
+    destination: str,
+    limit: int,
+    departure_start: Optional[date] = None,
+    departure_end: Optional[date] = None,
+    trip_duration_days: Optional[int] = None
+) -> list[tuple[FlightRow, FlightRow]]:
+    """
+    Finds the cheapest (outbound, inbound) pairs for a round trip, optimising both legs together.
+    - Outbound flights honour the same date filter as get_flights_by_params.
+    - If trip_duration_days is given, the return departs exactly that many days later;
+      otherwise any return after the outbound date qualifies.
+    The two legs' (id, date, price) series are fetched concurrently; result rows are loaded
+    only for the winners.
+    """
+    if flight_index is not None:
+        return flight_index.round_trips(
+            origin, destination, limit,
+            departure_start=departure_start, departure_end=departure_end,
+            trip_duration_days=trip_duration_days
+        )
+
+    outbound_filter, inbound_filter = _leg_filters(origin, destination, departure_start, departure_end)
+    outbound_series, inbound_series = await asyncio.gather(
+        _aleg_series(db, outbound_filter), _aleg_series(db, inbound_filter)
+    )
+    pairs = _pair_series(outbound_series, inbound_series, limit, trip_duration_days)
+    if not pairs:
+        return []
+
+    wanted = {flight_id for pair in pairs for flight_id in pair}
+    result = await db.execute(select(*ROW_COLUMNS).where(models.Flight.id.in_(wanted)))
+    flights = {row.id: FlightRow(*row) for row in result}
+    return [(flights[o], flights[i]) for o, i in pairs]
+
+
+
+# --- Flexible dates (see flexible_dates.py) ---
+def _flexible_filters(origin: str, destination: str, flex: FlexibleDates):
+    """Outbound and return predicates for a flexible search."""
+    outbound_filter = _route_filter(origin, destination)
+    inbound_filter = _route_filter(destination, origin)
+    if flex.start and flex.end:
+        outbound_filter = and_(outbound_filter, models.Flight.date.between(flex.start, flex.end))
+        if flex.stay is not None:
+            inbound_filter = and_(inbound_filter, models.Flight.date.between(
+                flex.start + timedelta(days=flex.stay[0]), flex.end + timedelta(days=flex.stay[1])
+            ))
+        else:
+            inbound_filter = and_(inbound_filter, models.Flight.date > flex.start)
+    return outbound_filter, inbound_filter
+
+
+def _series_arrays(series) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(ids, day numbers, prices) of (id, origin, destination, date, price) rows, sorted like the FlightIndex."""
+    rows = [(r[0], r[3].toordinal(), r[4]) for r in series if r[3] is not None and r[4] is not None]
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    ids, dates, prices = (np.array(column, dtype=np.int64) for column in zip(*rows))
+    order = np.lexsort((ids, prices, dates))
+    return ids[order], dates[order], prices[order]
+
+
+def _flexible_one_way_ids(series, limit: int, flex: FlexibleDates) -> list[int]:
+    ids, dates, prices = _series_arrays(series)
+    keep = weekday_mask(dates, flex.weekdays)
+    ids, dates, prices = ids[keep], dates[keep], prices[keep]
+    return ids[cheapest_per_day(dates, prices, limit, ids)].tolist()
+
+
+def _flexible_pair_ids(outbound_series, inbound_series, limit: int, flex: FlexibleDates) -> list[tuple[int, int]]:
+    """Like _pair_series, but the cheapest pair per outbound day over the stay range."""
+    def by_route(series):
+        routes: dict[tuple[str, str], list] = {}
+        for row in series:
+            routes.setdefault((row[1], row[2]), []).append(row)
+        return {route: _series_arrays(rows) for route, rows in routes.items()}
+
+    inbound_routes = by_route(inbound_series)
+    out_ids, in_ids, days, totals = [], [], [], []
+    for (o, d), (route_out_ids, out_dates, out_prices) in by_route(outbound_series).items():
+        if (d, o) not in inbound_routes:
+            continue
+        route_in_ids, in_dates, in_prices = inbound_routes[(d, o)]
+        out_pos, in_pos, route_totals = cheapest_round_trips_per_day(
+            out_dates, out_prices, in_dates, in_prices, flex.weekdays, flex.stay
+        )
+        out_ids.append(route_out_ids[out_pos])
+        in_ids.append(route_in_ids[in_pos])
+        days.append(out_dates[out_pos])
+        totals.append(route_totals)
+    if not out_ids:
+        return []
+    out_ids, in_ids = np.concatenate(out_ids), np.concatenate(in_ids)
+    best = cheapest_per_day(np.concatenate(days), np.concatenate(totals), limit, out_ids)
+    return list(zip(out_ids[best].tolist(), in_ids[best].tolist()))
+
+
+
+async def aget_flexible_flights(
+    db: AsyncSession, origin: str, destination: str, limit: int, flex: FlexibleDates
+) -> list[FlightRow]:
+    """
+    The cheapest flight on each candidate departure day (flex.start..flex.end, on
+    flex.weekdays), cheapest days first: one series scan instead of a query per date.
+    """
+    if flight_index is not None:
+        return flight_index.flexible_search(origin, destination, limit, flex)
+
+    outbound_filter, _ = _flexible_filters(origin, destination, flex)
+    series = (await db.execute(select(*SERIES_COLUMNS).where(outbound_filter))).all()
+    ids = _flexible_one_way_ids(series, limit, flex)
+    if not ids:
+        return []
+    result = await db.execute(select(*ROW_COLUMNS).where(models.Flight.id.in_(ids)))
+    flights = {row.id: FlightRow(*row) for row in result}
+    return [flights[i] for i in ids]
+
+
+
+async def aget_flexible_round_trips(
+    db: AsyncSession, origin: str, destination: str, limit: int, flex: FlexibleDates
+) -> list[tuple[FlightRow, FlightRow]]:
+    """
+    The cheapest (outbound, inbound) pair for each candidate outbound day, with the return
+    flex.stay days later (any later day if unset), cheapest first. The two legs are
+    fetched concurrently.
+    """
+    if flight_index is not None:
+        return flight_index.flexible_round_trips(origin, destination, limit, flex)
+
+    outbound_filter, inbound_filter = _flexible_filters(origin, destination, flex)
+    outbound_series, inbound_series = await asyncio.gather(
+        _aleg_series(db, outbound_filter), _aleg_series(db, inbound_filter)
+    )
+    pairs = _flexible_pair_ids(outbound_series, inbound_series, limit, flex)
+    if not pairs:
+        return []
+
+    wanted = {flight_id for pair in pairs for flight_id in pair}
+    result = await db.execute(select(*ROW_COLUMNS).where(models.Flight.id.in_(wanted)))
+    flights = {row.id: FlightRow(*row) for row in result}
+    return [(flights[o], flights[i]) for o, i in pairs]
+
+
+# --- Filters and sort orders (see ranking.py) ---
+# Ranking inputs, in ranking.columns_from_rows order
+RANK_COLUMNS = (
+    models.Flight.id,
+    models.Flight.price_inr,
+    models.Flight.total_with_min_luggage,
+    models.Flight.duration_minutes,
+    models.Flight.stops,
+    models.Flight.free_meal,
+    models.Flight.rain_probability,
+)
+# Round trip series: route and date, then the ranking inputs
+RANKED_SERIES_COLUMNS = (models.Flight.origin, models.Flight.destination, models.Flight.date) + RANK_COLUMNS
+
+
+def _ranking_filter(options: RankingOptions):
+    """The filters of `options` as a predicate, so SQLite only returns flights that pass them."""
+    conditions = [models.Flight.date.isnot(None), models.Flight.price_inr.isnot(None)]
+    if options.nonstop_only:
+        conditions.append(models.Flight.stops == 0)
+    if options.free_meal_only:
+        conditions.append(models.Flight.free_meal.is_(True))
+    if options.max_rain_probability is not None:
+        conditions.append(models.Flight.rain_probability <= options.max_rain_probability)
+    if options.max_price is not None:
+        conditions.append(models.Flight.price_inr <= options.max_price)
+    return and_(*conditions)
+
+
+def _ranked_statement(
+    origin: str,
+    destination: str,
+    options: RankingOptions,
+    departure_start: Optional[date] = None,
+    departure_end: Optional[date] = None,
+    after_date: Optional[date] = None,
+):
+    stmt = select(*RANK_COLUMNS).where(_route_filter(origin, destination), _ranking_filter(options))
+    if departure_start and departure_end:
+        stmt = stmt.where(models.Flight.date.between(departure_start, departure_end))
+    elif after_date:
+        stmt = stmt.where(models.Flight.date > after_date)
+    return stmt
+
+
+def _ranked_ids(rows, options: RankingOptions, limit: int) -> list[int]:
+    columns = columns_from_rows(rows)
+    return columns.ids[rank(columns, options, limit)].tolist()
+
+
+def _ranked_pair_ids(
+    outbound_series, inbound_series, options: RankingOptions, limit: int, trip_duration_days: Optional[int]
+) -> list[tuple[int, int]]:
+    """Like _pair_series over RANKED_SERIES_COLUMNS rows, with pairs ranked by summed sort cost."""
+    def by_route(series):
+        routes: dict[tuple[str, str], list] = {}
+        for row in series:
+            routes.setdefault((row[0], row[1]), []).append(row)
+        legs = {}
+        for route, rows in routes.items():
+            # Same (date, price, id) order as the FlightIndex, so ties resolve the same way
+            rows.sort(key=lambda r: (r[2], r[4], r[3]))
+            legs[route] = (
+                np.array([r[2].toordinal() for r in rows], dtype=np.int64),
+                columns_from_rows(r[3:] for r in rows),
+            )
+        return legs
+
+    inbound_routes = by_route(inbound_series)
+    candidates = []
+    for (o, d), (out_dates, out_columns) in by_route(outbound_series).items():
+        if (d, o) not in inbound_routes:
+            continue
+        in_dates, in_columns = inbound_routes[(d, o)]
+        out_pos, in_pos, totals = ranked_round_trips(
+            out_dates, out_columns, in_dates, in_columns, options, limit, trip_duration_days
+        )
+        candidates.extend(
+            (total, int(out_dates[o_pos]), int(out_columns.ids[o_pos]), int(in_columns.ids[i_pos]))
+            for total, o_pos, i_pos in zip(totals.tolist(), out_pos.tolist(), in_pos.tolist())
+        )
+    return [(out_id, in_id) for _, _, out_id, in_id in heapq.nsmallest(limit, candidates)]
+
+
+
+async def aget_ranked_flights(
+    db: AsyncSession,
+    origin: str,
+    destination: str,
+    limit: int,
+    options: RankingOptions,
+    departure_start: Optional[date] = None,
+    departure_end: Optional[date] = None,
+    after_date: Optional[date] = None,
+) -> list[FlightRow]:
+    """
+    Flights that pass the filters of `options`, best first by its sort order (or its
+    fare vs flight time Pareto front). The filters run in SQL; ranking runs over the
+    numeric columns of what's left, and rows are loaded only for the winners.
+    """
+    if flight_index is not None:
+        return flight_index.ranked_search(
+            origin, destination, limit, options, departure_start, departure_end, after_date
+        )
+
+    stmt = _ranked_statement(origin, destination, options, departure_start, departure_end, after_date)
+    ids = _ranked_ids((await db.execute(stmt)).all(), options, limit)
+    if not ids:
+        return []
+    result = await db.execute(select(*ROW_COLUMNS).where(models.Flight.id.in_(ids)))
+    flights = {row.id: FlightRow(*row) for row in result}
+    return [flights[i] for i in ids]
+
+
+
+async def aget_ranked_round_trips(
+    db: AsyncSession,
+    origin: str,
+    destination: str,
+    limit: int,
+    options: RankingOptions,
+    departure_start: Optional[date] = None,
+    departure_end: Optional[date] = None,
+    trip_duration_days: Optional[int] = None,
+) -> list[tuple[FlightRow, FlightRow]]:
+    """
+    Like aget_round_trip_flights with both legs filtered by `options` and pairs ranked by
+    the sum of their legs' sort costs. max_price applies to each leg.
+    """
+    if flight_index is not None:
+        return flight_index.ranked_round_trips(
+            origin, destination, limit, options, departure_start, departure_end, trip_duration_days
+        )
+
+    outbound_filter, inbound_filter = _leg_filters(origin, destination, departure_start, departure_end)
+    outbound_series, inbound_series = await asyncio.gather(
+        _aleg_series(db, and_(outbound_filter, _ranking_filter(options)), RANKED_SERIES_COLUMNS),
+        _aleg_series(db, and_(inbound_filter, _ranking_filter(options)), RANKED_SERIES_COLUMNS),
+    )
+    pairs = _ranked_pair_ids(outbound_series, inbound_series, options, limit, trip_duration_days)
+    if not pairs:
+        return []
+
+    wanted = {flight_id for pair in pairs for flight_id in pair}
+    result = await db.execute(select(*ROW_COLUMNS).where(models.Flight.id.in_(wanted)))
+    flights = {row.id: FlightRow(*row) for row in result}
+    return [(flights[o], flights[i]) for o, i in pairs]
+
+
+async def aget_route_index(db: AsyncSession, routes: set[tuple[str, str]]) -> FlightIndex:
+    """
+    Loads just the given (origin, destination) routes into a FlightIndex with a single query.
+    Countries and wildcards are expanded the same way as in get_flights_by_params.
+    """
+    routes = [(o, d) for o, d in routes if o and d]
+    if not routes:
+        return FlightIndex([])
+    stmt = select(*INDEX_COLUMNS).where(or_(*(_route_filter(o, d) for o, d in routes)))
+    return FlightIndex((await db.execute(stmt)).all())
+
+
+def _calendar_route_filter(table, origin: Optional[str], destination: Optional[str]):
+    """
+    Like _route_filter for a fare calendar table. The calendar is keyed by city only, so a
+    country expands to its cities from the location catalog.
+    """
+    def place_filter(column, place):
+        if location_catalog is None:
+            return column == place
+        kind, value = location_catalog.resolve(place)
+        if kind == "anywhere":
+            return true()
+        if kind == "country":
+            return column.in_(sorted(location_catalog.cities_by_country.get(value, ())))
+        return column == value
+
+    return and_(place_filter(table.origin, origin), place_filter(table.destination, destination))
+
+
+def _fare_calendar_statement(
+    origin: str,
+    destination: str,
+    granularity: str = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None
+):
+    if granularity == "month":
+        table, period = models.FareCalendarMonth, models.FareCalendarMonth.month
+        start = start.strftime('%Y-%m') if start else None
+        end = end.strftime('%Y-%m') if end else None
+    else:
+        table, period = models.FareCalendarDay, models.FareCalendarDay.date
+    stmt = select(table).where(_calendar_route_filter(table, origin, destination))
+    if start:
+        stmt = stmt.where(period >= start)
+    if end:
+        stmt = stmt.where(period <= end)
+    return stmt.order_by(table.origin, table.destination, period)
+
+
+async def aget_fare_calendar(
+    db: AsyncSession,
+    origin: str,
+    destination: str,
+    granularity: str = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> list:
+    """
+    Reads the precomputed fare calendar, per day or per month, in one query. Places are
+    resolved like a flight search, so a country or wildcard gives one row per matching
+    route and period.
+    """
+    stmt = _fare_calendar_statement(origin, destination, granularity, start, end)
+    return list((await db.scalars(stmt)).all())
+
+
+def _unindexed(column):
+    """
+    `+column`: same value, but SQLite won't pick an index because of this term.
+    Used where a range on one index would otherwise beat an ORDER BY on a better one.
+    """
+    return UnaryExpression(column, operator=operators.custom_op("+"), type_=column.type)
+
+
+def _cheapest_fare_statement(
+    origin: str,
+    destination: str,
+    departure_start: Optional[date] = None,
+    departure_end: Optional[date] = None
+):
+    day = models.FareCalendarDay
+    route_filter = _calendar_route_filter(day, origin, destination)
+    single_route = location_catalog is None or all(
+        location_catalog.resolve(place)[0] == "city" for place in (origin, destination)
+    )
+    if not single_route:
+        # Several routes: a plain MIN over their rows, since no one index order covers them
+        stmt = select(func.min(day.min_price)).where(route_filter)
+        if departure_start and departure_end:
+            stmt = stmt.where(day.date.between(departure_start, departure_end))
+        return stmt
+
+    stmt = select(day.min_price).where(route_filter)
+    if departure_start and departure_end:
+        # Walk the (route, min_price) index and stop at the first day inside the window,
+        # rather than reading the whole window off the primary key and sorting it
+        stmt = stmt.where(_unindexed(day.date).between(departure_start, departure_end))
+    return stmt.order_by(day.min_price.asc(), day.date.asc()).limit(1)
+
+
+async def aget_cheapest_fare(
+    db: AsyncSession,
+    origin: str,
+    destination: str,
+    departure_start: Optional[date] = None,
+    departure_end: Optional[date] = None
+) -> Optional[int]:
+    """
+    Cheapest fare on a route, read from the fare calendar instead of the flight table.
+    Applies the same date window rules as get_flights_by_params.
+    """
+    stmt = _cheapest_fare_statement(origin, destination, departure_start, departure_end)
+    return (await db.execute(stmt)).scalar_one_or_none()
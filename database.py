@@ -1,6 +1,11 @@
 # database.py
+import os
+
 import logfire
+import sqlalchemy
+import sqlalchemy.ext.asyncio
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -8,16 +13,96 @@ logfire.configure()  # Initialize logfire
 
 # Define the database URL for SQLite
 SQLALCHEMY_DATABASE_URL = "sqlite:///./flight.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./flight.db"
+
+# Serve from a prebuilt snapshot (see snapshot.py) instead. Snapshots never change once
+# built, so they're opened read-only and immutable: SQLite skips file locking, and
+# startup skips schema creation and JSON ingest entirely.
+def snapshot_urls(path: str) -> tuple[str, str]:
+    """Sync and async URLs that open a snapshot read-only and immutable."""
+    uri = f"file:{os.path.abspath(path)}?mode=ro&immutable=1&uri=true"
+    return f"sqlite:///{uri}", f"sqlite+aiosqlite:///{uri}"
+
+
+SNAPSHOT_PATH = os.getenv("FLIGHT_DB_SNAPSHOT")
+READ_ONLY = SNAPSHOT_PATH is not None
+if READ_ONLY:
+    SQLALCHEMY_DATABASE_URL, ASYNC_SQLALCHEMY_DATABASE_URL = snapshot_urls(SNAPSHOT_PATH)
 
 # Create the SQLAlchemy engine
 # connect_args is needed only for SQLite to allow multi-threaded access
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
-logfire.instrument_sqlalchemy(engine=engine)
 
 # Create a SessionLocal class, which will be the database session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine over aiosqlite so request handlers never block the event loop on SQLite
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
+logfire.instrument_sqlalchemy(engines=[engine, async_engine])
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 # Base class for our models to inherit from
 Base = declarative_base()
+
+
+def open_snapshot(path: str):
+    """New (engine, async_engine) over a snapshot, for building state before switching to it."""
+    sync_url, async_url = snapshot_urls(path)
+    # Looked up on the modules rather than imported: instrument_sqlalchemy wrapped them
+    # there, so engines created after startup get query spans too
+    new_engine = sqlalchemy.create_engine(sync_url, connect_args={"check_same_thread": False})
+    new_async_engine = sqlalchemy.ext.asyncio.create_async_engine(
+        async_url, connect_args={"check_same_thread": False}
+    )
+    return new_engine, new_async_engine
+
+
+def use_engines(new_engine, new_async_engine):
+    """
+    Points SessionLocal and AsyncSessionLocal at new engines. Sessions that are already
+    open keep the engine they were created with. Returns the previous (engine, async_engine)
+    so the caller can dispose of them once those sessions are done.
+    """
+    global engine, async_engine
+    previous = engine, async_engine
+    engine, async_engine = new_engine, new_async_engine
+    SessionLocal.configure(bind=new_engine)
+    AsyncSessionLocal.configure(bind=new_async_engine)
+    return previous
+
+
+def create_missing_indexes(metadata, replaced: tuple[str, ...] = ()) -> None:
+    """
+    create_all() only creates indexes together with their table, so databases created
+    before an index was declared never get it. This adds any that are missing, and
+    drops the `replaced` ones they supersede.
+    """
+    with engine.begin() as conn:
+        for name in replaced:
+            conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{name}"')
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def add_missing_columns(metadata) -> None:
+    """
+    create_all() never alters a table that already exists, so databases created before
+    a column was declared don't have it. This adds any that are missing (as NULL; the
+    code that owns a column backfills it).
+    """
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            existing = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table.name}")')}
+            if not existing:
+                continue  # not created yet; create_all() makes it whole
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
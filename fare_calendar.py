@@ -0,0 +1,114 @@
+# fare_calendar.py
+
+import logging
+from datetime import date
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import and_, delete, insert, or_, select
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+
+def _group_stats(keys: np.ndarray, prices: np.ndarray):
+    """
+    Min, median and count of `prices` per distinct key, in one vectorized pass.
+    Inputs must already be sorted by (key, price).
+    """
+    values, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    mins = prices[starts]
+    medians = (prices[starts + (counts - 1) // 2] + prices[starts + counts // 2]) / 2
+    return values, starts, mins, medians, counts
+
+
+def route_aggregates(dates: Iterable[date], prices: Iterable[int]) -> tuple[list[dict], list[dict]]:
+    """Builds the per-day and per-month rows for one route's (date, price) series."""
+    ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.int64)
+    prices = np.fromiter(prices, dtype=np.int64, count=len(ordinals))
+    if len(ordinals) == 0:
+        return [], []
+
+    order = np.lexsort((prices, ordinals))
+    ordinals, prices = ordinals[order], prices[order]
+    days, _, mins, medians, counts = _group_stats(ordinals, prices)
+    day_rows = [
+        {"date": date.fromordinal(d), "min_price": m, "median_price": md, "flight_count": c}
+        for d, m, md, c in zip(days.tolist(), mins.tolist(), medians.tolist(), counts.tolist())
+    ]
+
+    calendar_dates = [date.fromordinal(d) for d in ordinals.tolist()]
+    month_keys = np.array([d.year * 12 + d.month - 1 for d in calendar_dates], dtype=np.int64)
+    order = np.lexsort((ordinals, prices, month_keys))
+    month_keys, month_prices = month_keys[order], prices[order]
+    months, starts, mins, medians, counts = _group_stats(month_keys, month_prices)
+    cheapest = order[starts]
+    month_rows = [
+        {
+            "month": f"{k // 12:04d}-{k % 12 + 1:02d}",
+            "min_price": m,
+            "median_price": md,
+            "flight_count": c,
+            "cheapest_date": calendar_dates[i],
+        }
+        for k, m, md, c, i in zip(months.tolist(), mins.tolist(), medians.tolist(), counts.tolist(), cheapest.tolist())
+    ]
+    return day_rows, month_rows
+
+
+ROUTE_CHUNK = 100  # routes per statement, keeps the OR chain well under SQLite's expression depth limit
+
+
+def _route_filter(table, routes: list[tuple[str, str]]):
+    return or_(*(and_(table.origin == o, table.destination == d) for o, d in routes))
+
+
+def refresh_fare_calendar(db: Session, routes: Optional[Iterable[tuple[str, str]]] = None) -> int:
+    """
+    Recomputes the fare calendar for the given (origin, destination) routes, or for every
+    route when `routes` is None. Returns the number of routes refreshed.
+    """
+    stmt = select(models.Flight.origin, models.Flight.destination, models.Flight.date, models.Flight.price_inr).where(
+        models.Flight.date.is_not(None), models.Flight.price_inr.is_not(None)
+    )
+    if routes is None:
+        statements = [stmt]
+        db.execute(delete(models.FareCalendarDay))
+        db.execute(delete(models.FareCalendarMonth))
+    else:
+        routes = sorted({(o, d) for o, d in routes if o and d})
+        chunks = [routes[i:i + ROUTE_CHUNK] for i in range(0, len(routes), ROUTE_CHUNK)]
+        statements = [stmt.where(_route_filter(models.Flight, chunk)) for chunk in chunks]
+        # Routes that lost all their flights must not keep stale rows either
+        for chunk in chunks:
+            db.execute(delete(models.FareCalendarDay).where(_route_filter(models.FareCalendarDay, chunk)))
+            db.execute(delete(models.FareCalendarMonth).where(_route_filter(models.FareCalendarMonth, chunk)))
+
+    series: dict[tuple[str, str], tuple[list, list]] = {}
+    for statement in statements:
+        for origin, destination, flight_date, price in db.execute(statement):
+            dates, prices = series.setdefault((origin, destination), ([], []))
+            dates.append(flight_date)
+            prices.append(price)
+
+    day_rows, month_rows = [], []
+    for (origin, destination), (dates, prices) in series.items():
+        days, months = route_aggregates(dates, prices)
+        route = {"origin": origin, "destination": destination}
+        day_rows.extend({**route, **row} for row in days)
+        month_rows.extend({**route, **row} for row in months)
+    if day_rows:
+        db.execute(insert(models.FareCalendarDay), day_rows)
+    if month_rows:
+        db.execute(insert(models.FareCalendarMonth), month_rows)
+    db.commit()
+    return len(series)
+
+
+def ensure_fare_calendar(db: Session) -> None:
+    """Builds the calendar for databases populated before it existed."""
+    if db.query(models.FareCalendarDay.date).first() is None and db.query(models.Flight.id).first() is not None:
+        count = refresh_fare_calendar(db)
+        logger.info("Fare calendar built for %d routes.", count)
@@ -0,0 +1,321 @@
+# fast_intent.py
+
+import calendar
+import re
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+import schemas
+from intent_cache import normalize_query
+from locations import CITY_ALIASES, LocationCatalog
+
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+MONTHS["sept"] = 9
+
+NUMBER_WORDS = {
+    "a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "twenty": 20, "thirty": 30,
+}
+
+# Words that carry no search constraint. Anything else left over after extraction
+# means the query says something this parser doesn't understand.
+FILLER_WORDS = {
+    "i", "id", "im", "we", "want", "wanna", "would", "like", "need", "looking", "look", "for",
+    "a", "an", "the", "me", "us", "my", "please", "can", "you", "could", "find", "show", "get",
+    "give", "search", "book", "what", "whats", "is", "are", "there", "any", "of", "on", "in",
+    "during", "from", "to", "and", "with", "flight", "flights", "fly", "flying", "ticket",
+    "tickets", "fare", "fares", "price", "prices", "cheapest", "cheap", "cheaper", "lowest",
+    "budget", "best", "deal", "deals", "trip", "journey", "travel", "going", "go", "option",
+    "options", "alternatives", "available", "long", "stay", "staying", "days",
+}
+
+_NUMBER = r"(\d{1,3}|" + "|".join(NUMBER_WORDS) + r")"
+# A number that can't be the article "a"
+_COUNT = r"(\d{1,3}|" + "|".join(word for word in NUMBER_WORDS if word != "a") + r")"
+_MONTH = r"(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")"
+
+ONE_WAY_PATTERN = re.compile(r"\b(one way|single|just going|no return|oneway)\b")
+ROUND_TRIP_PATTERN = re.compile(r"\b(round trip|roundtrip|return trip|return|both ways|back and forth)\b")
+DAY_MONTH_PATTERN = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)? (?:of )?{_MONTH}(?: (\d{{4}}))?\b")
+MONTH_DAY_PATTERN = re.compile(rf"\b{_MONTH} (\d{{1,2}})(?:st|nd|rd|th)?(?: (\d{{4}}))?\b")
+MONTH_PATTERN = re.compile(rf"\b(?:in|during|for|of|this|next|month of) {_MONTH}(?: (\d{{4}}))?\b")
+RELATIVE_PATTERN = re.compile(r"\b(day after tomorrow|tomorrow|today|tonight|next week|this week|next month)\b")
+DURATION_PATTERN = re.compile(
+    rf"\b(?:{_NUMBER}[ -](day|days|night|nights|week|weeks)(?: long)?|(fortnight)|(week long))\b"
+)
+# Flexible dates: "±3 days" is read from the raw query, since normalizing drops the sign
+PLUS_MINUS_PATTERN = re.compile(r"(?:±|\+/-|\+-|\+ or -)\s*(\d{1,2})\s*(?:days?|d)?\b")
+FLEXIBLE_PATTERN = re.compile(
+    rf"\b(?:(?:plus or minus|give or take|flexible by|flexible for) {_NUMBER} days?"
+    rf"|{_NUMBER} days? (?:either side|either way|before or after))\b"
+)
+AROUND_PATTERN = re.compile(
+    rf"\b(?:around|about|roughly|approximately)(?= \d{{1,2}}(?:st|nd|rd|th)? (?:of )?{_MONTH}\b| {_MONTH} \d)"
+)
+DEPARTURE_DAYS_PATTERN = re.compile(r"\b(?:on )?(?:a |the )?(weekends?|weekdays?)\b")
+STAY_RANGE_PATTERN = re.compile(
+    rf"\b(?:between )?{_COUNT}(?: to| or| and|) {_COUNT}[ -](day|days|night|nights|week|weeks)(?: long)?\b"
+)
+# Days either side of a date that "around <date>" allows
+AROUND_FLEXIBLE_DAYS = 3
+
+# Filters and sort orders (see ranking.py). Fare and rain caps are read from the raw
+# query like "±3 days", since normalizing drops "₹", "," and "%".
+_CURRENCY = r"(?:₹|rs\.?|inr|rupees?)"
+PRICE_CAP_PATTERN = re.compile(
+    rf"\b(?:under|below|less than|cheaper than|up to|upto|at most|no more than|max(?:imum)?|budget of)\s*"
+    rf"({_CURRENCY})?\s*(\d[\d,]*)\s*(k|thousand|lakhs?|lacs?)?\b\s*({_CURRENCY})?"
+)
+PRICE_MULTIPLIERS = {"k": 1000, "thousand": 1000, "lakh": 100_000, "lakhs": 100_000, "lac": 100_000, "lacs": 100_000}
+# A bare number below this after "under" is more likely hours or days than rupees
+MIN_PRICE_CAP = 500
+_BELOW = r"(?:under|below|less than|<|at most|no more than|max(?:imum)?)"
+RAIN_CAP_PATTERN = re.compile(
+    rf"\brain(?:fall)?(?: probability| chance| risk)?(?: of)?\s*{_BELOW}\s*(\d{{1,3}})\s*%"
+    rf"|\b{_BELOW}\s*(\d{{1,3}})\s*%\s*(?:chance|probability|risk)? ?(?:of )?rain\b"
+)
+LOW_RAIN_PATTERN = re.compile(r"\b(?:no rain|without rain|dry weather|low chance of rain|unlikely to rain|not rainy)\b")
+# Highest rain probability, in percent, that "no rain" and the like allow
+LOW_RAIN_PROBABILITY = 20
+NONSTOP_PATTERN = re.compile(
+    r"\b(?:non stop|nonstop|direct|no stops|no layovers?|without (?:a |any )?(?:stops?|layovers?))\b"
+)
+FREE_MEAL_PATTERN = re.compile(
+    r"\b(?:(?:a |with |including )?(?:free|complimentary|included) (?:meal|meals|food)|meals? included)\b"
+)
+SORT_PATTERNS = (
+    (re.compile(
+        r"\b(?:trade ?offs?|(?:cheapest|cheap) (?:vs|versus|or|and) (?:fastest|quickest)"
+        r"|(?:fastest|quickest) (?:vs|versus|or|and) (?:cheapest|cheap)|price vs (?:duration|time))\b"
+    ), "pareto"),
+    (re.compile(r"\b(?:best value|value for money|best overall|best balance)\b"), "score"),
+    (re.compile(r"\b(?:fastest|quickest|shortest|least travel time|least time)\b"), "duration"),
+    (re.compile(
+        r"\b(?:(?:with|including|plus) (?:a |one )?(?:checked )?(?:bag|bags|luggage|baggage|suitcase)"
+        r"|checked (?:bag|bags|luggage|baggage))\b"
+    ), "price_with_luggage"),
+)
+LIMIT_PATTERN = re.compile(rf"\b(?:top )?{_NUMBER} (?:options|alternatives|choices|flights|cheapest flights)\b")
+ANYWHERE_IN_PATTERN = re.compile(r"\b(?:anywhere|any city|any airport|somewhere) in (?=\w)")
+MULTI_OPTION_PATTERN = re.compile(r"\b(options|alternatives|choices)\b")
+# Same cues as the LLM prompt's limit_per_leg rules
+CHEAPEST_PATTERN = re.compile(r"\b(?:cheapest|cheap|budget|lowest price)\b")
+
+
+def month_date_range(month_num: int, today: date, year: Optional[int] = None) -> tuple[date, date]:
+    """
+    First and last day of a month. Without an explicit year, months earlier than
+    the current one refer to next year.
+    """
+    if year is None:
+        year = today.year + 1 if month_num < today.month else today.year
+    last_day_num = calendar.monthrange(year, month_num)[1]
+    return date(year, month_num, 1), date(year, month_num, last_day_num)
+
+
+def _number(token: str) -> int:
+    return int(token) if token.isdigit() else NUMBER_WORDS[token]
+
+
+class FastIntentParser:
+    """
+    Rule-based intent extractor for the common, fully-specified query shapes.
+
+    Cities are matched against a gazetteer built from the flight table plus the
+    aliases in locations.py; trip type, dates, durations and result counts come from
+    compiled patterns. parse() returns the extracted parameters with a confidence in
+    [0, 1] so the caller can fall back to the LLM when the query isn't understood.
+    """
+
+    def __init__(self, cities: Iterable[str], countries: Iterable[str] = ()):
+        # Countries and "anywhere" are places too: they widen the search to many routes
+        self.cities = {city.lower(): city for city in cities if city}
+        self.cities.update({country.lower(): country for country in countries if country})
+        self.cities["anywhere"] = "anywhere"
+        names = set(self.cities)
+        names.update(alias for alias, canonical in CITY_ALIASES.items() if canonical in self.cities)
+        alternation = "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+        self.city_pattern = re.compile(rf"\b(?:(from|to) )?({alternation})\b") if names else None
+
+    @classmethod
+    def from_catalog(cls, catalog: LocationCatalog) -> "FastIntentParser":
+        return cls(catalog.cities.values(), catalog.countries.values())
+
+    @classmethod
+    def build(cls, db: Session) -> "FastIntentParser":
+        return cls.from_catalog(LocationCatalog.build(db))
+
+    def parse(
+        self, query: str, today: Optional[date] = None
+    ) -> tuple[Optional[schemas.FlightSearchParameters], float]:
+        today = today or date.today()
+        found: dict = {}
+        plus_minus = PLUS_MINUS_PATTERN.search(query)
+        if plus_minus:
+            found["flexible_days"] = int(plus_minus.group(1))
+            query = f"{query[:plus_minus.start()]} {query[plus_minus.end():]}"
+        query = query.lower()
+        price_cap = PRICE_CAP_PATTERN.search(query)
+        if price_cap:
+            amount = int(price_cap.group(2).replace(",", "")) * PRICE_MULTIPLIERS.get(price_cap.group(3), 1)
+            if price_cap.group(1) or price_cap.group(3) or price_cap.group(4) or amount >= MIN_PRICE_CAP:
+                found["max_price"] = amount
+                query = f"{query[:price_cap.start()]} {query[price_cap.end():]}"
+        rain_cap = RAIN_CAP_PATTERN.search(query)
+        if rain_cap:
+            found["max_rain_probability"] = float(rain_cap.group(1) or rain_cap.group(2))
+            query = f"{query[:rain_cap.start()]} {query[rain_cap.end():]}"
+        # normalize_query canonicalizes aliases, so matched names are gazetteer keys
+        text = f" {normalize_query(query)} "
+        # "anywhere in Vietnam" means the country itself
+        text = ANYWHERE_IN_PATTERN.sub("", text)
+
+        def consume(pattern: re.Pattern, handler) -> None:
+            nonlocal text
+            text = pattern.sub(lambda m: " " if handler(m) is not False else m.group(0), text)
+
+        # Trip type ("no return" must be checked before "return")
+        def one_way(m):
+            found.setdefault("trip_type", "one_way")
+        def round_trip(m):
+            found.setdefault("trip_type", "round_trip")
+        consume(ONE_WAY_PATTERN, one_way)
+        consume(ROUND_TRIP_PATTERN, round_trip)
+
+        # Flexibility around the dates, and which days of the week to leave on
+        def flexible(m):
+            found.setdefault("flexible_days", _number(m.group(1) or m.group(2)))
+        consume(FLEXIBLE_PATTERN, flexible)
+        def around(m):
+            found.setdefault("flexible_days", AROUND_FLEXIBLE_DAYS)
+        consume(AROUND_PATTERN, around)
+        def departure_days(m):
+            found.setdefault("departure_days", "weekend" if m.group(1).startswith("weekend") else "weekday")
+        consume(DEPARTURE_DAYS_PATTERN, departure_days)
+
+        # Filters and sort order
+        def nonstop(m):
+            found["nonstop_only"] = True
+        consume(NONSTOP_PATTERN, nonstop)
+        def free_meal(m):
+            found["free_meal_only"] = True
+        consume(FREE_MEAL_PATTERN, free_meal)
+        def low_rain(m):
+            found.setdefault("max_rain_probability", float(LOW_RAIN_PROBABILITY))
+        consume(LOW_RAIN_PATTERN, low_rain)
+        for pattern, sort_by in SORT_PATTERNS:
+            consume(pattern, lambda m, sort_by=sort_by: found.setdefault("sort_by", sort_by))
+
+        # Dates: exact days, then relative phrases, then whole months
+        def exact_day(day_token, month_token, year_token):
+            month_num = MONTHS[month_token]
+            year = int(year_token) if year_token else today.year
+            try:
+                target = date(year, month_num, int(day_token))
+            except ValueError:
+                return False
+            if not year_token and target < today:
+                target = target.replace(year=year + 1)
+            found.setdefault("dates", (target, target))
+        consume(DAY_MONTH_PATTERN, lambda m: exact_day(m.group(1), m.group(2), m.group(3)))
+        consume(MONTH_DAY_PATTERN, lambda m: exact_day(m.group(2), m.group(1), m.group(3)))
+
+        def relative(m):
+            phrase = m.group(1)
+            if phrase in ("today", "tonight"):
+                span = (today, today)
+            elif phrase == "tomorrow":
+                span = (today + timedelta(days=1),) * 2
+            elif phrase == "day after tomorrow":
+                span = (today + timedelta(days=2),) * 2
+            elif phrase == "this week":
+                span = (today, today + timedelta(days=6 - today.weekday()))
+            elif phrase == "next week":
+                monday = today + timedelta(days=7 - today.weekday())
+                span = (monday, monday + timedelta(days=6))
+            else:
+                next_month = (today.replace(day=1) + timedelta(days=32)).month
+                span = month_date_range(next_month, today)
+            found.setdefault("dates", span)
+        consume(RELATIVE_PATTERN, relative)
+
+        def month(m):
+            year = int(m.group(2)) if m.group(2) else None
+            found.setdefault("dates", month_date_range(MONTHS[m.group(1)], today, year))
+        consume(MONTH_PATTERN, month)
+
+        # Trip length (a range of stays, or one length) and number of results
+        def stay_range(m):
+            scale = 7 if m.group(3).startswith("week") else 1
+            shortest, longest = sorted((_number(m.group(1)) * scale, _number(m.group(2)) * scale))
+            if shortest == longest:
+                return False
+            found.setdefault("stay", (shortest, longest))
+        consume(STAY_RANGE_PATTERN, stay_range)
+
+        def duration(m):
+            if m.group(3) or m.group(4):
+                days = 14 if m.group(3) else 7
+            else:
+                days = _number(m.group(1)) * (7 if m.group(2).startswith("week") else 1)
+            found.setdefault("trip_duration_days", days)
+        consume(DURATION_PATTERN, duration)
+
+        def limit(m):
+            found.setdefault("limit_per_leg", _number(m.group(1)))
+        consume(LIMIT_PATTERN, limit)
+        if "limit_per_leg" not in found and MULTI_OPTION_PATTERN.search(text):
+            found["limit_per_leg"] = schemas.DEFAULT_LIMIT_PER_LEG
+        elif "limit_per_leg" not in found and CHEAPEST_PATTERN.search(text):
+            found["limit_per_leg"] = schemas.CHEAPEST_LIMIT_PER_LEG
+
+        # Cities: an explicit "from"/"to" wins, otherwise the first mention is the origin
+        mentions: list[tuple[Optional[str], str]] = []
+        def city(m):
+            mentions.append((m.group(1), self.cities[CITY_ALIASES.get(m.group(2), m.group(2))]))
+        if self.city_pattern is not None:
+            consume(self.city_pattern, city)
+        origin = next((c for role, c in mentions if role == "from"), None)
+        destination = next((c for role, c in mentions if role == "to"), None)
+        for _, name in mentions:
+            if origin is None and name != destination:
+                origin = name
+            elif destination is None and name != origin:
+                destination = name
+
+        params = schemas.FlightSearchParameters(
+            trip_type=found.get("trip_type"),
+            origin=origin,
+            destination=destination,
+            trip_duration_days=found.get("trip_duration_days"),
+            limit_per_leg=found.get("limit_per_leg", schemas.DEFAULT_LIMIT_PER_LEG),
+            flexible_days=found.get("flexible_days"),
+            departure_days=found.get("departure_days"),
+            nonstop_only=found.get("nonstop_only"),
+            free_meal_only=found.get("free_meal_only"),
+            max_rain_probability=found.get("max_rain_probability"),
+            max_price=found.get("max_price"),
+            sort_by=found.get("sort_by"),
+        )
+        if "stay" in found:
+            params.min_trip_days, params.max_trip_days = found["stay"]
+        if "dates" in found:
+            start, end = found["dates"]
+            params.departure_date_start = start.strftime('%Y-%m-%d')
+            params.departure_date_end = end.strftime('%Y-%m-%d')
+
+        # Confidence: every essential field present and nothing left unexplained
+        leftover = [word for word in text.split() if word not in FILLER_WORDS]
+        confidence = 1.0
+        if origin is None or destination is None or origin == destination:
+            confidence -= 0.6
+        if len({name for _, name in mentions}) > 2:
+            confidence -= 0.3
+        if params.trip_type is None:
+            confidence -= 0.4
+        confidence -= 0.15 * len(leftover)
+        return params, max(confidence, 0.0)
@@ -0,0 +1,161 @@
+# flexible_dates.py
+"""
+Flexible-date searches: "around 15 December ±3 days", "on a weekend in November",
+"a 5 to 8 day round trip". The answer is the best option for every candidate
+departure day, found in one pass over each route's date-sorted price series rather
+than one query per date.
+
+For one-way searches that is the first (cheapest) flight of each day group. For
+round trips the cheapest return for every outbound day over a stay of min..max days
+is a sliding-window minimum over the return route's per-day cheapest fares,
+computed with the van Herk/Gil-Werman algorithm: a constant number of comparisons
+per day however wide the stay range is.
+"""
+
+from datetime import date, timedelta
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import schemas
+
+# date.weekday() values each departure_days option allows
+DEPARTURE_DAYS = {"weekday": (0, 1, 2, 3, 4), "weekend": (5, 6)}
+# Bounds on what a search may ask for, so a bad extraction can't widen it without limit
+MAX_FLEXIBLE_DAYS = 30
+MAX_STAY_DAYS = 60
+
+# Key of a day with no flight in a per-day series
+NO_FLIGHT = np.iinfo(np.int64).max
+
+
+class FlexibleDates(NamedTuple):
+    """A resolved flexible search. start/end are None (any date) or both set."""
+    start: Optional[date]
+    end: Optional[date]
+    # Weekdays a departure may fall on (date.weekday() values); None allows any
+    weekdays: Optional[tuple[int, ...]]
+    # (shortest, longest) stay in days for round trips; None means any return after the departure
+    stay: Optional[tuple[int, int]]
+
+
+def from_params(params: schemas.FlightSearchParameters) -> Optional[FlexibleDates]:
+    """The flexible search `params` asks for, or None for a regular one."""
+    if not params.has_flexible_dates():
+        return None
+    start = date.fromisoformat(params.departure_date_start) if params.departure_date_start else None
+    end = date.fromisoformat(params.departure_date_end) if params.departure_date_end else start
+    if start is not None:
+        spread = timedelta(days=min(max(params.flexible_days or 0, 0), MAX_FLEXIBLE_DAYS))
+        start, end = start - spread, max(start, end) + spread
+
+    stay = None
+    shortest, longest = params.min_trip_days, params.max_trip_days
+    if shortest is None and longest is None and params.trip_duration_days:
+        shortest = longest = params.trip_duration_days
+    if shortest is not None or longest is not None:
+        shortest = min(max(shortest if shortest is not None else 1, 0), MAX_STAY_DAYS)
+        longest = min(max(longest if longest is not None else MAX_STAY_DAYS, 0), MAX_STAY_DAYS)
+        stay = (min(shortest, longest), max(shortest, longest))
+    return FlexibleDates(start, end, DEPARTURE_DAYS.get(params.departure_days), stay)
+
+
+def weekday_mask(ordinals: np.ndarray, weekdays: Optional[tuple[int, ...]]) -> np.ndarray:
+    """True for the day numbers (date.toordinal()) that fall on one of `weekdays`."""
+    if weekdays is None:
+        return np.ones(len(ordinals), dtype=bool)
+    # Ordinal 1 (0001-01-01) was a Monday
+    return np.isin((np.asarray(ordinals, dtype=np.int64) + 6) % 7, weekdays)
+
+
+def sliding_minimum(values: np.ndarray, width: int) -> np.ndarray:
+    """
+    min(values[i:i + width]) for every full window, i.e. len(values) - width + 1 results.
+
+    van Herk/Gil-Werman: split the series into blocks of `width`, take running minima
+    forwards and backwards within each block, and every window is the minimum of one
+    backward value (the rest of its first block) and one forward value (the start of
+    the next).
+    """
+    count = len(values) - width + 1
+    if width <= 0 or count <= 0:
+        return np.empty(0, dtype=values.dtype)
+    if width == 1:
+        return values.copy()
+    blocks = -(-len(values) // width)
+    padded = np.full(blocks * width, np.iinfo(values.dtype).max, dtype=values.dtype)
+    padded[:len(values)] = values
+    grid = padded.reshape(blocks, width)
+    forward = np.minimum.accumulate(grid, axis=1).ravel()
+    backward = np.minimum.accumulate(grid[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.minimum(backward[:count], forward[width - 1:width - 1 + count])
+
+
+def cheapest_per_day(
+    dates: np.ndarray, prices: np.ndarray, limit: int, ids: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Positions of the cheapest entry on each day (ties broken by `ids`, else by position),
+    cheapest days first and earlier days first among equal prices, at most `limit`.
+    """
+    if limit <= 0 or len(dates) == 0:
+        return np.empty(0, dtype=np.int64)
+    keys = (prices, dates) if ids is None else (ids, prices, dates)
+    order = np.lexsort(keys)
+    _, firsts = np.unique(dates[order], return_index=True)
+    best = order[firsts]
+    return best[np.lexsort((dates[best], prices[best]))[:limit]]
+
+
+def cheapest_round_trips_per_day(
+    out_dates: np.ndarray,
+    out_prices: np.ndarray,
+    in_dates: np.ndarray,
+    in_prices: np.ndarray,
+    weekdays: Optional[tuple[int, ...]] = None,
+    stay: Optional[tuple[int, int]] = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The cheapest (outbound, return) pair for every outbound day of one route.
+
+    Dates are day numbers. Outbound days must fall on `weekdays`; the return departs
+    stay[0]..stay[1] days after the outbound, or on any later day when `stay` is None.
+    Both legs should be sorted by (date, price, id), as in the FlightIndex, so equal
+    fares resolve to the lowest id and returns to the earliest date.
+
+    Returns (outbound positions, return positions, total prices), one entry per
+    outbound day that has a valid pair, in day order.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    out_dates = np.asarray(out_dates, dtype=np.int64)
+    out_prices = np.asarray(out_prices, dtype=np.int64)
+    in_dates = np.asarray(in_dates, dtype=np.int64)
+    in_prices = np.asarray(in_prices, dtype=np.int64)
+
+    candidates = np.flatnonzero(weekday_mask(out_dates, weekdays))
+    if len(candidates) == 0 or len(in_dates) == 0:
+        return empty, empty, empty
+    # Cheapest outbound of each day
+    order = candidates[np.lexsort((out_prices[candidates], out_dates[candidates]))]
+    days, firsts = np.unique(out_dates[order], return_index=True)
+    out_best = order[firsts]
+
+    first_day, last_day = int(days[0]), int(days[-1])
+    shortest, longest = stay if stay is not None else (1, max(1, int(in_dates.max()) - first_day))
+
+    # Cheapest return per day over every day a return could fall on, keyed so the
+    # minimum also says which flight it is
+    series_start = first_day + shortest
+    span = last_day + longest - series_start + 1
+    keys = in_prices * len(in_prices) + np.arange(len(in_prices), dtype=np.int64)
+    series = np.full(span, NO_FLIGHT, dtype=np.int64)
+    offsets = in_dates - series_start
+    inside = (offsets >= 0) & (offsets < span)
+    np.minimum.at(series, offsets[inside], keys[inside])
+
+    # window[j] covers returns for an outbound on day first_day + j
+    window = sliding_minimum(series, longest - shortest + 1)[days - first_day]
+    valid = window != NO_FLIGHT
+    out_pos = out_best[valid]
+    in_pos = window[valid] % len(in_prices)
+    return out_pos, in_pos, out_prices[out_pos] + in_prices[in_pos]
@@ -0,0 +1,540 @@
+# flight_index.py
+
+import heapq
+import json
+import mmap
+import os
+import struct
+from datetime import date
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+import models
+from flexible_dates import FlexibleDates, cheapest_per_day, cheapest_round_trips_per_day, weekday_mask
+from locations import LocationCatalog
+from ranking import RankingColumns, RankingOptions, columns_from_rows, rank, ranked_round_trips
+from round_trip import cheapest_round_trips
+
+
+class FlightRow(NamedTuple):
+    """
+    Lightweight, read-only stand-in for models.Flight carrying the FlightBase columns.
+    `link` is still packed (see links.py) until a response serializes it.
+    """
+    id: int
+    uuid: str
+    date: date
+    origin: str
+    destination: str
+    airline: str
+    duration: str
+    flight_type: str
+    price_inr: int
+    link: str | bytes
+
+
+# Columns pulled from the flight table, in FlightRow order
+INDEX_COLUMNS = (
+    models.Flight.id,
+    models.Flight.uuid,
+    models.Flight.date,
+    models.Flight.origin,
+    models.Flight.destination,
+    models.Flight.airline,
+    models.Flight.duration,
+    models.Flight.flight_type,
+    models.Flight.price_inr,
+    models.Flight.link,
+    # Not part of FlightRow: used to resolve country and wildcard searches to routes
+    models.Flight.origin_country,
+    models.Flight.destination_country,
+    # Numeric columns for filters and sort orders (see ranking.py)
+    models.Flight.duration_minutes,
+    models.Flight.stops,
+    models.Flight.free_meal,
+    models.Flight.rain_probability,
+    models.Flight.total_with_min_luggage,
+)
+
+# Just the FlightRow columns, for queries that only return results
+ROW_COLUMNS = INDEX_COLUMNS[:len(FlightRow._fields)]
+
+
+# --- Memory-mapped file format ---
+# Magic, then the length of a JSON header describing every array (dtype, length,
+# offset past the header), then the arrays themselves, each 64-byte aligned.
+# Fixed-width columns are stored as is; text columns as a string table.
+MAPPED_MAGIC = b"FLTIDX\x00\x02"
+MAPPED_PREFIX = struct.Struct("<8sQ")
+MAPPED_ALIGNMENT = 64
+
+# Fixed-width columns and their on-disk (little-endian) dtypes
+FIXED_COLUMNS = {
+    "ids": "<i8", "dates": "<i4", "prices": "<i8", "airline_ids": "<i4", "route_starts": "<i8",
+    "luggage_prices": "<i8", "duration_minutes": "<i4", "stops": "<i1", "free_meal": "<i1", "rain_probability": "<f4",
+}
+# Per-row text columns; links may be packed bytes, any of them may be NULL
+STRING_COLUMNS = ("uuids", "durations", "flight_types", "links")
+
+# String table value kinds
+_NULL, _TEXT, _BYTES = 0, 1, 2
+
+
+def _align(offset: int) -> int:
+    return -(-offset // MAPPED_ALIGNMENT) * MAPPED_ALIGNMENT
+
+
+def _string_table(values: list) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(kinds, offsets, blob) for a column of str / bytes / None values."""
+    kinds = np.empty(len(values), dtype=np.uint8)
+    chunks = []
+    for i, value in enumerate(values):
+        if value is None:
+            kinds[i] = _NULL
+            chunks.append(b"")
+        elif isinstance(value, str):
+            kinds[i] = _TEXT
+            chunks.append(value.encode())
+        else:
+            kinds[i] = _BYTES
+            chunks.append(bytes(value))
+    offsets = np.zeros(len(values) + 1, dtype="<i8")
+    np.cumsum([len(chunk) for chunk in chunks], out=offsets[1:])
+    return kinds, offsets, np.frombuffer(b"".join(chunks), dtype=np.uint8)
+
+
+class StringTable:
+    """Read-only, list-like view of a string table inside a mapped index file."""
+
+    def __init__(self, kinds: np.ndarray, offsets: np.ndarray, blob: np.ndarray):
+        # Memoryviews index several times faster than NumPy scalars; the cast to native
+        # int64 is free on little-endian machines
+        self._kinds = kinds.data.cast("B")
+        self._offsets = offsets.astype(np.int64, copy=False).data.cast("B").cast("q")
+        self._blob = blob.data.cast("B")
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def __getitem__(self, pos: int):
+        kind = self._kinds[pos]
+        if kind == _NULL:
+            return None
+        value = bytes(self._blob[self._offsets[pos]:self._offsets[pos + 1]])
+        return value.decode() if kind == _TEXT else value
+
+
+class FlightIndex:
+    """
+    In-process columnar index over the flight table.
+
+    All rows live in flat NumPy arrays sorted by (route, date, price), so every
+    (origin, destination) pair owns one contiguous slice with its dates in order.
+    Date filters become two binary searches inside that slice and top-k cheapest
+    is an argpartition over the w prices in the date window, so a leg lookup costs
+    O(log n + w): linear in the window, not in the table. save writes the columns to
+    a file that open_mapped maps back read-only, so processes can share one copy.
+    """
+
+    def __init__(self, rows: Iterable[tuple]):
+        rows = [r for r in rows if r[2] is not None and r[8] is not None]
+        n = len(rows)
+
+        route_keys: dict[tuple[str, str], int] = {}
+        route_ids = np.empty(n, dtype=np.int32)
+        ids = np.empty(n, dtype=np.int64)
+        dates = np.empty(n, dtype=np.int32)
+        prices = np.empty(n, dtype=np.int64)
+        for i, r in enumerate(rows):
+            route_ids[i] = route_keys.setdefault((r[3], r[4]), len(route_keys))
+            ids[i] = r[0]
+            dates[i] = r[2].toordinal()
+            prices[i] = r[8]
+
+        # Primary key is the route, then date; price and id only break ties
+        order = np.lexsort((ids, prices, dates, route_ids))
+        route_ids = route_ids[order]
+        self.ids = ids[order]
+        self.dates = dates[order]
+        self.prices = prices[order]
+
+        airline_names: dict[str, int] = {}
+        airline_ids = np.empty(n, dtype=np.int32)
+        uuids, durations, flight_types, links = [], [], [], []
+        for pos, i in enumerate(order):
+            r = rows[i]
+            airline_ids[pos] = airline_names.setdefault(r[5], len(airline_names))
+            uuids.append(r[1])
+            durations.append(r[6])
+            flight_types.append(r[7])
+            links.append(r[9])
+        self.airline_ids = airline_ids
+        self.airlines = list(airline_names)
+
+        # Ranking columns; rows from queries without them rank as unknowns
+        if n and len(rows[0]) > 12:
+            ranking = columns_from_rows((r[0], r[8], r[16], r[12], r[13], r[14], r[15]) for r in rows).take(order)
+        else:
+            ranking = columns_from_rows((r[0], r[8], None, None, None, None, None) for r in rows).take(order)
+        self.luggage_prices = ranking.luggage_prices
+        self.duration_minutes = ranking.duration_minutes
+        self.stops = ranking.stops
+        self.free_meal = ranking.free_meal
+        self.rain_probability = ranking.rain_probability
+        self.uuids = uuids
+        self.durations = durations
+        self.flight_types = flight_types
+        self.links = links
+
+        # Route -> [start, stop) bounds into the sorted columns
+        self.route_names = list(route_keys)
+        self.routes: dict[tuple[str, str], tuple[int, int]] = {}
+        self.route_starts = np.empty(0, dtype=np.int64)
+        self.route_order: list[tuple[str, str]] = []
+        if n:
+            boundaries = np.flatnonzero(np.diff(route_ids)) + 1
+            starts = np.concatenate(([0], boundaries))
+            stops = np.concatenate((boundaries, [n]))
+            for start, stop in zip(starts.tolist(), stops.tolist()):
+                route = self.route_names[route_ids[start]]
+                self.routes[route] = (start, stop)
+                self.route_order.append(route)
+            self.route_starts = starts.astype(np.int64)
+
+        # Countries per route, for "anywhere in Vietnam" style searches
+        self.route_countries: dict[tuple[str, str], tuple[str, str]] = {}
+        for r in rows:
+            if len(r) > 11:
+                self.route_countries.setdefault((r[3], r[4]), (r[10], r[11]))
+        # Data version of a mapped index file; None for one built in process
+        self.version: Optional[str] = None
+        self._init_catalog()
+
+    def _init_catalog(self) -> None:
+        self.catalog = LocationCatalog(
+            [(o, oc) for (o, _), (oc, _) in self.route_countries.items()]
+            + [(d, dc) for (_, d), (_, dc) in self.route_countries.items()]
+        )
+        # Keyed by resolved (kind, name) place pairs; see matching_routes
+        self._matching_routes: dict[tuple, list[tuple[str, str]]] = {}
+
+    @classmethod
+    def build(cls, db: Session) -> "FlightIndex":
+        """Loads the FlightBase columns of every flight in one pass."""
+        return cls(db.query(*INDEX_COLUMNS).all())
+
+    def save(self, path: str, version: str) -> None:
+        """
+        Writes the index to `path` in the format open_mapped reads, tagged with the data
+        `version` it was built from. Written to a temporary file and renamed into place.
+        """
+        arrays = {name: np.ascontiguousarray(getattr(self, name), dtype=dtype) for name, dtype in FIXED_COLUMNS.items()}
+        for name in STRING_COLUMNS:
+            arrays[f"{name}.kinds"], arrays[f"{name}.offsets"], arrays[f"{name}.blob"] = _string_table(
+                list(getattr(self, name))
+            )
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            offset = _align(offset)
+            layout[name] = (array.dtype.str, len(array), offset)
+            offset += array.nbytes
+        header = json.dumps({
+            "version": version,
+            "rows": len(self),
+            "arrays": layout,
+            "airlines": self.airlines,
+            # origin, destination, start, stop, origin country, destination country
+            "routes": [
+                [*route, *self.routes[route], *self.route_countries.get(route, (None, None))]
+                for route in self.route_order
+            ],
+        }).encode()
+        data_start = _align(MAPPED_PREFIX.size + len(header))
+
+        building = f"{path}.{os.getpid()}.building"
+        with open(building, "wb") as f:
+            f.write(MAPPED_PREFIX.pack(MAPPED_MAGIC, len(header)) + header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name][2])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(building, path)
+
+    @classmethod
+    def open_mapped(cls, path: str) -> "FlightIndex":
+        """
+        Opens an index written by save without copying it: the columns are views into a
+        read-only memory map, so every process serving the same file shares one copy
+        through the page cache. Raises ValueError for a file that isn't an index.
+        """
+        with open(path, "rb") as f:
+            # Plain ndarrays over the map: np.memmap views are much slower to slice
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(data) < MAPPED_PREFIX.size:
+            raise ValueError(f"{path} is not a flight index file")
+        magic, header_length = MAPPED_PREFIX.unpack_from(data)
+        if magic != MAPPED_MAGIC:
+            raise ValueError(f"{path} is not a flight index file (or is an unsupported version)")
+        header = json.loads(data[MAPPED_PREFIX.size:MAPPED_PREFIX.size + header_length])
+        data_start = _align(MAPPED_PREFIX.size + header_length)
+
+        arrays = {}
+        for name, (dtype, length, offset) in header["arrays"].items():
+            dtype = np.dtype(dtype)
+            if data_start + offset + length * dtype.itemsize > len(data):
+                raise ValueError(f"{path} is truncated")
+            arrays[name] = np.frombuffer(data, dtype=dtype, count=length, offset=data_start + offset)
+
+        index = cls.__new__(cls)
+        for name in FIXED_COLUMNS:
+            setattr(index, name, arrays[name])
+        for name in STRING_COLUMNS:
+            setattr(index, name, StringTable(arrays[f"{name}.kinds"], arrays[f"{name}.offsets"], arrays[f"{name}.blob"]))
+        index.airlines = header["airlines"]
+        index.route_order = [(origin, destination) for origin, destination, *_ in header["routes"]]
+        index.route_names = index.route_order
+        index.routes = {(o, d): (start, stop) for o, d, start, stop, _, _ in header["routes"]}
+        index.route_countries = {(o, d): (oc, dc) for o, d, _, _, oc, dc in header["routes"]}
+        index.version = header["version"]
+        index._init_catalog()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def matching_routes(self, origin: str, destination: str) -> list[tuple[str, str]]:
+        """Concrete routes for a search whose origin/destination may be a city, a country or a wildcard."""
+        if (origin, destination) in self.routes:
+            return [(origin, destination)]
+        places = (self.catalog.resolve(origin), self.catalog.resolve(destination))
+        # Places the catalog doesn't know match nothing, and stay out of the cache so it is
+        # bounded by the catalog's cities and countries rather than by what users type
+        if any(kind == "city" and (name is None or name.lower() not in self.catalog.cities) for kind, name in places):
+            return []
+        if places not in self._matching_routes:
+            (origin_kind, origin_name), (destination_kind, destination_name) = places
+
+            def matches(kind, name, city, country):
+                return kind == "anywhere" or (country if kind == "country" else city) == name
+
+            self._matching_routes[places] = [
+                route for route in self.route_order
+                if matches(origin_kind, origin_name, route[0], self.route_countries.get(route, (None, None))[0])
+                and matches(destination_kind, destination_name, route[1], self.route_countries.get(route, (None, None))[1])
+            ]
+        return self._matching_routes[places]
+
+    def window(
+        self,
+        origin: str,
+        destination: str,
+        departure_start: Optional[date] = None,
+        departure_end: Optional[date] = None,
+        after_date: Optional[date] = None,
+    ) -> tuple[int, int]:
+        """
+        Returns the [lo, hi) positions of a route's flights that satisfy the date filter.
+        Mirrors the filtering rules of crud.get_flights_by_params.
+        """
+        bounds = self.routes.get((origin, destination))
+        if bounds is None:
+            return 0, 0
+        start, stop = bounds
+        dates = self.dates[start:stop]
+        if departure_start and departure_end:
+            lo = np.searchsorted(dates, departure_start.toordinal(), side="left")
+            hi = np.searchsorted(dates, departure_end.toordinal(), side="right")
+        elif after_date:
+            lo = np.searchsorted(dates, after_date.toordinal(), side="right")
+            hi = len(dates)
+        else:
+            lo, hi = 0, len(dates)
+        return start + int(lo), start + max(int(lo), int(hi))
+
+    def cheapest(self, lo: int, hi: int, limit: int, page_after: Optional[tuple[int, int]] = None) -> np.ndarray:
+        """
+        Positions of the `limit` cheapest rows in [lo, hi), ordered by (price, id) like the
+        SQL lookup. With page_after=(price, id) only rows after that key are considered.
+        """
+        if limit <= 0 or hi <= lo:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.arange(lo, hi)
+        prices = self.prices[lo:hi]
+        if page_after is not None:
+            after_price, after_id = page_after
+            keep = (prices > after_price) | ((prices == after_price) & (self.ids[lo:hi] > after_id))
+            candidates, prices = candidates[keep], prices[keep]
+        if limit < len(prices):
+            # Everything tied with the limit-th price stays in, so ids decide among them
+            cutoff = prices[np.argpartition(prices, limit - 1)[limit - 1]]
+            candidates = candidates[prices <= cutoff]
+        order = np.lexsort((self.ids[candidates], self.prices[candidates]))[:limit]
+        return candidates[order]
+
+    def ranking_columns(self, positions: np.ndarray) -> RankingColumns:
+        return RankingColumns(
+            self.ids[positions], self.prices[positions], self.luggage_prices[positions],
+            self.duration_minutes[positions], self.stops[positions], self.free_meal[positions],
+            self.rain_probability[positions],
+        )
+
+    def row(self, pos: int) -> FlightRow:
+        route = self.route_order[int(np.searchsorted(self.route_starts, pos, side="right")) - 1]
+        return FlightRow(
+            id=int(self.ids[pos]),
+            uuid=self.uuids[pos],
+            date=date.fromordinal(int(self.dates[pos])),
+            origin=route[0],
+            destination=route[1],
+            airline=self.airlines[self.airline_ids[pos]],
+            duration=self.durations[pos],
+            flight_type=self.flight_types[pos],
+            price_inr=int(self.prices[pos]),
+            link=self.links[pos],
+        )
+
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        limit: int,
+        departure_start: Optional[date] = None,
+        departure_end: Optional[date] = None,
+        after_date: Optional[date] = None,
+        page_after: Optional[tuple[int, int]] = None,
+    ) -> list[FlightRow]:
+        """
+        Index-backed equivalent of crud.get_flights_by_params. When the origin or destination
+        is a country or wildcard, each matching route contributes its own top-k and the
+        candidates are merged into a single cheapest-first list.
+        """
+        candidates = [
+            self.cheapest(*self.window(o, d, departure_start, departure_end, after_date), limit, page_after)
+            for o, d in self.matching_routes(origin, destination)
+        ]
+        if not candidates:
+            return []
+        positions = candidates[0] if len(candidates) == 1 else np.concatenate(candidates)
+        if len(candidates) > 1:
+            positions = positions[np.lexsort((self.ids[positions], self.prices[positions]))][:limit]
+        return [self.row(pos) for pos in positions.tolist()]
+
+    def round_trips(
+        self,
+        origin: str,
+        destination: str,
+        limit: int,
+        departure_start: Optional[date] = None,
+        departure_end: Optional[date] = None,
+        trip_duration_days: Optional[int] = None,
+    ) -> list[tuple[FlightRow, FlightRow]]:
+        """
+        Index-backed equivalent of crud.aget_round_trip_flights. Every matching route is
+        paired with its own reverse route, then the cheapest totals across routes win.
+        """
+        candidates = []
+        for o, d in self.matching_routes(origin, destination):
+            lo, hi = self.window(o, d, departure_start, departure_end)
+            in_lo, in_hi = self.routes.get((d, o), (0, 0))
+            out_pos, in_pos, totals = cheapest_round_trips(
+                self.dates[lo:hi], self.prices[lo:hi],
+                self.dates[in_lo:in_hi], self.prices[in_lo:in_hi],
+                limit, trip_duration_days, self.ids[lo:hi],
+            )
+            candidates.extend(zip(totals.tolist(), (lo + out_pos).tolist(), (in_lo + in_pos).tolist()))
+        # Same (total, outbound date, outbound id, inbound id) order as crud._pair_series
+        best = heapq.nsmallest(limit, candidates, key=lambda c: (c[0], self.dates[c[1]], self.ids[c[1]], self.ids[c[2]]))
+        return [(self.row(o), self.row(i)) for _, o, i in best]
+
+    def flexible_search(self, origin: str, destination: str, limit: int, flex: FlexibleDates) -> list[FlightRow]:
+        """
+        Index-backed equivalent of crud.aget_flexible_flights: the cheapest flight on each
+        candidate departure day across the matching routes, cheapest days first.
+        """
+        windows = [self.window(o, d, flex.start, flex.end) for o, d in self.matching_routes(origin, destination)]
+        if not windows:
+            return []
+        positions = np.concatenate([np.arange(lo, hi) for lo, hi in windows])
+        positions = positions[weekday_mask(self.dates[positions], flex.weekdays)]
+        best = cheapest_per_day(self.dates[positions], self.prices[positions], limit, self.ids[positions])
+        return [self.row(pos) for pos in positions[best].tolist()]
+
+    def flexible_round_trips(
+        self, origin: str, destination: str, limit: int, flex: FlexibleDates
+    ) -> list[tuple[FlightRow, FlightRow]]:
+        """
+        Index-backed equivalent of crud.aget_flexible_round_trips: the cheapest pair for each
+        candidate outbound day, over every matching route, cheapest first.
+        """
+        out_parts, in_parts, total_parts = [], [], []
+        for o, d in self.matching_routes(origin, destination):
+            lo, hi = self.window(o, d, flex.start, flex.end)
+            in_lo, in_hi = self.routes.get((d, o), (0, 0))
+            out_pos, in_pos, totals = cheapest_round_trips_per_day(
+                self.dates[lo:hi], self.prices[lo:hi],
+                self.dates[in_lo:in_hi], self.prices[in_lo:in_hi],
+                flex.weekdays, flex.stay,
+            )
+            out_parts.append(lo + out_pos)
+            in_parts.append(in_lo + in_pos)
+            total_parts.append(totals)
+        if not out_parts:
+            return []
+        outbound, inbound = np.concatenate(out_parts), np.concatenate(in_parts)
+        # Routes can share a departure day; the cheapest of them (lowest outbound id on a tie) represents it
+        best = cheapest_per_day(self.dates[outbound], np.concatenate(total_parts), limit, self.ids[outbound])
+        return [(self.row(o), self.row(i)) for o, i in zip(outbound[best].tolist(), inbound[best].tolist())]
+
+    def ranked_search(
+        self,
+        origin: str,
+        destination: str,
+        limit: int,
+        options: RankingOptions,
+        departure_start: Optional[date] = None,
+        departure_end: Optional[date] = None,
+        after_date: Optional[date] = None,
+    ) -> list[FlightRow]:
+        """
+        Index-backed equivalent of crud.aget_ranked_flights: the date window of every
+        matching route, filtered and ranked by `options` in one pass.
+        """
+        windows = [
+            self.window(o, d, departure_start, departure_end, after_date)
+            for o, d in self.matching_routes(origin, destination)
+        ]
+        if not windows:
+            return []
+        positions = np.concatenate([np.arange(lo, hi) for lo, hi in windows])
+        best = rank(self.ranking_columns(positions), options, limit)
+        return [self.row(pos) for pos in positions[best].tolist()]
+
+    def ranked_round_trips(
+        self,
+        origin: str,
+        destination: str,
+        limit: int,
+        options: RankingOptions,
+        departure_start: Optional[date] = None,
+        departure_end: Optional[date] = None,
+        trip_duration_days: Optional[int] = None,
+    ) -> list[tuple[FlightRow, FlightRow]]:
+        """
+        Index-backed equivalent of crud.aget_ranked_round_trips: like round_trips, with both
+        legs filtered and pairs ranked by their summed sort cost.
+        """
+        candidates = []
+        for o, d in self.matching_routes(origin, destination):
+            lo, hi = self.window(o, d, departure_start, departure_end)
+            in_lo, in_hi = self.routes.get((d, o), (0, 0))
+            outbound, inbound = np.arange(lo, hi), np.arange(in_lo, in_hi)
+            out_pos, in_pos, totals = ranked_round_trips(
+                self.dates[outbound], self.ranking_columns(outbound),
+                self.dates[inbound], self.ranking_columns(inbound),
+                options, limit, trip_duration_days,
+            )
+            candidates.extend(zip(totals.tolist(), (lo + out_pos).tolist(), (in_lo + in_pos).tolist()))
+        best = heapq.nsmallest(limit, candidates, key=lambda c: (c[0], self.dates[c[1]], self.ids[c[1]], self.ids[c[2]]))
+        return [(self.row(o), self.row(i)) for _, o, i in best]
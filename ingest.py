@@ -0,0 +1,255 @@
+# ingest.py
+
+import argparse
+import json
+import logging
+from datetime import date
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
+import re
+
+from sqlalchemy import bindparam, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+from fare_calendar import refresh_fare_calendar
+from links import LinkCodec
+from ranking import parse_duration_minutes, parse_stops
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+CHUNK_SIZE = 1 << 20  # characters read from the JSON file at a time
+# A record still open after this many characters means the file is malformed
+# (say, an unterminated string), not that the record is really this large
+MAX_RECORD_CHARS = 16 << 20
+
+# Connection settings for bulk loads: WAL lets readers keep serving while we write,
+# and NORMAL sync is durable enough under WAL while avoiding an fsync per commit.
+BULK_LOAD_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+)
+
+FLIGHT_COLUMNS = tuple(c.name for c in models.Flight.__table__.columns if c.name != "id")
+
+
+def to_snake_case(name):
+    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
+    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+
+
+# Every record repeats the same ~16 keys, so translate each key name only once
+column_name = lru_cache(maxsize=None)(to_snake_case)
+
+
+# A string, with its closing quote captured when the buffer has it, or a structural character
+_RECORD_TOKENS = re.compile(r'"(?:[^"\\]|\\.)*(")?|[{}\[\],]', re.DOTALL)
+
+
+def _record_end(buf: str, pos: int) -> Optional[int]:
+    """
+    Index just past the array element starting at `pos`, found from bracket depth alone,
+    or None if `buf` ends first. Used to step over a record that doesn't decode.
+    """
+    depth = 0
+    for m in _RECORD_TOKENS.finditer(buf, pos):
+        token = m.group()
+        if token[0] == '"':
+            if m.group(1) is None:
+                return None
+        elif token in "{[":
+            depth += 1
+        elif token in "}]":
+            if depth == 0:
+                # A stray closer ends the element; the array's own "]" is left for the caller
+                return m.start() if token == "]" else m.end()
+            depth -= 1
+            if depth == 0:
+                return m.end()
+        elif depth == 0:
+            # The comma before the next element
+            return m.start()
+    return None
+
+
+def iter_json_records(
+    json_path: str, chunk_size: int = CHUNK_SIZE, max_record_chars: int = MAX_RECORD_CHARS
+) -> Iterator[dict]:
+    """
+    Streams the objects of a top-level JSON array one at a time.
+    Only the current chunk and the record being decoded are held in memory.
+    A record that doesn't decode is logged and skipped up to the next one. ValueError
+    is raised if a record stays open for more than `max_record_chars` characters.
+    """
+    decoder = json.JSONDecoder()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        buf = f.read(chunk_size)
+        pos = 0
+        offset = 0  # characters of the file before buf, for error messages
+        eof = not buf
+
+        def skip(chars: str) -> None:
+            nonlocal buf, pos, offset, eof
+            while True:
+                while pos < len(buf) and (buf[pos].isspace() or buf[pos] in chars):
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                offset += len(buf)
+                buf, pos = f.read(chunk_size), 0
+                eof = not buf
+
+        skip("")
+        if pos >= len(buf) or buf[pos] != '[':
+            raise ValueError(f"{json_path} does not contain a JSON array")
+        pos += 1
+
+        while True:
+            skip(",")
+            if pos >= len(buf):
+                raise ValueError(f"{json_path} ended before the JSON array was closed")
+            if buf[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                end = _record_end(buf, pos)
+                if end is not None:
+                    # The whole record is here and still doesn't decode: skip it
+                    logger.warning(
+                        "Skipping malformed record at character %d of %s: %s", offset + pos, json_path, e.msg
+                    )
+                    pos = end
+                    continue
+                if eof:
+                    raise
+                if len(buf) - pos > max_record_chars:
+                    raise ValueError(
+                        f"Record at character {offset + pos} of {json_path} is still open after "
+                        f"{max_record_chars} characters; the file is malformed"
+                    ) from None
+                # The record straddles the chunk boundary: keep the tail and read more
+                more = f.read(chunk_size)
+                eof = not more
+                offset += pos
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield record
+            pos = end
+
+
+def record_to_row(record: dict) -> dict:
+    """Maps a camelCase JSON record onto a full flight table row."""
+    row = dict.fromkeys(FLIGHT_COLUMNS)
+    for key, value in record.items():
+        name = column_name(key)
+        if name in row:
+            row[name] = value
+    if isinstance(row["date"], str):
+        row["date"] = date.fromisoformat(row["date"])
+    row["duration_minutes"] = parse_duration_minutes(row["duration"])
+    row["stops"] = parse_stops(row["flight_type"])
+    return row
+
+
+def batched(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def upsert_statement():
+    """INSERT ... ON CONFLICT(uuid) DO UPDATE, so re-scraped flights replace their old prices."""
+    stmt = sqlite_insert(models.Flight.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=["uuid"],
+        set_={name: stmt.excluded[name] for name in FLIGHT_COLUMNS if name != "uuid"},
+    )
+
+
+def configure_bulk_load(db: Session) -> None:
+    for pragma in BULK_LOAD_PRAGMAS:
+        db.execute(text(pragma))
+
+
+def ingest_json(db: Session, json_path: str, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Streams `json_path` into the flight table with batched executemany upserts keyed by uuid.
+    Safe to run against a populated table: existing flights are updated, new ones inserted.
+    Links are stored packed; a database without a link dictionary trains one on the first batch.
+    The fare calendar is then refreshed for every route the file touched.
+    Returns the number of records processed.
+    """
+    configure_bulk_load(db)
+    stmt = upsert_statement()
+    codec = LinkCodec.load(db)
+    total = 0
+    routes = set()
+    for batch in batched(map(record_to_row, iter_json_records(json_path)), batch_size):
+        if not total and not codec.current:
+            codec.train(db, [row["link"] for row in batch])
+        for row in batch:
+            row["link"] = codec.pack(row["link"])
+        db.execute(stmt, batch)
+        db.commit()
+        routes.update((row["origin"], row["destination"]) for row in batch)
+        total += len(batch)
+    refresh_fare_calendar(db, routes)
+    return total
+
+
+def backfill_derived_columns(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Fills duration_minutes and stops for rows ingested before those columns existed,
+    in batches by id. Returns the number of rows updated.
+    """
+    flight = models.Flight.__table__
+    stmt = (
+        update(flight)
+        .where(flight.c.id == bindparam("row_id"))
+        .values(duration_minutes=bindparam("minutes"), stops=bindparam("stop_count"))
+    )
+    total, last_id = 0, 0
+    while True:
+        rows = db.execute(
+            select(flight.c.id, flight.c.duration, flight.c.flight_type)
+            .where(flight.c.id > last_id, flight.c.duration_minutes.is_(None), flight.c.stops.is_(None))
+            .order_by(flight.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return total
+        db.execute(stmt, [
+            {"row_id": r.id, "minutes": parse_duration_minutes(r.duration), "stop_count": parse_stops(r.flight_type)}
+            for r in rows
+        ])
+        db.commit()
+        total += len(rows)
+        last_id = rows[-1].id
+
+
+if __name__ == "__main__":
+    # Merge a new scrape into the existing database: python ingest.py new-prices.json
+    from database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Upsert flight records from a JSON file.")
+    parser.add_argument("json_path", nargs="?", default="flight-price.json")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        count = ingest_json(db, args.json_path, args.batch_size)
+    finally:
+        db.close()
+    print(f"Upserted {count} records from {args.json_path}.")
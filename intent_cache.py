@@ -0,0 +1,112 @@
+# intent_cache.py
+
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+
+import schemas
+from locations import canonicalize_cities
+
+# "±3 days" is not "3 days" and "under ₹5000" is not "under 5000": these symbols change
+# the parsed intent, so they survive normalization as tokens of their own.
+_PLUS_MINUS = re.compile(r"\+\s*(?:/|or)?\s*-")
+_MEANINGFUL_SYMBOLS = re.compile(r"\s*([±₹%])\s*")
+_PUNCTUATION = re.compile(r"[^\w\s±₹%]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Reduces a transcript to the form used as a cache key:
+    lowercase, "+/-" spelled as "±", punctuation other than ±, ₹ and % dropped,
+    whitespace collapsed and city aliases canonicalized.
+    """
+    text = _PLUS_MINUS.sub("±", query.lower())
+    text = _PUNCTUATION.sub(" ", text)
+    text = _MEANINGFUL_SYMBOLS.sub(r" \1 ", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    return canonicalize_cities(text)
+
+
+class IntentCache:
+    """
+    LRU + TTL cache of extracted FlightSearchParameters keyed by normalized query.
+
+    Keys include the current date because relative phrases ("tomorrow", "next week")
+    resolve differently every day. If `db_path` is given, entries are also written to
+    a small SQLite table so they survive restarts.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS intent_cache (key TEXT PRIMARY KEY, params TEXT, created REAL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(query: str, today: Optional[date] = None) -> str:
+        return f"{(today or date.today()).isoformat()}|{normalize_query(query)}"
+
+    def get(self, query: str) -> Optional[schemas.FlightSearchParameters]:
+        """Returns a fresh copy of the cached intent, or None on a miss."""
+        key = self.make_key(query)
+        now = time.time()
+
+        entry = self._entries.get(key)
+        if entry is None and self._db is not None:
+            row = self._db.execute(
+                "SELECT created, params FROM intent_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                entry = (row[0], row[1])
+                self._store(key, entry)
+
+        if entry is None or now - entry[0] > self.ttl_seconds:
+            if entry is not None:
+                self._evict(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return schemas.FlightSearchParameters.model_validate_json(entry[1])
+
+    def put(self, query: str, params: schemas.FlightSearchParameters) -> None:
+        key = self.make_key(query)
+        entry = (time.time(), params.model_dump_json())
+        self._store(key, entry)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO intent_cache (key, created, params) VALUES (?, ?, ?)",
+                (key, entry[0], entry[1]),
+            )
+            self._db.execute(
+                "DELETE FROM intent_cache WHERE created < ?", (entry[0] - self.ttl_seconds,)
+            )
+            self._db.commit()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _store(self, key: str, entry: tuple[float, str]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _evict(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM intent_cache WHERE key = ?", (key,))
+            self._db.commit()
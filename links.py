@@ -0,0 +1,251 @@
+# links.py
+"""
+Compact storage for booking links. Every scraped Google Flights URL follows one
+template and differs only in three session values: sca_esv (hex), sxsrf (a base64
+token and a millisecond timestamp) and tfs (a base64 protobuf describing the
+itinerary). LinkCodec.pack keeps just those, as raw bytes, with the tfs payload deflated
+against a preset dictionary trained on the dataset's own payloads; a packed link
+is about a quarter of the URL. Links that don't match the template are kept as is.
+
+Links stay packed in SQLite and in the FlightIndex, and are expanded back to the
+exact original URL only for the flights a response includes.
+"""
+
+import argparse
+import base64
+import logging
+import re
+import struct
+import zlib
+from typing import Iterable
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import database
+import models
+
+logger = logging.getLogger(__name__)
+
+LINK_PATTERN = re.compile(
+    r"https://www\.google\.com/travel/flights\?sca_esv=([0-9a-f]{16})&sxsrf=([A-Za-z0-9_-]+):([1-9][0-9]{0,18})"
+    r"&source=flun&uitype=cuAA&hl=en&gl=in&curr=INR&ep=CAE&tfs=([A-Za-z0-9_-]+)&ved=1t:2773&ictx=111"
+)
+LINK_TEMPLATE = (
+    "https://www.google.com/travel/flights?sca_esv={}&sxsrf={}:{}"
+    "&source=flun&uitype=cuAA&hl=en&gl=in&curr=INR&ep=CAE&tfs={}&ved=1t:2773&ictx=111"
+)
+
+# Packed layout: format version, dictionary id (0 = none), sca_esv, sxsrf timestamp,
+# sxsrf token length; then the token bytes and the deflated tfs payload. Version 1
+# stored the dictionary's row id in one byte; it is still read, never written.
+FORMAT_VERSION = 2
+HEADERS = {1: struct.Struct(">BB8sQB"), 2: struct.Struct(">BI8sQB")}
+HEADER = HEADERS[FORMAT_VERSION]
+
+# Larger dictionaries compress slightly better but make every deflate call slower to
+# set up; 8 KB keeps packing at a few tens of microseconds per link
+DICTIONARY_SIZE = 8 * 1024
+DICTIONARY_SAMPLES = 256
+COMPRESSION_LEVEL = 6
+
+
+def _to_base64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _from_base64(text: str) -> bytes | None:
+    """Decoded bytes, or None unless re-encoding them gives back exactly `text`."""
+    try:
+        data = base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+    except ValueError:
+        return None
+    return data if _to_base64(data) == text else None
+
+
+def dictionary_id(data: bytes) -> int:
+    """
+    Id of a dictionary, derived from its contents so it means the same dictionary in
+    every database: a worker swapping snapshots can keep both sets loaded. The top bit
+    is always set, so it never clashes with the small row ids of version 1 links.
+    """
+    return zlib.crc32(data) | 0x80000000
+
+
+def build_dictionary(payloads: list[bytes]) -> bytes:
+    """
+    A preset deflate dictionary made of sample payloads spread across `payloads`.
+    Deflate prefers the nearest match, so the tail of the dictionary matters most.
+    """
+    step = max(1, len(payloads) // DICTIONARY_SAMPLES)
+    return b"".join(payloads[::step])[-DICTIONARY_SIZE:]
+
+
+class LinkCodec:
+    """Packs and expands links using the dictionaries stored in the link_dictionary table."""
+
+    def __init__(self, dictionaries: dict[int, bytes] | None = None, current: int = 0):
+        self.dictionaries = dict(dictionaries or {})
+        # Dictionary new links are packed with; 0 packs without one
+        self.current = current
+
+    @classmethod
+    def load(cls, db: Session) -> "LinkCodec":
+        rows = db.execute(select(models.LinkDictionary.id, models.LinkDictionary.data)).all()
+        dictionaries = {row.id: row.data for row in rows}
+        return cls(dictionaries, max(dictionaries, default=0))
+
+    @classmethod
+    def union(cls, codecs: Iterable["LinkCodec"]) -> "LinkCodec":
+        """One codec that expands links packed by any of `codecs`, packing like the last one."""
+        merged = cls()
+        for codec in codecs:
+            merged.dictionaries.update(codec.dictionaries)
+            merged.current = codec.current
+        return merged
+
+    def train(self, db: Session, urls: Iterable[str]) -> int:
+        """
+        Builds a dictionary from the tfs payloads of `urls`, stores it and packs with it
+        from now on. Returns its id, or 0 when none of the URLs match the template.
+        """
+        payloads = []
+        for url in urls:
+            match = LINK_PATTERN.fullmatch(url) if isinstance(url, str) else None
+            payload = _from_base64(match.group(4)) if match else None
+            if payload:
+                payloads.append(payload)
+        if not payloads:
+            return 0
+        data = build_dictionary(payloads)
+        new_id = dictionary_id(data)
+        if db.get(models.LinkDictionary, new_id) is None:
+            db.add(models.LinkDictionary(id=new_id, data=data))
+            db.commit()
+        self.dictionaries[new_id] = data
+        self.current = new_id
+        logger.info("Trained link dictionary %08x from %d links.", new_id, len(payloads))
+        return new_id
+
+    def pack(self, url):
+        """Packed bytes for a template URL; anything else (including None) is returned unchanged."""
+        if not isinstance(url, str):
+            return url
+        match = LINK_PATTERN.fullmatch(url)
+        if match is None:
+            return url
+        sca_esv, token, timestamp, tfs = match.groups()
+        token_bytes = _from_base64(token)
+        payload = _from_base64(tfs)
+        if token_bytes is None or payload is None or len(token_bytes) > 255 or int(timestamp) >= 1 << 64:
+            return url
+        if self.current:
+            compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15, zdict=self.dictionaries[self.current])
+        else:
+            compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15)
+        header = HEADER.pack(FORMAT_VERSION, self.current, bytes.fromhex(sca_esv), int(timestamp), len(token_bytes))
+        return header + token_bytes + compressor.compress(payload) + compressor.flush()
+
+    def unpack(self, value):
+        """The original URL for a packed link; URLs stored as text are returned unchanged."""
+        if not isinstance(value, (bytes, bytearray, memoryview)):
+            return value
+        value = bytes(value)
+        header = HEADERS.get(value[0]) if value else None
+        if header is None:
+            raise ValueError(f"Unknown packed link format {value[:1]!r}")
+        _, used_id, sca_esv, timestamp, token_length = header.unpack_from(value)
+        if used_id and used_id not in self.dictionaries:
+            raise KeyError(f"Link dictionary {used_id} is not loaded")
+        token_end = header.size + token_length
+        if used_id:
+            decompressor = zlib.decompressobj(-15, zdict=self.dictionaries[used_id])
+        else:
+            decompressor = zlib.decompressobj(-15)
+        payload = decompressor.decompress(value[token_end:]) + decompressor.flush()
+        return LINK_TEMPLATE.format(
+            sca_esv.hex(), _to_base64(value[header.size:token_end]), timestamp, _to_base64(payload)
+        )
+
+
+# Codec used to expand links at serialization time; installed from the database at
+# startup, and loaded on first use by requests served before that (FAST_START)
+link_codec = LinkCodec()
+
+
+def set_link_codec(codec: LinkCodec) -> None:
+    global link_codec
+    link_codec = codec
+
+
+def load_current_dictionaries() -> None:
+    """Adds the dictionaries of the database being served to the installed codec."""
+    try:
+        with database.SessionLocal() as db:
+            loaded = LinkCodec.load(db)
+    except SQLAlchemyError as e:
+        # Tables not created yet: nothing packed to expand either
+        logger.debug("No link dictionaries to load: %s", e)
+        return
+    set_link_codec(LinkCodec.union((loaded, link_codec)))
+
+
+def expand_link(value):
+    try:
+        return link_codec.unpack(value)
+    except KeyError:
+        load_current_dictionaries()
+        return link_codec.unpack(value)
+
+
+def repack_links(db: Session, batch_size: int = 5000) -> int:
+    """
+    Packs links stored as URLs, e.g. in databases built before packing existed.
+    Trains a dictionary first if the database has none. Returns the number of rows packed.
+    """
+    codec = LinkCodec.load(db)
+    flight = models.Flight
+    if not codec.current:
+        sample = db.scalars(select(flight.link).order_by(flight.id).limit(batch_size)).all()
+        codec.train(db, sample)
+    packed = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(flight.id, flight.link).where(flight.id > last_id).order_by(flight.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        changes = []
+        for row in rows:
+            value = codec.pack(row.link)
+            if value is not row.link:
+                changes.append({"flight_id": row.id, "link": value})
+        if changes:
+            db.execute(
+                update(flight.__table__).where(flight.__table__.c.id == bindparam("flight_id")),
+                changes,
+            )
+            db.commit()
+            packed += len(changes)
+    return packed
+
+
+if __name__ == "__main__":
+    # Pack an existing database in place: python links.py --db flight.db
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Pack the booking links of an existing flight database.")
+    parser.add_argument("--db", default="flight.db")
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    models.Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        count = repack_links(db)
+    # Return the freed pages to the filesystem
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+    print(f"Packed {count} links in {args.db}.")
@@ -0,0 +1,93 @@
+# llm_gate.py
+
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class LLMUnavailableError(Exception):
+    """The model could not serve this call right now."""
+
+
+class LLMBusyError(LLMUnavailableError):
+    """Raised immediately when the gate's queue is full."""
+
+
+class LLMTimeoutError(LLMUnavailableError):
+    """Raised when waiting for a slot plus the inference takes longer than the configured timeout."""
+
+
+class LLMGate:
+    """
+    Admission control in front of the local model.
+
+    - Single-flight: concurrent calls with the same key share one in-flight inference.
+    - At most `max_concurrency` inferences run at once; up to `max_queue` more may wait.
+      Beyond that, callers get LLMBusyError straight away instead of piling on.
+    - Each call is bounded by `timeout_seconds`, counted from admission: time spent
+      queued for a slot uses up the same budget as the inference itself.
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 16, timeout_seconds: float = 60.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._admitted = 0
+        self.calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def depth(self) -> int:
+        """Inferences currently running or queued."""
+        return self._admitted
+
+    async def run(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        existing = self._inflight.get(key)
+        if existing is not None:
+            self.coalesced += 1
+            return await asyncio.shield(existing)
+
+        if self._admitted >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise LLMBusyError("The assistant is busy right now.")
+
+        # Counted before the task starts so a burst can't overshoot the limit
+        self._admitted += 1
+        self.calls += 1
+        task = asyncio.ensure_future(self._execute(call))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one disconnecting caller doesn't cancel the inference for the others
+        return await asyncio.shield(task)
+
+    async def _execute(self, call: Callable[[], Awaitable[T]]) -> T:
+        started = False
+
+        async def acquire_and_call() -> T:
+            nonlocal started
+            async with self._semaphore:
+                started = True
+                return await call()
+
+        try:
+            return await asyncio.wait_for(acquire_and_call(), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            stage = "LLM call" if started else "Wait for an LLM slot"
+            raise LLMTimeoutError(f"{stage} exceeded {self.timeout_seconds}s") from None
+        finally:
+            self._admitted -= 1
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._admitted,
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
@@ -2,85 +2,233 @@
 
 from datetime import date, timedelta
 import calendar
+import functools
+import json
+import logging
+import os
+from typing import NamedTuple, Optional
+
 from dotenv import load_dotenv
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama
 import schemas  # <-- CORRECT: Import the schemas module
 
 # Load environment variables
 load_dotenv()
 
-# Your Ollama LLM initialization
-llm = ChatOllama(
+logger = logging.getLogger(__name__)
+
+# How long Ollama keeps the model (and its cached prompt prefix) loaded between requests
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Your Ollama LLM initialization. Created on first use: importing langchain and
+# ollama is the slowest part of starting the app, and workers serving cached or
+# rule-based intents may never need it.
+llm = None
+
+def get_llm():
+    global llm
+    if llm is None:
+        from langchain_ollama import ChatOllama
+
+        llm = ChatOllama(
             model="qwen3:1.7b",
             temperature=0.2,
+            keep_alive=OLLAMA_KEEP_ALIVE,
         )
+    return llm
+
+async def warm_up() -> None:
+    """
+    Has Ollama load the model with a one-token generation, so the first real query doesn't
+    wait for it. The generation starts with the current system prompt, which leaves its
+    evaluated prefix cached for the queries that follow.
+    """
+    prompt = compiled_prompt or compile_prompt(date.today())
+    await get_llm().ainvoke([("system", prompt.text), ("human", "ping")], options={"num_predict": 1})
+
+# --- Prompt compiler ---
+# The system prompt is assembled from the rule sections below, dropping optional
+# sections (least important first) until it and the structured-output schema sent
+# with it fit the token budget. Everything that depends on the date goes last, so the
+# text Ollama has to evaluate before the user's query is the same on every request
+# and every day up to that point, and its cached evaluation can be reused.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1300"))
+# tiktoken encoding used to measure prompts; it approximates the model's own tokenizer
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "cl100k_base")
+
+
+class PromptSection(NamedTuple):
+    title: str
+    rules: tuple[str, ...]
+    # 0 = always kept; higher numbers are dropped first when the prompt is over budget
+    priority: int = 0
+
+
+PROMPT_SECTIONS = (
+    PromptSection("", (
+        "You extract flight search requests into the structured format.",
+    )),
+    PromptSection("trip_type (exactly 'one_way' or 'round_trip')", (
+        "'round trip', 'return', 'return trip', 'both ways', 'back and forth' → 'round_trip'",
+        "'one way', 'single', 'just going', 'no return' → 'one_way'",
+        "Only set it when one of these is said. 'flight from X to Y' alone is ambiguous: leave it null.",
+    )),
+    PromptSection("origin / destination", (
+        "Use the city name: 'from New Delhi' → 'New Delhi', 'to Hanoi' → 'Hanoi'.",
+        "Expand common short names: 'Delhi' → 'New Delhi'.",
+        "A country searches all its cities: 'anywhere in Vietnam', 'to Vietnam' → 'Vietnam'.",
+        "'anywhere', 'any destination' → 'anywhere'.",
+    )),
+    PromptSection("limit_per_leg", (
+        f"'cheapest', 'cheap', 'budget', 'lowest price' → {schemas.CHEAPEST_LIMIT_PER_LEG}",
+        f"'options', 'alternatives' → {schemas.DEFAULT_LIMIT_PER_LEG}",
+        f"default {schemas.DEFAULT_LIMIT_PER_LEG}",
+    )),
+    PromptSection("dates", (
+        "Use YYYY-MM-DD. Compute relative dates such as 'next week' from today's date below.",
+        "A month means its whole range: 'in December' → December 1 to December 31.",
+        "'a week long trip' → trip_duration_days 7.",
+    )),
+    PromptSection("clarification", (
+        "If origin, destination or trip_type is missing, never guess: leave it null and put a short, friendly question "
+        "in clarification_needed.",
+        "Otherwise fill every field you can and leave clarification_needed null.",
+    )),
+    PromptSection("flexible dates (leave null unless asked for)", (
+        "'±3 days', 'give or take 3 days' → flexible_days 3; 'around 15 December' → 15 December with flexible_days 3.",
+        "'on a weekend' → departure_days 'weekend'; 'on weekdays' → 'weekday'.",
+        "'5 to 8 days' → min_trip_days 5, max_trip_days 8 instead of trip_duration_days.",
+    ), priority=1),
+    PromptSection("filters and sort_by (leave null unless asked for)", (
+        "'nonstop', 'direct' → nonstop_only true; 'free meal' → free_meal_only true; 'no rain' → max_rain_probability 20.",
+        "'under ₹20,000', 'below 20k' → max_price 20000.",
+        "sort_by: 'with a bag' → 'price_with_luggage'; 'fastest' → 'duration'; 'best value' → 'score'; "
+        "'cheapest vs fastest' → 'pareto'.",
+    ), priority=2),
+    PromptSection("checks", (
+        "trip_type is exactly 'one_way' or 'round_trip', with the underscore.",
+    ), priority=3),
+    PromptSection("clarification example", (
+        "For a missing trip_type ask: 'Would you like a one-way flight or a round-trip flight from [origin] to [destination]?'",
+    ), priority=4),
+)
+
+
+class CompiledPrompt(NamedTuple):
+    text: str
+    # Prompt plus structured-output schema, as measured against the budget
+    tokens: int
+    for_date: date
+    # Titles of optional sections left out to fit the budget
+    dropped: tuple[str, ...]
+
+
+# Set by load_tokenizer() at startup. tiktoken downloads an encoding it hasn't cached,
+# so prompts are never measured with it before then; until it loads (or if it can't be
+# loaded) token counts are estimated from length.
+tokenizer = None
+
+
+def load_tokenizer() -> None:
+    """Loads the tiktoken encoding once. Blocking (it may download); call off the event loop."""
+    global tokenizer
+    if tokenizer is not None:
+        return
+    try:
+        import tiktoken
+
+        tokenizer = tiktoken.get_encoding(PROMPT_TOKENIZER)
+    except Exception as e:
+        logger.warning("tiktoken encoding %s unavailable (%s); estimating prompt tokens from length", PROMPT_TOKENIZER, e)
+
+
+def count_tokens(text: str) -> int:
+    if tokenizer is None:
+        return -(-len(text) // 4)
+    return len(tokenizer.encode(text))
+
+
+@functools.lru_cache(maxsize=None)
+def schema_text() -> str:
+    """The tool definition with_structured_output sends alongside the prompt on every call."""
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+
+    return json.dumps(convert_to_openai_tool(schemas.FlightSearchParameters))
+
+
+def date_rules(today: date) -> str:
+    """The date-dependent tail of the prompt."""
+    # The February a month-only query would land on
+    february_year = today.year if today.month <= 2 else today.year + 1
+    february_days = calendar.monthrange(february_year, 2)[1]
+    return (
+        f"Today is {today.isoformat()} ({today.strftime('%A')}); tomorrow is {(today + timedelta(days=1)).isoformat()}. "
+        f"A month without a year is in {today.year} if it is {today.strftime('%B')} or later, otherwise in {today.year + 1}. "
+        f"April, June, September and November have 30 days, February {february_year} has {february_days}, the rest 31."
+    )
+
+
+def _render(sections: list[PromptSection], tail: str) -> str:
+    blocks = []
+    for section in sections:
+        lines = "\n".join(f"- {rule}" for rule in section.rules) if section.title else " ".join(section.rules)
+        blocks.append(f"{section.title}:\n{lines}" if section.title else lines)
+    blocks.append(tail)
+    return "\n\n".join(blocks)
+
 
-def get_intent_extraction_chain():
+def compile_prompt(today: date, budget: Optional[int] = None) -> CompiledPrompt:
+    """
+    The system prompt for `today`: PROMPT_SECTIONS with optional sections dropped until
+    it and the schema fit `budget` tokens (PROMPT_TOKEN_BUDGET by default), followed by
+    the date rules.
+    """
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    if tokenizer is None:
+        logger.warning("Measuring the intent prompt with a length estimate; the tiktoken encoding isn't loaded")
+    schema_tokens = count_tokens(schema_text())
+    sections = list(PROMPT_SECTIONS)
+    tail = date_rules(today)
+    text = _render(sections, tail)
+    tokens = schema_tokens + count_tokens(text)
+    dropped = []
+    for section in sorted((s for s in sections if s.priority), key=lambda s: -s.priority):
+        if tokens <= budget:
+            break
+        sections.remove(section)
+        dropped.append(section.title)
+        text = _render(sections, tail)
+        tokens = schema_tokens + count_tokens(text)
+    if tokens > budget:
+        logger.warning(
+            "System prompt and schema are %d tokens, over the %d token budget, with every optional section dropped",
+            tokens, budget,
+        )
+    return CompiledPrompt(text, tokens, today, tuple(dropped))
+
+
+# Prompt of the most recently built chain
+compiled_prompt: Optional[CompiledPrompt] = None
+
+
+def get_intent_extraction_chain(today: Optional[date] = None):
     """
     Creates a chain that extracts flight search parameters into a structured object
-    defined in schemas.py.
+    defined in schemas.py, with the system prompt compiled for `today`.
     """
+    global compiled_prompt
+    from langchain_core.prompts import ChatPromptTemplate
+
     # CORRECT: Reference the class from the imported schemas module
-    structured_llm = llm.with_structured_output(schemas.FlightSearchParameters)
-
-    today = date.today()
-    month_lengths_parts = []
-    for i in range(1, 13):
-        month_name = date(today.year, i, 1).strftime('%B')
-        days_in_month = calendar.monthrange(today.year, i)[1]
-        month_lengths_parts.append(f"{month_name}={days_in_month} days")
-    month_lengths_str = ", ".join(month_lengths_parts)
-
-    system_prompt = f"""
-You are an expert at understanding user requests for flights and extracting them into a structured format.
-The current date is {today.strftime('%Y-%m-%d')}.
-
-SCHEMA FIELD RULES - FOLLOW EXACTLY:
-
-1. trip_type: Must be EXACTLY 'one_way' or 'round_trip' (with underscore)
-   - "round trip", "return", "return trip", "both ways" → 'round_trip'
-   - "one way", "single", "just going" → 'one_way'
-   - If trip type is NOT clearly specified, leave as null and ask for clarification
-
-2. origin: Extract the departure city/airport
-   - "from New Delhi" → "New Delhi"
-   - "Delhi" → "New Delhi" (expand common abbreviations)
-
-3. destination: Extract the arrival city/airport
-   - "to Hanoi" → "Hanoi"
-
-4. limit_per_leg: Number of flight options to return
-   - "cheapest" → 1
-   - "cheap", "budget", "lowest price" → 1
-   - "options", "alternatives" → 3
-   - Default: 3
-
-5. For dates: Use YYYY-MM-DD format
-   - "next week" → calculate actual dates
-   - "in December" → 2024-12-01 to 2024-12-31
-   - "tomorrow" → {(today + timedelta(days=1)).strftime('%Y-%m-%d')}
-
-CLARIFICATION RULE:
-If the user's query is missing essential information like 'origin', 'destination', or 'trip_type', you MUST NOT guess.
-Instead, leave the missing fields as null and fill the 'clarification_needed' field with a friendly question asking for the missing information.
-
-TRIP TYPE CLARIFICATION:
-- If the query says "flight from X to Y" or "cheapest flight from X to Y" without specifying "round trip", "return", "one way", etc., this is AMBIGUOUS.
-- You must ask: "Would you like a one-way flight or a round-trip flight from [origin] to [destination]?"
-
-TRIP TYPE DETECTION LOGIC:
-- ONLY set trip_type if the user explicitly mentions direction keywords
-- Explicit round-trip indicators: "round trip", "return", "return trip", "both ways", "back and forth"
-- Explicit one-way indicators: "one way", "single", "just going", "no return"
-- If NO explicit trip type indicators are found, leave trip_type as null and ask for clarification
-
-EXTRACTION RULES:
-- If the query is complete, extract all the information into the other fields and leave 'clarification_needed' as null.
-- For date ranges, use the context: "in December" means from Dec 1 to Dec 31. The current year is {today.year}. Month lengths: {month_lengths_str}.
-- "a week long trip" means trip_duration_days should be 7.
-- Always double-check that trip_type is exactly 'one_way' or 'round_trip' with underscore.
-"""
+    structured_llm = get_llm().with_structured_output(schemas.FlightSearchParameters)
+
+    compiled_prompt = compile_prompt(today or date.today())
+    logger.info(
+        "Compiled the intent prompt for %s: %d tokens with the schema%s",
+        compiled_prompt.for_date, compiled_prompt.tokens,
+        f" (dropped {', '.join(compiled_prompt.dropped)})" if compiled_prompt.dropped else "",
+    )
+    # Braces would be read as template variables
+    system_prompt = compiled_prompt.text.replace("{", "{{").replace("}", "}}")
 
     prompt = ChatPromptTemplate.from_messages(
         [
@@ -88,5 +236,5 @@ EXTRACTION RULES:
             ("human", "{query}"),
         ]
     )
-    
-    return prompt | structured_llm
\ No newline at end of file
+
+    return prompt | structured_llm
@@ -0,0 +1,92 @@
+# locations.py
+import re
+from typing import Iterable, Optional
+
+import models
+
+# Spoken / alternate names mapped to the city names used in the flight table.
+# Canonical names map to themselves so "New Delhi" is never expanded twice.
+CITY_ALIASES = {
+    "new delhi": "new delhi",
+    "delhi": "new delhi",
+    "mumbai": "mumbai",
+    "bombay": "mumbai",
+    "kolkata": "kolkata",
+    "calcutta": "kolkata",
+    "bangalore": "bangalore",
+    "bengaluru": "bangalore",
+    "hyderabad": "hyderabad",
+    "ahmedabad": "ahmedabad",
+    "hanoi": "hanoi",
+    "ha noi": "hanoi",
+    "ho chi minh city": "ho chi minh city",
+    "ho chi minh": "ho chi minh city",
+    "hcmc": "ho chi minh city",
+    "saigon": "ho chi minh city",
+    "da nang": "da nang",
+    "danang": "da nang",
+}
+
+# Longest aliases first so multi-word names win over their suffixes
+_ALIAS_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(a) for a in sorted(CITY_ALIASES, key=len, reverse=True)) + r")\b"
+)
+
+
+def canonicalize_cities(text: str) -> str:
+    """Rewrites every known city alias in lowercase `text` to its canonical name."""
+    return _ALIAS_PATTERN.sub(lambda m: CITY_ALIASES[m.group(1)], text)
+
+
+# Words that mean "no constraint" for an origin or destination
+ANYWHERE = {"anywhere", "any", "everywhere", "*"}
+
+
+class LocationCatalog:
+    """
+    Known cities and countries from the flight table, used to decide whether a
+    search place is a city, a whole country, or a wildcard.
+    """
+
+    def __init__(self, city_countries: Iterable[tuple[str, str]]):
+        self.cities: dict[str, str] = {}
+        self.countries: dict[str, str] = {}
+        self.cities_by_country: dict[str, set[str]] = {}
+        for city, country in city_countries:
+            if city:
+                self.cities[city.lower()] = city
+            if country:
+                self.countries[country.lower()] = country
+                if city:
+                    self.cities_by_country.setdefault(country, set()).add(city)
+
+    @classmethod
+    def build(cls, db) -> "LocationCatalog":
+        origins = db.query(models.Flight.origin, models.Flight.origin_country).distinct()
+        destinations = db.query(models.Flight.destination, models.Flight.destination_country).distinct()
+        return cls([tuple(r) for r in origins] + [tuple(r) for r in destinations])
+
+    def resolve(self, place: Optional[str]) -> tuple[str, Optional[str]]:
+        """
+        Returns ("anywhere", None), ("country", name) or ("city", name).
+        Unknown places are treated as cities so they simply match nothing.
+        """
+        if place is None:
+            return "city", None
+        key = place.strip().lower()
+        if key in ANYWHERE:
+            return "anywhere", None
+        key = CITY_ALIASES.get(key, key)
+        if key in self.cities:
+            return "city", self.cities[key]
+        if key in self.countries:
+            return "country", self.countries[key]
+        return "city", place
+
+    def matches(self, place: Optional[str], city: str, country: Optional[str]) -> bool:
+        kind, value = self.resolve(place)
+        if kind == "anywhere":
+            return True
+        if kind == "country":
+            return country == value
+        return city == value
@@ -1,54 +1,369 @@
 # main.py
 
+import asyncio
+import hmac
+import logging
+import os
+import time
 from contextlib import asynccontextmanager
-from datetime import date, timedelta, datetime
+from datetime import date, datetime
 import calendar
-from fastapi import FastAPI, Depends
+from typing import Literal, NamedTuple
+import orjson
+from fastapi import FastAPI, Depends, Header, Query, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import ValidationError
+from sse_starlette.sse import EventSourceResponse
 
 import crud
+import fare_calendar
+import flexible_dates
+import ingest
+import links
 import models
 import schemas
 import llm_logic
-from database import SessionLocal, engine
-from query_classifier import is_flight_related_query
+import metrics
+import pagination
+import ranking
+import snapshot
+from database import (
+    AsyncSessionLocal, READ_ONLY, SNAPSHOT_PATH, SessionLocal, add_missing_columns, create_missing_indexes, engine,
+    open_snapshot, use_engines,
+)
+from flight_index import FlightIndex, FlightRow
+from intent_cache import IntentCache
+from llm_gate import LLMGate, LLMUnavailableError
+from fast_intent import FastIntentParser, month_date_range
+from locations import LocationCatalog
+from query_classifier import classify_many, is_flight_related_query
 import logfire
 
-# Create database tables on startup
-models.Base.metadata.create_all(bind=engine)
+# Per-request detail is logged at DEBUG; set LOG_LEVEL=DEBUG to see it
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
 
-# Initialize the LangChain chain
-intent_extraction_chain = llm_logic.get_intent_extraction_chain()
+# The LangChain chain is built on first use (or by the startup warm-up), so importing
+# this module stays cheap. Assign a chain here to replace the LLM, e.g. in benchmarks.
+intent_extraction_chain = None
+# Day the chain's prompt was compiled for; None for a chain assigned from outside
+intent_chain_date: date | None = None
+
+
+def get_intent_chain():
+    """The intent chain, rebuilt when the day changes so its prompt's dates stay current."""
+    global intent_extraction_chain, intent_chain_date
+    today = date.today()
+    if intent_extraction_chain is None or (intent_chain_date is not None and intent_chain_date != today):
+        intent_extraction_chain = llm_logic.get_intent_extraction_chain(today)
+        intent_chain_date = today
+    return intent_extraction_chain
+
+# Default number of LLM extractions a batch request runs at once
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+
+# Cache of extracted intents so repeated transcripts skip the LLM entirely
+intent_cache = IntentCache(
+    max_entries=int(os.getenv("INTENT_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("INTENT_CACHE_TTL", "3600")),
+    db_path=os.getenv("INTENT_CACHE_DB"),
+)
+
+# Bounds and de-duplicates concurrent LLM inferences
+llm_gate = LLMGate(
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "2")),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "16")),
+    timeout_seconds=float(os.getenv("LLM_TIMEOUT", "60")),
+)
+
+# Rule-based parser for fully-specified queries; built from the flight table at startup
+fast_intent_parser: FastIntentParser | None = None
+FAST_INTENT_THRESHOLD = float(os.getenv("FAST_INTENT_THRESHOLD", "0.9"))
 
 # --- Application Lifespan (Startup/Shutdown Events) ---
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+# FAST_START=1 starts serving before the data is loaded (requests arriving earlier fall
+# back to SQLite); LLM_WARMUP=0 skips loading the model into Ollama at startup.
+FAST_START = os.getenv("FAST_START", "0") == "1"
+LLM_WARMUP = os.getenv("LLM_WARMUP", "1") != "0"
+
+# pending -> warming -> ready | failed, per component; reported by /ready
+startup_state = {"data": "pending", "llm": "pending"}
+startup_errors: dict[str, str] = {}
+
+# Version of the data being served: the snapshot's, or "local" for a flight.db built in place
+data_version = "local"
+# Tasks to cancel on shutdown (warm-up, the data file watcher, engine retirement)
+background_tasks: set[asyncio.Task] = set()
+
+
+def run_in_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+class DataState(NamedTuple):
+    """Everything served from one database, built up front so it can be swapped in at once."""
+    version: str
+    link_codec: links.LinkCodec
+    catalog: LocationCatalog
+    parser: FastIntentParser
+    index: FlightIndex | None
+
+
+def load_flight_index(db: Session, version: str, mapped_path: str | None) -> FlightIndex:
+    """
+    The snapshot's prebuilt index file mapped read-only when there is one for this data
+    version, shared with every other worker through the page cache. Otherwise the index
+    is built in this process.
+    """
+    if mapped_path and os.getenv("FLIGHT_INDEX_MMAP", "1") != "0" and os.path.exists(mapped_path):
+        try:
+            index = FlightIndex.open_mapped(mapped_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring flight index file %s: %s", mapped_path, e)
+        else:
+            if index.version == version:
+                logger.info(
+                    "Flight index mapped from %s with %d rows across %d routes.", mapped_path, len(index), len(index.routes)
+                )
+                return index
+            logger.warning(
+                "Flight index file %s is for %s, not %s; building in memory.", mapped_path, index.version, version
+            )
+    index = FlightIndex.build(db)
+    logger.info("Flight index built with %d rows across %d routes.", len(index), len(index.routes))
+    return index
+
+
+def load_data_state(db: Session, version: str, mapped_index_path: str | None = None) -> DataState:
+    catalog = LocationCatalog.build(db)
+    index = None
+    # Serve leg lookups from memory unless explicitly disabled
+    if os.getenv("FLIGHT_INDEX", "1") != "0":
+        index = load_flight_index(db, version, mapped_index_path)
+    return DataState(version, links.LinkCodec.load(db), catalog, FastIntentParser.from_catalog(catalog), index)
+
+
+# Link codecs of every data state a request may still be reading: the current one, plus
+# any swapped out less than REFRESH_GRACE_SECONDS ago. Dictionary ids are content hashes
+# (see links.py), so one codec holding all of them expands each link correctly.
+live_link_codecs: list[links.LinkCodec] = []
+
+
+def install_data_state(state: DataState) -> None:
+    """Makes `state` the one requests read. Synchronous, so no request sees half of it."""
+    global fast_intent_parser, data_version
+    live_link_codecs.append(state.link_codec)
+    links.set_link_codec(links.LinkCodec.union(live_link_codecs))
+    crud.set_location_catalog(state.catalog)
+    fast_intent_parser = state.parser
+    crud.set_flight_index(state.index)
+    data_version = state.version
+
+
+def warm_data() -> None:
     """
-    Handles application startup logic. In this case, it populates the database.
+    Prepares the database and the in-memory structures built from it. A snapshot
+    (FLIGHT_DB_SNAPSHOT) is already complete, so only its schema version is checked.
     """
-    print("Application startup...")
+    version = "local"
+    mapped_index_path = None
+    if not READ_ONLY:
+        models.Base.metadata.create_all(bind=engine)
+        add_missing_columns(models.Base.metadata)
+        create_missing_indexes(models.Base.metadata, models.REPLACED_INDEXES)
     db = SessionLocal()
     try:
-        crud.populate_db_from_json(db)
+        if READ_ONLY:
+            info = snapshot.read_snapshot_info(db)
+            if info is None or info.schema_version != snapshot.SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"Snapshot schema {info and info.schema_version} does not match {snapshot.SCHEMA_VERSION}; rebuild it"
+                )
+            version = info.version
+            mapped_index_path = snapshot.index_path(SNAPSHOT_PATH)
+            logger.info("Serving snapshot %s (%d flights).", info.version, info.flight_count)
+        else:
+            crud.populate_db_from_json(db)
+            fare_calendar.ensure_fare_calendar(db)
+            backfilled = ingest.backfill_derived_columns(db)
+            if backfilled:
+                logger.info("Parsed durations and stops for %d existing flights.", backfilled)
+        install_data_state(load_data_state(db, version, mapped_index_path))
     finally:
         db.close()
+
+
+async def warm_llm() -> None:
+    """Builds the chain and has Ollama load the model. A chain assigned beforehand counts as warm."""
+    if intent_extraction_chain is not None:
+        return
+    # Loaded here, off the event loop, so compiling a prompt never downloads it
+    await asyncio.to_thread(llm_logic.load_tokenizer)
+    get_intent_chain()
+    if LLM_WARMUP:
+        await llm_logic.warm_up()
+
+
+async def warm_component(name: str, work) -> None:
+    startup_state[name] = "warming"
+    started = time.perf_counter()
+    try:
+        await work()
+    except Exception as e:
+        startup_state[name] = "failed"
+        startup_errors[name] = f"{type(e).__name__}: {e}"
+        logger.exception("Warming %s failed", name)
+        return
+    startup_state[name] = "ready"
+    logger.info("Warmed %s in %.2fs.", name, time.perf_counter() - started)
+
+
+# --- Hot data refresh ---
+# A changed data file is built into a new snapshot (see snapshot.py) and its index,
+# catalog and link codec off to the side while the current data keeps serving. Then
+# the session factories and in-memory state are swapped in one synchronous step;
+# requests that already hold a session finish on the old database, whose engines are
+# disposed of after a grace period.
+DATA_REFRESH_PATH = os.getenv("DATA_REFRESH_PATH", "flight-price.json")
+DATA_REFRESH_INTERVAL = float(os.getenv("DATA_REFRESH_INTERVAL", "0"))  # seconds between checks; 0 = don't watch
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+REFRESH_GRACE_SECONDS = float(os.getenv("REFRESH_GRACE_SECONDS", "30"))
+REFRESH_TOKEN = os.getenv("REFRESH_TOKEN")  # enables POST /admin/refresh
+
+refresh_lock = asyncio.Lock()
+# (mtime, size) of the data file when it was last looked at
+data_file_fingerprint: tuple[int, int] | None = None
+
+
+def file_fingerprint(path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def build_data_state(json_path: str):
+    """Snapshot for `json_path` plus its engines and state, or None when it's the data already served."""
+    path = snapshot.build_snapshot(json_path, SNAPSHOT_DIR)
+    new_engine, new_async_engine = open_snapshot(path)
+    with Session(new_engine) as db:
+        version = snapshot.read_snapshot_info(db).version
+        state = load_data_state(db, version, snapshot.index_path(path)) if version != data_version else None
+    if state is None:
+        new_engine.dispose()
+        return None
+    return new_engine, new_async_engine, state
+
+
+async def retire_engines(old_engine, old_async_engine, old_link_codec: links.LinkCodec | None) -> None:
+    await asyncio.sleep(REFRESH_GRACE_SECONDS)
+    await old_async_engine.dispose()
+    old_engine.dispose()
+    if old_link_codec in live_link_codecs:
+        live_link_codecs.remove(old_link_codec)
+        links.set_link_codec(links.LinkCodec.union(live_link_codecs))
+
+
+async def refresh_data(force: bool = False) -> str | None:
+    """
+    Rebuilds from DATA_REFRESH_PATH if it changed since it was last checked (or when
+    forced) and swaps it in. Returns the new data version, or None if nothing changed.
+    """
+    global data_file_fingerprint
+    if startup_state["data"] != "ready":
+        return None
+    async with refresh_lock:
+        fingerprint = await asyncio.to_thread(file_fingerprint, DATA_REFRESH_PATH)
+        if fingerprint is None or (fingerprint == data_file_fingerprint and not force):
+            return None
+        # Recorded up front: a half-written file fails once, then retries when it changes again
+        data_file_fingerprint = fingerprint
+        try:
+            with metrics.stage("data_refresh"):
+                built = await asyncio.to_thread(build_data_state, DATA_REFRESH_PATH)
+        except Exception:
+            metrics.DATA_REFRESHES.inc(outcome="failed")
+            raise
+        if built is None:
+            metrics.DATA_REFRESHES.inc(outcome="unchanged")
+            return None
+        new_engine, new_async_engine, state = built
+        previous_link_codec = live_link_codecs[-1] if live_link_codecs else None
+        # No await between these two lines, so no request mixes old and new data
+        previous = use_engines(new_engine, new_async_engine)
+        install_data_state(state)
+        run_in_background(retire_engines(*previous, previous_link_codec))
+        metrics.DATA_REFRESHES.inc(outcome="swapped")
+        logger.info("Now serving data version %s.", state.version)
+        return state.version
+
+
+async def watch_data_file() -> None:
+    while True:
+        await asyncio.sleep(DATA_REFRESH_INTERVAL)
+        try:
+            await refresh_data()
+        except Exception:
+            logger.exception("Data refresh from %s failed; still serving %s", DATA_REFRESH_PATH, data_version)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Handles application startup logic: loads the data (unless FAST_START), warms
+    the LLM in the background and, with DATA_REFRESH_INTERVAL set, watches the
+    data file for changes. /ready reports when the data and the LLM are warm.
+    """
+    global data_file_fingerprint
+    logger.info("Application startup...")
+    data_file_fingerprint = file_fingerprint(DATA_REFRESH_PATH)
+    run_in_background(warm_component("llm", warm_llm))
+    warm_data_task = warm_component("data", lambda: asyncio.to_thread(warm_data))
+    if FAST_START:
+        run_in_background(warm_data_task)
+    else:
+        await warm_data_task
+        if startup_state["data"] == "failed":
+            raise RuntimeError(f"Startup failed: {startup_errors['data']}")
+    if DATA_REFRESH_INTERVAL > 0:
+        run_in_background(watch_data_file())
     yield
-    print("Application shutdown...")
+    logger.info("Application shutdown...")
+    for task in list(background_tasks):
+        task.cancel()
 
 # Create the FastAPI app instance with the lifespan manager
-app = FastAPI(lifespan=lifespan)
-logfire.configure()  
-logfire.info('Hello, {name}!', name='world') 
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# logfire itself is configured once, in database.py
 logfire.instrument_fastapi(app)
 
+
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    started = time.perf_counter()
+    # The version current when the request arrived; a refresh mid-request doesn't change it
+    version = data_version
+    response = await call_next(request)
+    response.headers["X-Data-Version"] = version
+    # Label by route template rather than raw path, so unknown URLs can't blow up cardinality
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+    )
+    return response
+
 # --- Dependency to get a database session for each request ---
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # --- Helper function to apply logic-based corrections to the LLM's output ---
 def refine_intent_with_guardrails(query: str, params: schemas.FlightSearchParameters) -> schemas.FlightSearchParameters:
@@ -65,15 +380,9 @@ def refine_intent_with_guardrails(query: str, params: schemas.FlightSearchParame
 
         for month_name, month_num in month_map.items():
             if month_name in query_lower:
-                print(f"--- GUARDRAIL ACTIVATED: Correcting missing month: {month_name.title()} ---")
-                
-                year = today.year
-                if month_num < today.month:
-                    year += 1 
+                logger.debug("Guardrail: correcting missing month %s", month_name.title())
                 
-                first_day = date(year, month_num, 1)
-                last_day_num = calendar.monthrange(year, month_num)[1]
-                last_day = date(year, month_num, last_day_num)
+                first_day, last_day = month_date_range(month_num, today)
                 
                 # Override the LLM's faulty output
                 params.departure_date_start = first_day.strftime('%Y-%m-%d')
@@ -83,102 +392,656 @@ def refine_intent_with_guardrails(query: str, params: schemas.FlightSearchParame
     return params
 
 
-# --- Main API Endpoint ---
-@app.post("/transcript", response_model=schemas.ApiResponse)
-async def handle_transcript(
-    request: schemas.TranscriptRequest, db: Session = Depends(get_db)
-):
+# --- User-facing messages shared by the JSON and streaming endpoints ---
+NO_FLIGHTS_MESSAGE = "I searched, but couldn't find any flights matching your criteria."
+UNDERSTANDING_ERROR_MESSAGE = "I'm sorry, I couldn't understand your request. Please make sure to state your origin, destination, and if it's a one-way or round trip."
+SERVER_ERROR_MESSAGE = "Sorry, I encountered an internal error. Please try again."
+BUSY_MESSAGE = "Sorry, I'm handling a lot of requests right now. Please try again in a moment."
+NOT_FLIGHT_RELATED_MESSAGE = "This assistant can only help with flight-related queries."
+
+
+# --- Result serialization ---
+# Search results are FlightRow tuples by the time they get here, so they're laid out
+# as plain dicts/lists and encoded by orjson directly rather than being re-validated
+# through ApiResponse. `link` is the last FlightRow field, so dropping it is a slice;
+# it is stored packed and only expanded here, for the flights actually returned.
+FLIGHT_FIELDS = FlightRow._fields
+FIELDS_WITHOUT_LINK = FLIGHT_FIELDS[:-1]
+
+
+def flight_payload(flights: list, layout: str = "rows", include_links: bool = True):
+    """One dict per flight, or with layout="columnar" one list per field (see schemas.FlightColumns)."""
+    fields = FLIGHT_FIELDS if include_links else FIELDS_WITHOUT_LINK
+    if include_links:
+        flights = [(*flight[:-1], links.expand_link(flight[-1])) for flight in flights]
+    if layout == "columnar":
+        columns = zip(*flights) if flights else [()] * len(fields)
+        return {name: list(values) for name, values in zip(fields, columns)}
+    return [dict(zip(fields, flight)) for flight in flights]
+
+
+def flight_results_response(
+    params: schemas.FlightSearchParameters,
+    flights: list,
+    request: schemas.ResultOptions,
+    next_cursor: str | None = None,
+    round_trips: list | None = None,
+) -> ORJSONResponse:
+    """The /transcript success body, same shape as schemas.ApiResponse."""
+    return ORJSONResponse({
+        "status": "success",
+        "query_type": "flight_related",
+        "sql_query": f"Intent: {str(params)}",
+        "data": flight_payload(flights, request.layout, request.include_links) if flights else NO_FLIGHTS_MESSAGE,
+        "next_cursor": next_cursor,
+        "round_trips": round_trips or None,
+    })
+
+
+def data_round_trips(outbound_flights: list, round_trips: list) -> list:
+    """Re-bases split_round_trips positions onto the combined outbound + inbound `data` list."""
+    return [(o, len(outbound_flights) + i) for o, i in round_trips]
+
+
+# --- Pipeline stages, shared by /transcript and /transcript/stream ---
+def lookup_intent(user_query: str) -> schemas.FlightSearchParameters | None:
     """
-    Processes the user's query, extracts intent, and fetches flight data.
+    Resolves the query without the LLM: from the cache when we've seen this query today,
+    otherwise from the rule-based parser when it is confident. Returns None if neither can.
     """
-    user_query = request.text
-    print(f"Received query: {user_query}")
+    params = intent_cache.get(user_query)
+    if params is not None:
+        metrics.INTENT_SOURCE.inc(source="cache")
+    elif fast_intent_parser is not None:
+        fast_params, confidence = fast_intent_parser.parse(user_query)
+        if confidence >= FAST_INTENT_THRESHOLD:
+            logger.debug("Fast-path intent (confidence %.2f)", confidence)
+            metrics.INTENT_SOURCE.inc(source="fast_path")
+            params = fast_params
+    return params
 
-    is_flight_related = is_flight_related_query(user_query)
-    query_type = "flight_related" if is_flight_related else "other"
-    print(f"Classified as: {query_type}")
 
-    if is_flight_related:
+def fast_intent_fallback(user_query: str) -> schemas.FlightSearchParameters | None:
+    """Rule-based parse regardless of confidence, as long as both cities were found."""
+    if fast_intent_parser is None:
+        return None
+    params, _ = fast_intent_parser.parse(user_query)
+    return params if params.origin and params.destination else None
+
+
+async def extract_intent(user_query: str) -> schemas.FlightSearchParameters:
+    """
+    Resolves the query to search parameters, falling back to the LLM only when
+    lookup_intent can't answer. Guardrails are applied last.
+    """
+    with metrics.stage("intent_lookup"):
+        params = lookup_intent(user_query)
+    if params is None:
         try:
-            # Step 1: Get the initial intent from the LLM
-            params = await intent_extraction_chain.ainvoke({"query": user_query})
-            print(f"Extracted Intent: {params}")
+            # Identical queries already being extracted share that inference
+            with metrics.stage("llm"):
+                params = await llm_gate.run(
+                    IntentCache.make_key(user_query),
+                    lambda: get_intent_chain().ainvoke({"query": user_query}),
+                )
+        except LLMUnavailableError as e:
+            # Model saturated or too slow: a usable low-confidence parse beats an error
+            params = fast_intent_fallback(user_query)
+            if params is None:
+                raise
+            logger.warning("LLM unavailable (%s), using fast-path intent as fallback", e)
+            metrics.INTENT_SOURCE.inc(source="llm_fallback")
+        else:
+            metrics.INTENT_SOURCE.inc(source="llm")
+            intent_cache.put(user_query, params)
+            # Coalesced callers received the same object; guardrails must not mutate it for all of them
+            params = params.model_copy(deep=True)
+    logger.debug("Extracted intent: %s", params)
 
-            # Step 2: Apply guardrails to fix potential LLM mistakes
-            params = refine_intent_with_guardrails(user_query, params)
-            print(f"Refined Intent: {params}")
+    # Apply guardrails to fix potential LLM mistakes
+    with metrics.stage("guardrails"):
+        params = refine_intent_with_guardrails(user_query, params)
+    logger.debug("Refined intent: %s", params)
+    return params
 
-            # Step 3: Proceed with the corrected parameters to find flights
-            all_flights = []
-            
-            dep_start = datetime.strptime(params.departure_date_start, '%Y-%m-%d').date() if params.departure_date_start else None
-            dep_end = datetime.strptime(params.departure_date_end, '%Y-%m-%d').date() if params.departure_date_end else None
 
-            outbound_flights = crud.get_flights_by_params(
+def departure_window(params: schemas.FlightSearchParameters) -> tuple[date | None, date | None]:
+    dep_start = datetime.strptime(params.departure_date_start, '%Y-%m-%d').date() if params.departure_date_start else None
+    dep_end = datetime.strptime(params.departure_date_end, '%Y-%m-%d').date() if params.departure_date_end else None
+    return dep_start, dep_end
+
+
+def split_round_trips(pairs: list) -> tuple[list, list, list]:
+    """
+    Splits (outbound, inbound) itineraries into each leg's distinct flights, in ranking
+    order, plus each itinerary's (outbound position, inbound position) in those lists.
+    One flight can belong to several itineraries but is listed once.
+    """
+    outbound, inbound, round_trips = [], [], []
+    seen: tuple[dict, dict] = ({}, {})
+    for pair in pairs:
+        positions = []
+        for flights, position_of, flight in zip((outbound, inbound), seen, pair):
+            if flight.id not in position_of:
+                position_of[flight.id] = len(flights)
+                flights.append(flight)
+            positions.append(position_of[flight.id])
+        round_trips.append(tuple(positions))
+    return outbound, inbound, round_trips
+
+
+async def search_flights(db: AsyncSession, params: schemas.FlightSearchParameters) -> tuple[list, list, list]:
+    """
+    Finds flights for the extracted intent. Returns (outbound, inbound, round_trips), see
+    split_round_trips; inbound and round_trips are empty for one-way searches or when no
+    return flight exists.
+    """
+    flex = flexible_dates.from_params(params)
+    if flex is not None:
+        return await search_flexible_dates(db, params, flex)
+    options = ranking.from_params(params)
+    if options is not None:
+        return await search_ranked(db, params, options)
+    dep_start, dep_end = departure_window(params)
+
+    if params.trip_type == "round_trip":
+        # Both legs are optimised together so the cheapest total itinerary wins
+        with metrics.stage("round_trip_query"):
+            pairs = await crud.aget_round_trip_flights(
                 db=db,
                 origin=params.origin,
                 destination=params.destination,
                 limit=params.limit_per_leg,
                 departure_start=dep_start,
-                departure_end=dep_end
+                departure_end=dep_end,
+                trip_duration_days=params.trip_duration_days or None
             )
+        if pairs:
+            return split_round_trips(pairs)
 
-            if outbound_flights:
-                all_flights.extend(outbound_flights)
-                actual_outbound_date = outbound_flights[0].date
-
-                if params.trip_type == "round_trip":
-                    if params.trip_duration_days:
-                        return_target_date = actual_outbound_date + timedelta(days=params.trip_duration_days)
-                        inbound_flights = crud.get_flights_by_params(
-                            db=db, origin=params.destination, destination=params.origin,
-                            limit=params.limit_per_leg, departure_start=return_target_date, departure_end=return_target_date
-                        )
-                        if inbound_flights: all_flights.extend(inbound_flights)
-                    else:
-                        inbound_flights = crud.get_flights_by_params(
-                            db=db, origin=params.destination, destination=params.origin,
-                            limit=params.limit_per_leg, after_date=actual_outbound_date
-                        )
-                        if inbound_flights: all_flights.extend(inbound_flights)
-            
-            print("\n--- [DEBUG] Final Flights to be Returned ---")
-            if not all_flights:
-                print("No flights found matching the criteria.")
-            else:
-                for i, flight in enumerate(all_flights):
-                    print(f"  Flight {i+1}: Date='{flight.date}', Origin='{flight.origin}', Destination='{flight.destination}', Price=₹{flight.price_inr}")
-            print("--------------------------------------------\n")
+    # "Cheapest in <period>": the fare calendar knows the cheapest fare, so the price-ordered
+    # index walk starts there instead of stepping over cheaper flights outside the window
+    min_price = None
+    if params.limit_per_leg == 1 and crud.flight_index is None:
+        with metrics.stage("cheapest_fare_query"):
+            min_price = await crud.aget_cheapest_fare(db, params.origin, params.destination, dep_start, dep_end)
 
-            return schemas.ApiResponse(
-                status="success",
-                query_type="flight_related",
-                sql_query=f"Intent: {str(params)}",
-                data=all_flights if all_flights else "I searched, but couldn't find any flights matching your criteria."
+    # One-way search, or a round trip with no return available: outbound leg only
+    with metrics.stage("outbound_query"):
+        outbound_flights = await crud.aget_flights_by_params(
+            db=db,
+            origin=params.origin,
+            destination=params.destination,
+            limit=params.limit_per_leg,
+            departure_start=dep_start,
+            departure_end=dep_end,
+            min_price=min_price
+        )
+    return outbound_flights, [], []
+
+
+async def search_flexible_dates(
+    db: AsyncSession, params: schemas.FlightSearchParameters, flex: flexible_dates.FlexibleDates
+) -> tuple[list, list, list]:
+    """search_flights for flexible dates: the best option per candidate departure day."""
+    if params.trip_type == "round_trip":
+        with metrics.stage("flexible_round_trip_query"):
+            pairs = await crud.aget_flexible_round_trips(
+                db, params.origin, params.destination, params.limit_per_leg, flex
+            )
+        if pairs:
+            return split_round_trips(pairs)
+    with metrics.stage("flexible_query"):
+        outbound_flights = await crud.aget_flexible_flights(
+            db, params.origin, params.destination, params.limit_per_leg, flex
+        )
+    return outbound_flights, [], []
+
+
+async def search_ranked(
+    db: AsyncSession, params: schemas.FlightSearchParameters, options: ranking.RankingOptions
+) -> tuple[list, list, list]:
+    """search_flights with filters or a sort order other than cheapest first."""
+    dep_start, dep_end = departure_window(params)
+    if params.trip_type == "round_trip":
+        with metrics.stage("ranked_round_trip_query"):
+            pairs = await crud.aget_ranked_round_trips(
+                db, params.origin, params.destination, params.limit_per_leg, options,
+                dep_start, dep_end, params.trip_duration_days or None
+            )
+        if pairs:
+            return split_round_trips(pairs)
+    with metrics.stage("ranked_query"):
+        outbound_flights = await crud.aget_ranked_flights(
+            db, params.origin, params.destination, params.limit_per_leg, options, dep_start, dep_end
+        )
+    return outbound_flights, [], []
+
+
+def search_flights_in_index(index: FlightIndex, params: schemas.FlightSearchParameters) -> tuple[list, list, list]:
+    """search_flights against an already-loaded FlightIndex (used by the batch endpoint)."""
+    flex = flexible_dates.from_params(params)
+    if flex is not None:
+        if params.trip_type == "round_trip":
+            pairs = index.flexible_round_trips(params.origin, params.destination, params.limit_per_leg, flex)
+            if pairs:
+                return split_round_trips(pairs)
+        return index.flexible_search(params.origin, params.destination, params.limit_per_leg, flex), [], []
+    dep_start, dep_end = departure_window(params)
+    options = ranking.from_params(params)
+    if options is not None:
+        if params.trip_type == "round_trip":
+            pairs = index.ranked_round_trips(
+                params.origin, params.destination, params.limit_per_leg, options,
+                dep_start, dep_end, params.trip_duration_days or None
             )
+            if pairs:
+                return split_round_trips(pairs)
+        return index.ranked_search(
+            params.origin, params.destination, params.limit_per_leg, options, dep_start, dep_end
+        ), [], []
+    if params.trip_type == "round_trip":
+        pairs = index.round_trips(
+            params.origin, params.destination, params.limit_per_leg,
+            departure_start=dep_start, departure_end=dep_end,
+            trip_duration_days=params.trip_duration_days or None
+        )
+        if pairs:
+            return split_round_trips(pairs)
+    outbound_flights = index.search(
+        params.origin, params.destination, params.limit_per_leg,
+        departure_start=dep_start, departure_end=dep_end
+    )
+    return outbound_flights, [], []
+
+
+def log_flights(flights: list) -> None:
+    logger.debug("Returning %d flight(s)", len(flights))
+    for i, flight in enumerate(flights):
+        logger.debug(
+            "  Flight %d: date=%s origin=%s destination=%s price=₹%s",
+            i + 1, flight.date, flight.origin, flight.destination, flight.price_inr
+        )
+
+
+def count_outcome(endpoint: str, query_type: str, error: Exception | None = None) -> None:
+    metrics.TRANSCRIPTS.inc(endpoint=endpoint, query_type=query_type)
+    if error is not None:
+        metrics.ERRORS.inc(query_type=query_type, exception=type(error).__name__)
+
+
+# --- Main API Endpoint ---
+@app.post("/transcript", response_model=schemas.ApiResponse)
+async def handle_transcript(
+    request: schemas.TranscriptRequest, db: AsyncSession = Depends(get_db)
+):
+    """
+    Processes the user's query, extracts intent, and fetches flight data.
+    """
+    user_query = request.text
+    logger.debug("Received query: %s", user_query)
+
+    with metrics.stage("classify"):
+        is_flight_related = is_flight_related_query(user_query)
+    query_type = "flight_related" if is_flight_related else "other"
+    logger.debug("Classified as: %s", query_type)
+
+    if is_flight_related:
+        try:
+            # Step 1 & 2: Get the intent and apply guardrails
+            params = await extract_intent(user_query)
+
+            # Step 3: Proceed with the corrected parameters to find flights
+            outbound_flights, inbound_flights, round_trips = await search_flights(db, params)
+            all_flights = outbound_flights + inbound_flights
+            if logger.isEnabledFor(logging.DEBUG):
+                log_flights(all_flights)
+
+            cursor = pagination.next_cursor(params, outbound_flights, inbound_flights, params.limit_per_leg)
+            with metrics.stage("serialize"):
+                response = flight_results_response(
+                    params, all_flights, request, cursor, data_round_trips(outbound_flights, round_trips)
+                )
+            count_outcome("transcript", "flight_related")
+            return response
 
         except ValidationError as e:
-            print(f"LLM failed to extract required fields: {e}")
+            logger.warning("LLM failed to extract required fields: %s", e)
+            count_outcome("transcript", "understanding_error", e)
             return schemas.ApiResponse(
                 status="error",
                 query_type="understanding_error",
-                data="I'm sorry, I couldn't understand your request. Please make sure to state your origin, destination, and if it's a one-way or round trip."
+                data=UNDERSTANDING_ERROR_MESSAGE
+            )
+
+        except LLMUnavailableError as e:
+            logger.warning("LLM unavailable: %s", e)
+            count_outcome("transcript", "busy", e)
+            return schemas.ApiResponse(
+                status="error",
+                query_type="busy",
+                data=BUSY_MESSAGE
             )
         
         except Exception as e:
-            print(f"An unexpected error occurred in the flight query logic: {e}")
+            logger.exception("An unexpected error occurred in the flight query logic: %s", e)
+            count_outcome("transcript", "server_error", e)
             return schemas.ApiResponse(
                 status="error",
                 query_type="server_error",
-                data="Sorry, I encountered an internal error. Please try again."
+                data=SERVER_ERROR_MESSAGE
             )
             
     else:
+        count_outcome("transcript", "other")
         return schemas.ApiResponse(
             status="success",
             query_type="other",
-            data="This assistant can only help with flight-related queries."
+            data=NOT_FLIGHT_RELATED_MESSAGE
+        )
+
+
+# --- Streaming variant: one server-sent event per completed stage ---
+def sse_event(event: str, data) -> dict:
+    return {"event": event, "data": orjson.dumps(data).decode()}
+
+
+async def transcript_events(request: schemas.TranscriptRequest):
+    """
+    Runs the /transcript pipeline and yields an event as each stage finishes:
+    classification, intent, outbound, inbound (round trips only), then done or error.
+    """
+    user_query = request.text
+    with metrics.stage("classify"):
+        is_flight_related = is_flight_related_query(user_query)
+    query_type = "flight_related" if is_flight_related else "other"
+    yield sse_event("classification", {"query_type": query_type})
+
+    if not is_flight_related:
+        count_outcome("stream", "other")
+        yield sse_event("done", {"status": "success", "query_type": "other", "data": NOT_FLIGHT_RELATED_MESSAGE})
+        return
+
+    try:
+        params = await extract_intent(user_query)
+        yield sse_event("intent", params.model_dump())
+
+        # The session is opened here rather than through Depends, because dependency
+        # teardown runs before a streaming response body is sent
+        async with AsyncSessionLocal() as db:
+            outbound_flights, inbound_flights, round_trips = await search_flights(db, params)
+
+        with metrics.stage("serialize"):
+            outbound_event = sse_event(
+                "outbound", flight_payload(outbound_flights, request.layout, request.include_links)
+            )
+        yield outbound_event
+        if params.trip_type == "round_trip":
+            with metrics.stage("serialize"):
+                inbound_event = sse_event(
+                    "inbound", flight_payload(inbound_flights, request.layout, request.include_links)
+                )
+            yield inbound_event
+            # Each pair is (position in the outbound event, position in the inbound event)
+            yield sse_event("round_trips", round_trips)
+
+        found = bool(outbound_flights or inbound_flights)
+        count_outcome("stream", "flight_related")
+        yield sse_event("done", {
+            "status": "success",
+            "query_type": "flight_related",
+            "data": None if found else NO_FLIGHTS_MESSAGE,
+            "next_cursor": pagination.next_cursor(params, outbound_flights, inbound_flights, params.limit_per_leg),
+        })
+
+    except ValidationError as e:
+        logger.warning("LLM failed to extract required fields: %s", e)
+        count_outcome("stream", "understanding_error", e)
+        yield sse_event("error", {"status": "error", "query_type": "understanding_error", "data": UNDERSTANDING_ERROR_MESSAGE})
+
+    except LLMUnavailableError as e:
+        logger.warning("LLM unavailable: %s", e)
+        count_outcome("stream", "busy", e)
+        yield sse_event("error", {"status": "error", "query_type": "busy", "data": BUSY_MESSAGE})
+
+    except Exception as e:
+        logger.exception("An unexpected error occurred in the flight query logic: %s", e)
+        count_outcome("stream", "server_error", e)
+        yield sse_event("error", {"status": "error", "query_type": "server_error", "data": SERVER_ERROR_MESSAGE})
+
+
+@app.post("/transcript/stream")
+async def stream_transcript(request: schemas.TranscriptRequest):
+    """
+    Server-sent-events version of /transcript, so clients can render each stage
+    (e.g. outbound fares) as soon as it is ready.
+    """
+    logger.debug("Received streaming query: %s", request.text)
+    return EventSourceResponse(transcript_events(request))
+
+# --- Follow-up pages: the cursor already holds the intent, so no classifier or LLM ---
+INVALID_CURSOR_MESSAGE = "This results link has expired or is invalid. Please search again."
+
+
+@app.post("/transcript/more", response_model=schemas.ApiResponse)
+async def handle_next_page(
+    request: schemas.NextPageRequest, db: AsyncSession = Depends(get_db)
+):
+    """
+    Next page of a one-way (or outbound-only) search, continuing after the last flight
+    the cursor saw. Costs one keyset seek regardless of how deep the page is.
+    """
+    try:
+        params, page_after = pagination.decode_cursor(request.cursor)
+    except pagination.InvalidCursorError as e:
+        logger.warning("Rejected cursor: %s", e)
+        count_outcome("more", "invalid_cursor", e)
+        return schemas.ApiResponse(status="error", query_type="invalid_cursor", data=INVALID_CURSOR_MESSAGE)
+
+    page_size = pagination.page_size(request.page_size, params)
+    try:
+        dep_start, dep_end = departure_window(params)
+        with metrics.stage("page_query"):
+            flights = await crud.aget_flights_by_params(
+                db=db,
+                origin=params.origin,
+                destination=params.destination,
+                limit=page_size,
+                departure_start=dep_start,
+                departure_end=dep_end,
+                page_after=page_after
+            )
+        cursor = pagination.next_cursor(params, flights, [], page_size)
+        with metrics.stage("serialize"):
+            response = flight_results_response(params, flights, request, cursor)
+        count_outcome("more", "flight_related")
+        return response
+    except Exception as e:
+        logger.exception("An unexpected error occurred while paging results: %s", e)
+        count_outcome("more", "server_error", e)
+        return schemas.ApiResponse(status="error", query_type="server_error", data=SERVER_ERROR_MESSAGE)
+
+# --- Batch endpoint for replaying logged transcripts ---
+def error_response(e: Exception) -> schemas.ApiResponse:
+    if isinstance(e, ValidationError):
+        logger.warning("LLM failed to extract required fields: %s", e)
+        count_outcome("batch", "understanding_error", e)
+        return schemas.ApiResponse(status="error", query_type="understanding_error", data=UNDERSTANDING_ERROR_MESSAGE)
+    logger.error("An unexpected error occurred in the flight query logic: %s", e, exc_info=e)
+    count_outcome("batch", "server_error", e)
+    return schemas.ApiResponse(status="error", query_type="server_error", data=SERVER_ERROR_MESSAGE)
+
+
+@app.post("/transcripts/batch", response_model=schemas.BatchTranscriptResponse)
+async def handle_transcript_batch(
+    request: schemas.BatchTranscriptRequest, db: AsyncSession = Depends(get_db)
+):
+    """
+    Processes many transcripts in one call. Classification runs over the whole batch,
+    LLM extraction goes through the LLM gate with bounded concurrency, and each
+    (origin, destination) route is loaded once no matter how many items need it.
+    Results come back in request order, with errors reported per item.
+    """
+    texts = [item.text for item in request.items]
+    logger.debug("Received batch of %d queries", len(texts))
+    results: list[schemas.ApiResponse | None] = [None] * len(texts)
+    intents: dict[int, schemas.FlightSearchParameters] = {}
+
+    # Step 1: Classify everything, and resolve what we can without the LLM
+    pending = []
+    with metrics.stage("classify_batch"):
+        classifications = classify_many(texts)
+    for i, (text, is_flight_related) in enumerate(zip(texts, classifications)):
+        if not is_flight_related:
+            count_outcome("batch", "other")
+            results[i] = schemas.ApiResponse(status="success", query_type="other", data=NOT_FLIGHT_RELATED_MESSAGE)
+            continue
+        try:
+            params = lookup_intent(text)
+        except Exception as e:
+            results[i] = error_response(e)
+            continue
+        if params is None:
+            pending.append(i)
+        else:
+            intents[i] = params
+
+    # Step 2: LLM extraction for the rest, through the same gate as /transcript: identical
+    # queries share one inference, and the batch holds at most its concurrency in the gate
+    # at a time, so it neither bypasses the queue limit nor fills it on its own
+    if pending:
+        # A client may ask for less concurrency than the server allows, never more
+        batch_slots = asyncio.Semaphore(min(request.max_concurrency or BATCH_LLM_CONCURRENCY, BATCH_LLM_CONCURRENCY))
+
+        async def extract(text: str) -> schemas.FlightSearchParameters:
+            async with batch_slots:
+                return await llm_gate.run(
+                    IntentCache.make_key(text), lambda: get_intent_chain().ainvoke({"query": text})
+                )
+
+        with metrics.stage("llm_batch"):
+            outputs = await asyncio.gather(*(extract(texts[i]) for i in pending), return_exceptions=True)
+        for i, output in zip(pending, outputs):
+            if isinstance(output, LLMUnavailableError):
+                fallback = fast_intent_fallback(texts[i])
+                if fallback is None:
+                    count_outcome("batch", "busy", output)
+                    results[i] = schemas.ApiResponse(status="error", query_type="busy", data=BUSY_MESSAGE)
+                else:
+                    metrics.INTENT_SOURCE.inc(source="llm_fallback")
+                    intents[i] = fallback
+                continue
+            if isinstance(output, Exception):
+                results[i] = error_response(output)
+                continue
+            metrics.INTENT_SOURCE.inc(source="llm")
+            intent_cache.put(texts[i], output)
+            # Coalesced items share one object; guardrails must not mutate it for all of them
+            intents[i] = output.model_copy(deep=True)
+
+    for i in list(intents):
+        try:
+            intents[i] = refine_intent_with_guardrails(texts[i], intents[i])
+        except Exception as e:
+            results[i] = error_response(e)
+            del intents[i]
+
+    # Step 3: Load every route the batch needs once, then answer each item in memory
+    index = crud.flight_index
+    if index is None and intents:
+        routes = set()
+        for params in intents.values():
+            routes.add((params.origin, params.destination))
+            if params.trip_type == "round_trip":
+                routes.add((params.destination, params.origin))
+        with metrics.stage("route_index_query"):
+            index = await crud.aget_route_index(db, routes)
+
+    for i, params in intents.items():
+        try:
+            outbound_flights, inbound_flights, round_trips = search_flights_in_index(index, params)
+            all_flights = outbound_flights + inbound_flights
+            item = request.items[i]
+            results[i] = schemas.ApiResponse(
+                status="success",
+                query_type="flight_related",
+                sql_query=f"Intent: {str(params)}",
+                data=flight_payload(all_flights, item.layout, item.include_links) if all_flights else NO_FLIGHTS_MESSAGE,
+                next_cursor=pagination.next_cursor(params, outbound_flights, inbound_flights, params.limit_per_leg),
+                round_trips=data_round_trips(outbound_flights, round_trips) or None
+            )
+            count_outcome("batch", "flight_related")
+        except Exception as e:
+            results[i] = error_response(e)
+
+    return schemas.BatchTranscriptResponse(results=results)
+
+# --- Fare calendar grid for a route ---
+@app.get("/calendar", response_model=schemas.FareCalendarResponse)
+async def get_fare_calendar(
+    origin: str,
+    destination: str,
+    granularity: Literal["day", "month"] = "day",
+    start: date | None = Query(None, description="First date (or month) to include"),
+    end: date | None = Query(None, description="Last date (or month) to include"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cheapest, median and count of fares per day or per month, served from the
+    precomputed fare calendar. Aliases, countries and "anywhere" work as in a search;
+    each entry names the route it belongs to.
+    """
+    rows = await crud.aget_fare_calendar(db, origin, destination, granularity, start, end)
+    entries = [
+        schemas.FareCalendarEntry(
+            origin=row.origin,
+            destination=row.destination,
+            period=row.month if granularity == "month" else row.date.isoformat(),
+            min_price=row.min_price,
+            median_price=row.median_price,
+            flight_count=row.flight_count,
+            cheapest_date=row.cheapest_date if granularity == "month" else row.date,
+        )
+        for row in rows
+    ]
+    return schemas.FareCalendarResponse(
+        origin=origin, destination=destination, granularity=granularity, entries=entries
+    )
+
+# --- Prometheus scrape endpoint ---
+@app.get("/metrics")
+def read_metrics():
+    # Gauges mirror counters that the gate and cache already keep for themselves
+    for stat, value in llm_gate.stats().items():
+        metrics.LLM_GATE.set(value, stat=stat)
+    for stat, value in intent_cache.stats().items():
+        metrics.INTENT_CACHE.set(value, stat=stat)
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# --- Readiness probe for load balancers and autoscalers ---
+@app.get("/ready")
+def read_ready():
+    """200 once the data and the LLM are warm, 503 until then (or if warming failed)."""
+    ready = all(state == "ready" for state in startup_state.values())
+    body = {"ready": ready, **startup_state, "data_version": data_version}
+    if startup_errors:
+        body["errors"] = startup_errors
+    return ORJSONResponse(body, status_code=200 if ready else 503)
+
+# --- Manual data refresh, e.g. from the scraper once a new file is in place ---
+@app.post("/admin/refresh")
+async def trigger_refresh(x_refresh_token: str | None = Header(None)):
+    """Rebuilds from DATA_REFRESH_PATH now and swaps it in. Requires REFRESH_TOKEN."""
+    if not REFRESH_TOKEN or not hmac.compare_digest(x_refresh_token or "", REFRESH_TOKEN):
+        return ORJSONResponse({"detail": "Forbidden"}, status_code=403)
+    try:
+        version = await refresh_data(force=True)
+    except Exception as e:
+        logger.exception("Data refresh from %s failed", DATA_REFRESH_PATH)
+        return ORJSONResponse(
+            {"status": "error", "detail": f"{type(e).__name__}: {e}", "data_version": data_version}, status_code=500
         )
+    return {"status": "refreshed" if version else "unchanged", "data_version": data_version}
 
 # --- Root endpoint for health checks ---
 @app.get("/")
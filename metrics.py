@@ -0,0 +1,175 @@
+# metrics.py
+"""
+Counters, gauges and histograms kept in process and rendered in the Prometheus
+text exposition format (served by main.py at /metrics). Small enough that the
+service doesn't need a metrics client library.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+import logfire
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans sub-millisecond index lookups up to a slow local LLM
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REGISTRY: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._sample_lines(key, value))
+        return lines
+
+    def _sample_lines(self, key: tuple, value) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts with a final +Inf slot, then sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][slot] += 1
+            state[1] += value
+
+    def _sample_lines(self, key: tuple, value) -> list[str]:
+        counts, total = value
+        lines, running = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            le = f'le="{_number(bound)}"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {running}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {running}")
+        return lines
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Service metrics ---
+STAGE_SECONDS = Histogram(
+    "flight_search_stage_seconds",
+    "Time spent in each stage of the transcript pipeline.",
+    ("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "flight_search_request_seconds",
+    "Time to produce a response, by route.",
+    ("method", "route"),
+)
+TRANSCRIPTS = Counter(
+    "flight_search_transcripts_total",
+    "Transcripts handled, by endpoint and outcome.",
+    ("endpoint", "query_type"),
+)
+INTENT_SOURCE = Counter(
+    "flight_search_intent_source_total",
+    "Where each search intent came from: cache, fast_path, llm or llm_fallback.",
+    ("source",),
+)
+ERRORS = Counter(
+    "flight_search_errors_total",
+    "Transcripts that failed, by outcome and exception class.",
+    ("query_type", "exception"),
+)
+LLM_GATE = Gauge(
+    "flight_search_llm_gate",
+    "LLM admission control: current depth and cumulative calls, coalesced, rejected and timed-out inferences.",
+    ("stat",),
+)
+DATA_REFRESHES = Counter(
+    "flight_search_data_refreshes_total",
+    "Data refresh attempts: swapped, unchanged or failed.",
+    ("outcome",),
+)
+INTENT_CACHE = Gauge(
+    "flight_search_intent_cache",
+    "Intent cache size, hits and misses.",
+    ("stat",),
+)
+
+
+@contextmanager
+def stage(name: str):
+    """Times a block into STAGE_SECONDS and wraps it in a logfire span of the same name."""
+    started = time.perf_counter()
+    try:
+        with logfire.span("stage {stage}", stage=name):
+            yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
@@ -1,15 +1,15 @@
 # models.py
-from sqlalchemy import Boolean, Column, Integer, String, Float, Date
+from sqlalchemy import Boolean, Column, Integer, LargeBinary, String, Float, Date, Index
 from sqlalchemy.types import Date as SQLDate
 from database import Base
 
 class Flight(Base):
     __tablename__ = "flight"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     uuid = Column(String, unique=True, index=True)
     date = Column(SQLDate)
-    origin = Column(String, index=True)
+    origin = Column(String)
     destination = Column(String, index=True)
     airline = Column(String, index=True)
     duration = Column(String)
@@ -17,9 +17,87 @@ class Flight(Base):
     price_inr = Column(Integer, index=True)
     origin_country = Column(String)
     destination_country = Column(String)
-    link = Column(String)
+    link = Column(String)  # the URL, or its packed bytes (see links.py)
     rain_probability = Column(Integer)
     free_meal = Column(Boolean)
     min_checked_luggage_price = Column(Integer)
     min_checked_luggage_weight = Column(String)
     total_with_min_luggage = Column(Integer)
+    # Parsed from duration and flight_type at ingest, so ranking compares numbers (see ranking.py)
+    duration_minutes = Column(Integer)
+    stops = Column(Integer)
+
+    __table_args__ = (
+        # Leg lookups filter on a route and return the cheapest rows first. With price
+        # ahead of date, SQLite walks the route in price order and stops after `limit`
+        # matches instead of collecting the whole date window and sorting it; date is
+        # still checked inside the index, and round trip series are covered outright.
+        # id follows price so (price_inr, id) ties and page cursors need no sort either.
+        # Check plans with query_plans.py after changing these.
+        Index("ix_flight_route_price_id_date", "origin", "destination", "price_inr", "id", "date"),
+        # "Delhi to anywhere in Vietnam" and "anywhere in India to Hanoi": one indexed scan
+        # across every matching route instead of one query per city
+        Index("ix_flight_origin_dest_country_price_id_date", "origin", "destination_country", "price_inr", "id", "date"),
+        Index("ix_flight_origin_country_dest_price_id_date", "origin_country", "destination", "price_inr", "id", "date"),
+    )
+
+# Indexes superseded by the ones above; dropped from existing databases at startup.
+# origin is the leading column of the route indexes, and id is the rowid already.
+REPLACED_INDEXES = (
+    "ix_flight_id",
+    "ix_flight_origin",
+    "ix_flight_route_price_date",
+    "ix_flight_origin_dest_country_price_date",
+    "ix_flight_origin_country_dest_price_date",
+)
+
+
+class FareCalendarDay(Base):
+    """Price aggregates per route and departure date, rebuilt by fare_calendar.py on ingest."""
+    __tablename__ = "fare_calendar_day"
+
+    origin = Column(String, primary_key=True)
+    destination = Column(String, primary_key=True)
+    date = Column(SQLDate, primary_key=True)
+    min_price = Column(Integer)
+    median_price = Column(Float)
+    flight_count = Column(Integer)
+
+    __table_args__ = (
+        # Cheapest day on a route without sorting the route's calendar
+        Index("ix_fare_calendar_day_route_price", "origin", "destination", "min_price", "date"),
+    )
+
+
+class FareCalendarMonth(Base):
+    """Price aggregates per route and departure month ("YYYY-MM")."""
+    __tablename__ = "fare_calendar_month"
+
+    origin = Column(String, primary_key=True)
+    destination = Column(String, primary_key=True)
+    month = Column(String, primary_key=True)
+    min_price = Column(Integer)
+    median_price = Column(Float)
+    flight_count = Column(Integer)
+    cheapest_date = Column(SQLDate)
+
+
+class SnapshotInfo(Base):
+    """One row describing a prebuilt snapshot database (written by snapshot.py)."""
+    __tablename__ = "snapshot_info"
+
+    version = Column(String, primary_key=True)
+    schema_version = Column(Integer)
+    source_path = Column(String)
+    source_sha256 = Column(String)
+    flight_count = Column(Integer)
+    built_at = Column(String)  # ISO 8601, UTC
+
+
+
+class LinkDictionary(Base):
+    """Preset deflate dictionaries that packed booking links are compressed against (see links.py)."""
+    __tablename__ = "link_dictionary"
+
+    id = Column(Integer, primary_key=True)
+    data = Column(LargeBinary)
\ No newline at end of file
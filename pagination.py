@@ -0,0 +1,67 @@
+# pagination.py
+"""
+Opaque cursors for "show me more". A cursor carries the resolved search parameters
+and the (price_inr, id) key of the last flight already returned, so the next page
+is a single keyset seek: no classification, no LLM extraction and no re-sorting of
+the pages before it.
+"""
+
+import base64
+from typing import Optional
+
+import orjson
+from pydantic import ValidationError
+
+import schemas
+
+CURSOR_VERSION = 1
+# Largest page /transcript/more serves. Cursors aren't signed, so the limit_per_leg a
+# cursor carries is clamped like a requested page_size (see schemas.NextPageRequest).
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursorError(ValueError):
+    """The cursor is malformed or was made by an incompatible version."""
+
+
+def encode_cursor(params: schemas.FlightSearchParameters, last_key: tuple[int, int]) -> str:
+    payload = {"v": CURSOR_VERSION, "params": params.model_dump(exclude_none=True), "after": list(last_key)}
+    return base64.urlsafe_b64encode(orjson.dumps(payload)).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[schemas.FlightSearchParameters, tuple[int, int]]:
+    """Returns (params, page_after) from a cursor made by encode_cursor."""
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if payload.get("v") != CURSOR_VERSION:
+            raise InvalidCursorError(f"Unsupported cursor version {payload.get('v')!r}")
+        params = schemas.FlightSearchParameters.model_validate(payload["params"])
+        after_price, after_id = (int(value) for value in payload["after"])
+    except InvalidCursorError:
+        raise
+    except (ValueError, TypeError, KeyError, AttributeError, ValidationError) as e:
+        raise InvalidCursorError(f"Malformed cursor: {e}") from e
+    return params, (after_price, after_id)
+
+
+def page_size(requested: Optional[int], params: schemas.FlightSearchParameters) -> int:
+    """Flights per follow-up page: `requested`, else the search's limit_per_leg, within 1..MAX_PAGE_SIZE."""
+    return min(max(requested or params.limit_per_leg, 1), MAX_PAGE_SIZE)
+
+
+def next_cursor(
+    params: schemas.FlightSearchParameters, outbound_flights: list, inbound_flights: list, page_size: int
+) -> Optional[str]:
+    """
+    Cursor for the page after `outbound_flights`, or None when there can't be one.
+    Only single-leg results are paged: round trips are ranked by total price of the
+    pair, which a per-leg key can't resume. Neither are flexible-date results, which
+    hold one flight per departure day, nor ranked ones (see ranking.py), which aren't
+    in (price, id) order.
+    """
+    if params.has_flexible_dates() or params.has_ranking():
+        return None
+    if inbound_flights or not outbound_flights or len(outbound_flights) < page_size:
+        return None
+    last = outbound_flights[-1]
+    return encode_cursor(params, (last.price_inr, last.id))
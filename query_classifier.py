@@ -1,5 +1,7 @@
 # query_classifier.py
+from collections import Counter
 from difflib import SequenceMatcher
+from functools import lru_cache
 
 def get_fuzzy_matches(word: str, keywords: set, threshold: float = 0.75) -> bool:
     """
@@ -20,55 +22,96 @@ def get_fuzzy_matches(word: str, keywords: set, threshold: float = 0.75) -> bool
             return True
     return False
 
+class KeywordMatcher:
+    """
+    Precompiled equivalent of get_fuzzy_matches for a fixed keyword set.
+
+    Keywords are lowercased once and bucketed by length. SequenceMatcher.ratio() is
+    2*M/(len(a)+len(b)) where M can't exceed the shorter length or the size of the
+    two words' character-multiset overlap, so whole length buckets and most single
+    keywords are rejected by those bounds before any matcher is built. Decisions are
+    identical to get_fuzzy_matches, and results are memoized per (word, threshold).
+    """
+
+    def __init__(self, keywords: set):
+        self.by_length: dict[int, list[tuple[str, Counter]]] = {}
+        for keyword in sorted({k.lower() for k in keywords}):
+            self.by_length.setdefault(len(keyword), []).append((keyword, Counter(keyword)))
+        self.matches = lru_cache(maxsize=8192)(self._matches)
+
+    def _matches(self, word: str, threshold: float = 0.75) -> bool:
+        word = word.lower()
+        word_len = len(word)
+        word_counts = None
+        for keyword_len, entries in self.by_length.items():
+            total = word_len + keyword_len
+            if 2.0 * min(word_len, keyword_len) / total < threshold:
+                continue
+            if word_counts is None:
+                word_counts = Counter(word)
+            for keyword, keyword_counts in entries:
+                overlap = sum((word_counts & keyword_counts).values())
+                if 2.0 * overlap / total < threshold:
+                    continue
+                if SequenceMatcher(None, word, keyword).ratio() >= threshold:
+                    return True
+        return False
+
+
+# Core flight-related keywords
+FLIGHT_KEYWORDS = {
+    'flight', 'flights', 'fly', 'flying',
+    'air', 'airline', 'airlines', 'airport', 'airports', 'airways',
+    'travel', 'travels', 'trip', 'trips', 'journey', 'journeys',
+    'destination', 'destinations', 'dest',
+    'origin', 'origins', 'route', 'routes', 'path', 'paths', 'connection', 'connections',
+    'price', 'prices', 'fare', 'fares', 'cost', 'costs', 'expensive', 'cheap', 'cheaper', 'cheapest',
+    'direct', 'nonstop', 'non-stop', 'connecting', 'connect',
+    'departure', 'depart', 'departing', 'arrive', 'arrives', 'arriving', 'arrival',
+    'domestic', 'international', 'book', 'booking', 'reserve', 'reservation',
+    'ticket', 'tickets', 'seat', 'seats', 'class', 'economy', 'business', 'first'
+}
+
+# Location indicators that strongly suggest a flight query
+LOCATION_INDICATORS = {'from', 'to', 'between', 'via', 'through'}
+
+# Time-related keywords that in context suggest flights
+TIME_KEYWORDS = {'today', 'tomorrow', 'next', 'week', 'month', 'morning', 'evening', 'night'}
+
+PRICE_SYMBOLS = ('₹', '$', '€', '£', '¥')
+
+# Built once at import; shared by every request
+FLIGHT_KEYWORD_MATCHER = KeywordMatcher(FLIGHT_KEYWORDS)
+PRICE_CONTEXT_MATCHER = KeywordMatcher(FLIGHT_KEYWORDS | TIME_KEYWORDS)
+
+
 def is_flight_related_query(query: str) -> bool:
     """
     Enhanced check for flight-related queries using fuzzy matching for typo tolerance
     """
-    # Core flight-related keywords
-    flight_keywords = {
-        'flight', 'flights', 'fly', 'flying',
-        'air', 'airline', 'airlines', 'airport', 'airports', 'airways',
-        'travel', 'travels', 'trip', 'trips', 'journey', 'journeys',
-        'destination', 'destinations', 'dest',
-        'origin', 'origins', 'route', 'routes', 'path', 'paths', 'connection', 'connections',
-        'price', 'prices', 'fare', 'fares', 'cost', 'costs', 'expensive', 'cheap', 'cheaper', 'cheapest',
-        'direct', 'nonstop', 'non-stop', 'connecting', 'connect',
-        'departure', 'depart', 'departing', 'arrive', 'arrives', 'arriving', 'arrival',
-        'domestic', 'international', 'book', 'booking', 'reserve', 'reservation',
-        'ticket', 'tickets', 'seat', 'seats', 'class', 'economy', 'business', 'first'
-    }
-
-    # Location indicators that strongly suggest a flight query
-    location_indicators = {'from', 'to', 'between', 'via', 'through'}
-
-    # Time-related keywords that in context suggest flights
-    time_keywords = {'today', 'tomorrow', 'next', 'week', 'month', 'morning', 'evening', 'night'}
-
     # Clean and tokenize the query
     query = query.lower().strip()
     query_words = query.split()
+    # Remove punctuation from each word
+    clean_words = [''.join(char for char in word if char.isalnum()) for word in query_words]
 
     # Check each word in the query
-    for word in query_words:
-        # Remove punctuation from word
-        clean_word = ''.join(char for char in word if char.isalnum())
-        
+    for clean_word in clean_words:
         # Exact match for location indicators (these are short and shouldn't be fuzzy matched)
-        if clean_word in location_indicators:
+        if clean_word in LOCATION_INDICATORS:
             return True
 
         # Fuzzy match for flight keywords
-        if get_fuzzy_matches(clean_word, flight_keywords):
+        if FLIGHT_KEYWORD_MATCHER.matches(clean_word):
             return True
 
     # Check for price indicators
-    if any(char in query for char in ['₹', '$', '€', '£', '¥']):
+    if any(char in query for char in PRICE_SYMBOLS):
         # If price symbols are present, check if it's likely about flights
         # by looking for location or travel context
-        for word in query_words:
-            clean_word = ''.join(char for char in word if char.isalnum())
-            if (clean_word in location_indicators or 
-                get_fuzzy_matches(clean_word, flight_keywords | time_keywords, threshold=0.8)):
+        for clean_word in clean_words:
+            if (clean_word in LOCATION_INDICATORS or
+                PRICE_CONTEXT_MATCHER.matches(clean_word, 0.8)):
                 return True
 
     # Check for common flight query patterns
@@ -79,4 +122,12 @@ def is_flight_related_query(query: str) -> bool:
         if to_index > 0 and to_index < len(query_words) - 1:
             return True
 
-    return False
\ No newline at end of file
+    return False
+
+
+def classify_many(queries: list[str]) -> list[bool]:
+    """
+    Classifies a batch of queries. Keyword matches are memoized across the batch,
+    so words repeated between transcripts are only scored once.
+    """
+    return [is_flight_related_query(query) for query in queries]
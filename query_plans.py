@@ -0,0 +1,184 @@
+# query_plans.py
+"""
+Query-plan regression check for the SQL issued by crud.py.
+
+Builds a synthetic flight table (or uses an existing database), runs EXPLAIN QUERY PLAN
+for every query shape the request path can issue and fails if any of them falls back to
+a full table scan or to a temporary B-tree for sorting. Run it after touching models.py
+indexes or the statements in crud.py:
+
+    python query_plans.py                 # synthetic 200k-row table in a temp file
+    python query_plans.py --rows 1000000
+    python query_plans.py --db flight.db  # plans against a real database
+
+tests/test_query_plans.py runs the same check on a smaller synthetic table under pytest.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, create_engine, insert, or_, select, text
+from sqlalchemy.engine import Engine
+
+import crud
+import models
+from flexible_dates import FlexibleDates
+from locations import LocationCatalog
+from ranking import RankingOptions, parse_duration_minutes, parse_stops
+
+CITIES = {
+    "India": ["New Delhi", "Mumbai", "Kolkata", "Bangalore", "Hyderabad", "Ahmedabad"],
+    "Vietnam": ["Hanoi", "Ho Chi Minh City", "Da Nang"],
+}
+
+# Plan details that mean a query touches rows it doesn't need
+SCAN_MARKERS = ("SCAN flight", "SCAN fare_calendar")
+SORT_MARKER = "USE TEMP B-TREE"
+
+
+def build_synthetic_db(engine: Engine, rows: int, seed: int = 7) -> None:
+    """Fills an empty database with `rows` flights spread over every city pair, then ANALYZEs it."""
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+    country_of = {city: country for country, cities in CITIES.items() for city in cities}
+    routes = [(o, d) for o in country_of for d in country_of if o != d]
+    first_day = date(2025, 1, 1)
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            origin, destination = routes[i % len(routes)]
+            duration = f"{rng.randrange(2, 20)} hr {rng.randrange(60)} min"
+            flight_type = rng.choice(["Nonstop", "1 stop"])
+            batch.append({
+                "uuid": f"synthetic-{i}",
+                "date": first_day + timedelta(days=rng.randrange(365)),
+                "origin": origin,
+                "destination": destination,
+                "airline": rng.choice(["IndiGo", "Air India", "VietJet", "Vietnam Airlines"]),
+                "duration": duration,
+                "flight_type": flight_type,
+                "duration_minutes": parse_duration_minutes(duration),
+                "stops": parse_stops(flight_type),
+                "price_inr": rng.randrange(3000, 60000),
+                "origin_country": country_of[origin],
+                "destination_country": country_of[destination],
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(models.Flight), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.Flight), batch)
+    with engine.begin() as conn:
+        calendar_rows = conn.execute(
+            select(models.Flight.origin, models.Flight.destination, models.Flight.date)
+            .distinct()
+        ).all()
+        conn.execute(insert(models.FareCalendarDay), [
+            {"origin": o, "destination": d, "date": day, "min_price": 5000, "median_price": 9000.0, "flight_count": 1}
+            for o, d, day in calendar_rows
+        ])
+        conn.execute(text("ANALYZE"))
+
+
+def query_shapes(catalog: LocationCatalog) -> dict[str, object]:
+    """Every statement shape crud.py issues per request, keyed by a readable name."""
+    crud.set_location_catalog(catalog)
+    start, end = date(2025, 3, 1), date(2025, 3, 31)
+    outbound, inbound = crud._leg_filters("New Delhi", "Hanoi", start, end)
+    country_out, country_in = crud._leg_filters("New Delhi", "Vietnam", start, end)
+    flexible = FlexibleDates(start, end, (5, 6), (3, 6))
+    flexible_out, flexible_in = crud._flexible_filters("New Delhi", "Hanoi", flexible)
+    flexible_country_out, flexible_country_in = crud._flexible_filters("New Delhi", "Vietnam", flexible)
+    ranked = RankingOptions(nonstop_only=True, free_meal_only=True, max_price=20000, sort_by="duration")
+    ranked_out, ranked_in = (and_(leg, crud._ranking_filter(ranked)) for leg in (outbound, inbound))
+    return {
+        "leg: exact date": crud._flights_statement("New Delhi", "Hanoi", 3, start, start),
+        "leg: date range": crud._flights_statement("New Delhi", "Hanoi", 3, start, end),
+        "leg: after date": crud._flights_statement("Hanoi", "New Delhi", 3, after_date=start),
+        "leg: any date": crud._flights_statement("New Delhi", "Hanoi", 3),
+        "leg: city to country": crud._flights_statement("New Delhi", "Vietnam", 3, start, end),
+        "leg: country to city": crud._flights_statement("India", "Hanoi", 3, start, end),
+        "leg: above cheapest fare": crud._flights_statement("New Delhi", "Hanoi", 1, start, end, min_price=9000),
+        "leg: next page": crud._flights_statement("New Delhi", "Hanoi", 5, start, end, page_after=(9000, 42)),
+        "leg: next page, country": crud._flights_statement("New Delhi", "Vietnam", 5, start, end, page_after=(9000, 42)),
+        "round trip: outbound series": select(*crud.SERIES_COLUMNS).where(outbound),
+        "round trip: inbound series": select(*crud.SERIES_COLUMNS).where(inbound),
+        "round trip: combined series": select(
+            *crud.SERIES_COLUMNS, outbound.label("outbound"), inbound.label("inbound")
+        ).where(or_(outbound, inbound)),
+        "round trip: country series": select(*crud.SERIES_COLUMNS).where(or_(country_out, country_in)),
+        "flexible: outbound series": select(*crud.SERIES_COLUMNS).where(flexible_out),
+        "flexible: inbound series": select(*crud.SERIES_COLUMNS).where(flexible_in),
+        "flexible: country series": select(*crud.SERIES_COLUMNS).where(or_(flexible_country_out, flexible_country_in)),
+        "ranked: date range": crud._ranked_statement("New Delhi", "Hanoi", ranked, start, end),
+        "ranked: any date": crud._ranked_statement("New Delhi", "Hanoi", ranked),
+        "ranked: city to country": crud._ranked_statement("New Delhi", "Vietnam", ranked, start, end),
+        "ranked round trip: combined series": select(
+            *crud.RANKED_SERIES_COLUMNS, ranked_out.label("outbound"), ranked_in.label("inbound")
+        ).where(or_(ranked_out, ranked_in)),
+        "round trip: hydrate": select(*crud.ROW_COLUMNS).where(models.Flight.id.in_([1, 2, 3, 4])),
+        "batch: route index": select(*crud.INDEX_COLUMNS).where(or_(
+            crud._route_filter("New Delhi", "Hanoi"), crud._route_filter("Mumbai", "Vietnam")
+        )),
+        "calendar: cheapest fare": crud._cheapest_fare_statement("New Delhi", "Hanoi", start, end),
+        "calendar: cheapest fare, any date": crud._cheapest_fare_statement("New Delhi", "Hanoi"),
+        "calendar: day grid": crud._fare_calendar_statement("New Delhi", "Hanoi", "day", start, end),
+        "calendar: month grid": crud._fare_calendar_statement("New Delhi", "Hanoi", "month", start, end),
+        "calendar: cheapest fare, country": crud._cheapest_fare_statement("New Delhi", "Vietnam", start, end),
+        "calendar: day grid, country": crud._fare_calendar_statement("Delhi", "Vietnam", "day", start, end),
+    }
+
+
+def explain(conn, stmt) -> list[str]:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.construct_params()[name] for name in compiled.positiontup)
+    params = tuple(p.isoformat() if isinstance(p, date) else p for p in params)
+    return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)]
+
+
+def check_query_plans(engine: Engine, catalog: Optional[LocationCatalog] = None) -> dict[str, list[str]]:
+    """Returns {shape: plan} for every shape whose plan scans a whole table or sorts in a temp B-tree."""
+    if catalog is None:
+        catalog = LocationCatalog(
+            (city, country) for country, cities in CITIES.items() for city in cities
+        )
+    failures = {}
+    with engine.connect() as conn:
+        for name, stmt in query_shapes(catalog).items():
+            plan = explain(conn, stmt)
+            bad = [line for line in plan if line.startswith(SCAN_MARKERS) or SORT_MARKER in line]
+            status = "FAIL" if bad else "ok"
+            print(f"[{status:>4}] {name}")
+            for line in plan:
+                print(f"         {line}")
+            if bad:
+                failures[name] = plan
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if any crud.py query needs a full scan or a sort.")
+    parser.add_argument("--db", help="Existing SQLite database to check instead of a synthetic one.")
+    parser.add_argument("--rows", type=int, default=200_000, help="Synthetic flight rows to generate.")
+    args = parser.parse_args()
+
+    if args.db:
+        engine = create_engine(f"sqlite:///{args.db}")
+        failures = check_query_plans(engine)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'plans.db')}")
+            print(f"Building a synthetic table with {args.rows} flights...")
+            build_synthetic_db(engine, args.rows)
+            failures = check_query_plans(engine)
+            engine.dispose()
+
+    if failures:
+        print(f"{len(failures)} query shape(s) regressed: {', '.join(failures)}")
+        sys.exit(1)
+    print("All query plans use an index without a temporary sort.")
@@ -0,0 +1,200 @@
+# ranking.py
+"""
+Filters and sort orders beyond "cheapest first": nonstop only, free meal, a rain
+ceiling or a fare ceiling, ranked by fare with a checked bag, by flight time, by a
+weighted score, or reduced to the Pareto front of fare against flight time.
+
+Everything works on numeric columns prepared ahead of time (duration_minutes and
+stops are parsed at ingest; the FlightIndex keeps the rest as arrays), so ranking a
+route's candidates is a handful of vectorized NumPy operations.
+"""
+
+import os
+import re
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import schemas
+from round_trip import cheapest_round_trips
+
+SORT_MODES = ("price", "price_with_luggage", "duration", "score", "pareto")
+
+# Weighted score, in rupees: fare with a bag plus a price on time and on each stop
+SCORE_INR_PER_HOUR = float(os.getenv("RANK_INR_PER_HOUR", "300"))
+SCORE_INR_PER_STOP = float(os.getenv("RANK_INR_PER_STOP", "1500"))
+# A Pareto front is returned whole up to this many flights, even past limit_per_leg
+PARETO_LIMIT = 10
+
+# Stand-in for a missing duration, stop count or meal flag in the numeric columns
+UNKNOWN = -1
+# Flight time charged to a flight without a duration, so it ranks behind any real one
+UNKNOWN_DURATION_MINUTES = 7 * 24 * 60
+
+_DURATION_PATTERN = re.compile(r"^\s*(?:(\d+)\s*h(?:r|rs|ours?)?)?\s*(?:(\d+)\s*m(?:in|ins|inutes?)?)?\s*$")
+_STOPS_PATTERN = re.compile(r"(\d+)\s*stops?")
+
+
+def parse_duration_minutes(duration: Optional[str]) -> Optional[int]:
+    """Minutes in a duration like "4h 15m" (255) or "4 hr 15 min"; None when it can't be read."""
+    if not duration:
+        return None
+    match = _DURATION_PATTERN.match(duration.lower())
+    if match is None or not any(match.groups()):
+        return None
+    hours, minutes = (int(part) if part else 0 for part in match.groups())
+    return hours * 60 + minutes
+
+
+def parse_stops(flight_type: Optional[str]) -> Optional[int]:
+    """Stops in a flight type: "Nonstop" is 0, "1 stop" is 1; None when it can't be read."""
+    if not flight_type:
+        return None
+    text = flight_type.lower()
+    if text.replace("-", "").replace(" ", "") in ("nonstop", "direct"):
+        return 0
+    match = _STOPS_PATTERN.search(text)
+    return int(match.group(1)) if match else None
+
+
+class RankingOptions(NamedTuple):
+    nonstop_only: bool = False
+    free_meal_only: bool = False
+    max_rain_probability: Optional[float] = None
+    max_price: Optional[int] = None
+    sort_by: str = "price"
+
+
+def from_params(params: schemas.FlightSearchParameters) -> Optional[RankingOptions]:
+    """The ranking `params` asks for, or None when it's plain cheapest-first."""
+    if not params.has_ranking():
+        return None
+    sort_by = params.sort_by if params.sort_by in SORT_MODES else "price"
+    return RankingOptions(
+        bool(params.nonstop_only), bool(params.free_meal_only),
+        params.max_rain_probability, params.max_price, sort_by,
+    )
+
+
+class RankingColumns(NamedTuple):
+    """Aligned numeric columns for a set of candidate flights."""
+    ids: np.ndarray
+    prices: np.ndarray
+    # Fare including the cheapest checked bag (the fare itself when a bag is included)
+    luggage_prices: np.ndarray
+    duration_minutes: np.ndarray  # UNKNOWN when missing
+    stops: np.ndarray  # UNKNOWN when missing
+    free_meal: np.ndarray  # 1, 0 or UNKNOWN
+    rain_probability: np.ndarray  # NaN when missing
+
+    def take(self, positions: np.ndarray) -> "RankingColumns":
+        return RankingColumns(*(column[positions] for column in self))
+
+
+def columns_from_rows(rows) -> RankingColumns:
+    """
+    RankingColumns from (id, price_inr, total_with_min_luggage, duration_minutes, stops,
+    free_meal, rain_probability) rows, with missing values encoded as in the FlightIndex.
+    """
+    rows = list(rows)
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    prices = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+    luggage = np.fromiter((r[2] if r[2] is not None else r[1] for r in rows), dtype=np.int64, count=len(rows))
+    minutes = np.fromiter((r[3] if r[3] is not None else UNKNOWN for r in rows), dtype=np.int32, count=len(rows))
+    stops = np.fromiter((r[4] if r[4] is not None else UNKNOWN for r in rows), dtype=np.int8, count=len(rows))
+    meal = np.fromiter((int(r[5]) if r[5] is not None else UNKNOWN for r in rows), dtype=np.int8, count=len(rows))
+    rain = np.fromiter((r[6] if r[6] is not None else np.nan for r in rows), dtype=np.float32, count=len(rows))
+    return RankingColumns(ids, prices, luggage, minutes, stops, meal, rain)
+
+
+def filter_mask(columns: RankingColumns, options: RankingOptions) -> np.ndarray:
+    """True for the candidates that pass every filter. Unknown values never pass a filter on them."""
+    keep = np.ones(len(columns.ids), dtype=bool)
+    if options.nonstop_only:
+        keep &= columns.stops == 0
+    if options.free_meal_only:
+        keep &= columns.free_meal == 1
+    if options.max_rain_probability is not None:
+        # NaN compares False, so flights without a forecast are dropped too
+        keep &= columns.rain_probability <= options.max_rain_probability
+    if options.max_price is not None:
+        keep &= columns.prices <= options.max_price
+    return keep
+
+
+def sort_cost(columns: RankingColumns, sort_by: str) -> np.ndarray:
+    """
+    Integer cost per candidate for `sort_by`, lower is better. Costs add up across the
+    legs of a round trip. Unknown durations cost UNKNOWN_DURATION_MINUTES.
+    """
+    if sort_by == "price_with_luggage":
+        return columns.luggage_prices
+    if sort_by in ("duration", "score"):
+        minutes = columns.duration_minutes.astype(np.int64)
+        minutes = np.where(minutes == UNKNOWN, UNKNOWN_DURATION_MINUTES, minutes)
+        if sort_by == "duration":
+            return minutes
+        stops = np.maximum(columns.stops.astype(np.int64), 0)
+        return np.rint(
+            columns.luggage_prices + minutes * (SCORE_INR_PER_HOUR / 60) + stops * SCORE_INR_PER_STOP
+        ).astype(np.int64)
+    return columns.prices
+
+
+def pareto_front(prices: np.ndarray, minutes: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """
+    Positions of the flights no other flight beats on both fare and flight time,
+    cheapest (and so slowest) first. Flights without a duration are left out.
+    """
+    candidates = np.flatnonzero(minutes != UNKNOWN)
+    if len(candidates) == 0:
+        return candidates
+    order = candidates[np.lexsort((ids[candidates], minutes[candidates], prices[candidates]))]
+    # A flight is on the front when it is faster than everything cheaper (or as cheap) before it
+    sorted_minutes = minutes[order].astype(np.int64)
+    fastest_before = np.concatenate(([np.iinfo(np.int64).max], np.minimum.accumulate(sorted_minutes)[:-1]))
+    return order[sorted_minutes < fastest_before]
+
+
+def rank(columns: RankingColumns, options: RankingOptions, limit: int) -> np.ndarray:
+    """Positions of the best `limit` candidates for `options`, best first (ties: cheaper, then lower id)."""
+    if limit <= 0 or len(columns.ids) == 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.flatnonzero(filter_mask(columns, options))
+    if len(candidates) == 0:
+        return candidates
+    kept = columns.take(candidates)
+    if options.sort_by == "pareto":
+        return candidates[pareto_front(kept.prices, kept.duration_minutes, kept.ids)[:max(limit, PARETO_LIMIT)]]
+    cost = sort_cost(kept, options.sort_by)
+    if limit < len(cost):
+        # Everything tied with the limit-th cost stays in, so the tie-breakers decide among them
+        cutoff = cost[np.argpartition(cost, limit - 1)[limit - 1]]
+        within = np.flatnonzero(cost <= cutoff)
+        candidates, kept, cost = candidates[within], kept.take(within), cost[within]
+    return candidates[np.lexsort((kept.ids, kept.prices, cost))[:limit]]
+
+
+def ranked_round_trips(
+    out_dates: np.ndarray,
+    out_columns: RankingColumns,
+    in_dates: np.ndarray,
+    in_columns: RankingColumns,
+    options: RankingOptions,
+    limit: int,
+    trip_duration_days: Optional[int] = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    cheapest_round_trips for one route with both legs filtered and priced by sort cost
+    instead of fare. A Pareto front doesn't extend to pairs, so it ranks by fare here.
+    Returns (outbound positions, inbound positions, total costs), best first.
+    """
+    sort_by = "price" if options.sort_by == "pareto" else options.sort_by
+    out_keep = np.flatnonzero(filter_mask(out_columns, options))
+    in_keep = np.flatnonzero(filter_mask(in_columns, options))
+    out_pos, in_pos, totals = cheapest_round_trips(
+        out_dates[out_keep], sort_cost(out_columns.take(out_keep), sort_by),
+        in_dates[in_keep], sort_cost(in_columns.take(in_keep), sort_by),
+        limit, trip_duration_days, out_columns.ids[out_keep],
+    )
+    return out_keep[out_pos], in_keep[in_pos], totals
@@ -0,0 +1,77 @@
+# round_trip.py
+
+from typing import Optional
+
+import numpy as np
+
+
+def cheapest_round_trips(
+    out_dates: np.ndarray,
+    out_prices: np.ndarray,
+    in_dates: np.ndarray,
+    in_prices: np.ndarray,
+    limit: int,
+    trip_duration_days: Optional[int] = None,
+    out_ids: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Jointly picks the cheapest (outbound, inbound) itineraries for one route.
+
+    Dates are integer day numbers (e.g. date.toordinal()). For every outbound flight
+    the cheapest compatible return is found in a single vectorized pass:
+    - trip_duration_days set: the return must depart exactly that many days later,
+      resolved through a per-date minimum of the return prices.
+    - otherwise: any return strictly after the outbound date, resolved through a
+      suffix minimum over the date-sorted return prices.
+
+    Returns (outbound positions, inbound positions, total prices) for the `limit`
+    cheapest pairs, ordered by (total price, outbound date, outbound id) with ids
+    defaulting to positions. Positions index into the input arrays. Legs sorted by
+    (date, price, id), as in the FlightIndex, resolve equal returns to the lowest id.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if limit <= 0 or len(out_dates) == 0 or len(in_dates) == 0:
+        return empty, empty, empty
+
+    out_dates = np.asarray(out_dates, dtype=np.int64)
+    out_prices = np.asarray(out_prices, dtype=np.int64)
+    in_dates = np.asarray(in_dates, dtype=np.int64)
+    in_prices = np.asarray(in_prices, dtype=np.int64)
+
+    # Return flights ordered by date, cheapest first within a date
+    order = np.lexsort((in_prices, in_dates))
+    sorted_dates = in_dates[order]
+    sorted_prices = in_prices[order]
+
+    if trip_duration_days is not None:
+        # The first row of every date group is that date's cheapest return
+        day_values, day_starts = np.unique(sorted_dates, return_index=True)
+        targets = out_dates + trip_duration_days
+        slot = np.minimum(np.searchsorted(day_values, targets), len(day_values) - 1)
+        valid = day_values[slot] == targets
+        best = order[day_starts[slot]]
+    else:
+        # Suffix minimum over (price, position) keys: the cheapest return on or after
+        # each position, ties resolved towards the earliest date
+        positions = np.arange(len(sorted_prices), dtype=np.int64)
+        keys = sorted_prices * len(sorted_prices) + positions
+        suffix_min = np.minimum.accumulate(keys[::-1])[::-1]
+        first_after = np.searchsorted(sorted_dates, out_dates, side="right")
+        valid = first_after < len(sorted_dates)
+        slot = suffix_min[np.minimum(first_after, len(sorted_dates) - 1)] % len(sorted_prices)
+        best = order[slot]
+
+    out_pos = np.flatnonzero(valid)
+    if len(out_pos) == 0:
+        return empty, empty, empty
+    in_pos = best[out_pos]
+    totals = out_prices[out_pos] + in_prices[in_pos]
+
+    if limit < len(totals):
+        # Everything tied with the limit-th total stays in, so the tie-breakers decide among them
+        cutoff = totals[np.argpartition(totals, limit - 1)[limit - 1]]
+        keep = np.flatnonzero(totals <= cutoff)
+        out_pos, in_pos, totals = out_pos[keep], in_pos[keep], totals[keep]
+    tie_ids = out_pos if out_ids is None else np.asarray(out_ids)[out_pos]
+    ranked = np.lexsort((tie_ids, out_dates[out_pos], totals))[:limit]
+    return out_pos[ranked], in_pos[ranked], totals[ranked]
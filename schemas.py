@@ -4,9 +4,21 @@ from pydantic import BaseModel, Field
 from datetime import date
 from typing import Literal, Optional
 
-class TranscriptRequest(BaseModel):
+class ResultOptions(BaseModel):
+    layout: Literal["rows", "columnar"] = Field(
+        "rows", description="'columnar' returns one array per field instead of one object per flight."
+    )
+    include_links: bool = Field(True, description="Set to false to leave out the long booking URLs.")
+
+class TranscriptRequest(ResultOptions):
     text: str
 
+class NextPageRequest(ResultOptions):
+    cursor: str = Field(..., description="next_cursor from a previous /transcript or /transcript/more response.")
+    page_size: Optional[int] = Field(
+        None, ge=1, le=100, description="Flights per page; defaults to the original search's limit_per_leg."
+    )
+
 class FlightBase(BaseModel):
     id: int
     uuid: str
@@ -17,11 +29,29 @@ class FlightBase(BaseModel):
     duration: str
     flight_type: str
     price_inr: int
-    link: str
+    link: Optional[str] = None  # left out when the request sets include_links=false
 
     class Config:
         from_attributes = True
 
+class FlightColumns(BaseModel):
+    """Compact result layout: one array per field, where position i in every array is flight i."""
+    id: list[int]
+    uuid: list[str]
+    date: list[date]
+    origin: list[str]
+    destination: list[str]
+    airline: list[str]
+    duration: list[str]
+    flight_type: list[str]
+    price_inr: list[int]
+    link: Optional[list[str]] = None
+
+# Options per leg when a query doesn't ask for a number, and for "cheapest" queries. The
+# LLM prompt (llm_logic.py) and the rule-based parser (fast_intent.py) both use these.
+DEFAULT_LIMIT_PER_LEG = 3
+CHEAPEST_LIMIT_PER_LEG = 1
+
 # --- This is the correct and only location for this class ---
 class FlightSearchParameters(BaseModel):
     """
@@ -29,8 +59,9 @@ class FlightSearchParameters(BaseModel):
     """
     # Make essential fields optional so the LLM can ask for clarification
     trip_type: Optional[Literal["one_way", "round_trip"]] = Field(None)
-    origin: Optional[str] = Field(None)
-    destination: Optional[str] = Field(None)
+    # A city, a country (every city in it), or "anywhere"
+    origin: Optional[str] = Field(None, description="Departure city, country, or 'anywhere'.")
+    destination: Optional[str] = Field(None, description="Arrival city, country, or 'anywhere'.")
     
     # Optional fields for more detailed queries
     departure_date_start: Optional[str] = Field(None)
@@ -38,13 +69,73 @@ class FlightSearchParameters(BaseModel):
     trip_duration_days: Optional[int] = Field(None)
     limit_per_leg: int = Field(1, description="Defaults to 1 for 'cheapest'.")
 
+    # Flexible dates (see flexible_dates.py): results are the best option per departure day
+    flexible_days: Optional[int] = Field(
+        None, description="Days either side of the requested dates a departure may be, e.g. 3 for '±3 days'."
+    )
+    departure_days: Optional[Literal["weekday", "weekend"]] = Field(
+        None, description="Only depart on a weekday or on a weekend."
+    )
+    min_trip_days: Optional[int] = Field(None, description="Shortest stay for a round trip, e.g. 5 for '5 to 8 days'.")
+    max_trip_days: Optional[int] = Field(None, description="Longest stay for a round trip, e.g. 8 for '5 to 8 days'.")
+
+    # Filters and sort order (see ranking.py); unset means every flight, cheapest first
+    nonstop_only: Optional[bool] = Field(None, description="Only nonstop flights.")
+    free_meal_only: Optional[bool] = Field(None, description="Only flights with a free meal.")
+    max_rain_probability: Optional[float] = Field(None, description="Highest acceptable rain probability, in percent.")
+    max_price: Optional[int] = Field(None, description="Highest fare per flight in INR, e.g. 20000 for 'under ₹20,000'.")
+    sort_by: Optional[Literal["price", "price_with_luggage", "duration", "score", "pareto"]] = Field(
+        None,
+        description="'price_with_luggage' for the cheapest with a checked bag, 'duration' for the fastest, "
+        "'score' for the best value, 'pareto' for the fare vs flight time trade-offs; default 'price'.",
+    )
+
     # Field for the LLM to ask for more info
     clarification_needed: Optional[str] = Field(
         None, description="If essential information is missing, provide a question for the user here."
     )
 
+    def has_ranking(self) -> bool:
+        return (
+            bool(self.nonstop_only or self.free_meal_only)
+            or self.max_rain_probability is not None
+            or self.max_price is not None
+            or self.sort_by not in (None, "price")
+        )
+
+    def has_flexible_dates(self) -> bool:
+        return bool(self.flexible_days or self.departure_days) or self.min_trip_days is not None or self.max_trip_days is not None
+
 class ApiResponse(BaseModel):
     status: str
     query_type: str
     sql_query: str | None = None
-    data: list[FlightBase] | str | FlightSearchParameters
\ No newline at end of file
+    data: list[FlightBase] | FlightColumns | str | FlightSearchParameters
+    # Pass to /transcript/more for the next page of the same search
+    next_cursor: str | None = None
+    # Round trips only: each itinerary as (outbound position, inbound position) in `data`
+    round_trips: list[tuple[int, int]] | None = None
+
+class FareCalendarEntry(BaseModel):
+    origin: str
+    destination: str
+    period: str  # "YYYY-MM-DD" for days, "YYYY-MM" for months
+    min_price: int
+    median_price: float
+    flight_count: int
+    cheapest_date: Optional[date] = None
+
+class FareCalendarResponse(BaseModel):
+    origin: str
+    destination: str
+    granularity: Literal["day", "month"]
+    entries: list[FareCalendarEntry]
+
+class BatchTranscriptRequest(BaseModel):
+    items: list[TranscriptRequest]
+    max_concurrency: Optional[int] = Field(
+        None, ge=1, description="Maximum LLM extractions run at once; defaults to, and is capped at, BATCH_LLM_CONCURRENCY."
+    )
+
+class BatchTranscriptResponse(BaseModel):
+    results: list[ApiResponse]
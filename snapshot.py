@@ -0,0 +1,183 @@
+# snapshot.py
+"""
+Builds versioned, pre-indexed flight databases offline. A worker started with
+FLIGHT_DB_SNAPSHOT=<path> opens the snapshot read-only instead of creating tables
+and ingesting flight-price.json at boot. Next to each snapshot sits its FlightIndex
+in the memory-mapped format (flight-<version>.idx), which every worker maps instead
+of building its own copy.
+
+    python snapshot.py build flight-price.json --output-dir snapshots
+    python snapshot.py info snapshots/flight-v4-3f2a9c1b7d4e.db
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import models
+from flight_index import FlightIndex
+from ingest import BATCH_SIZE, ingest_json
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process builds its own copy, as before
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever models.py changes in a way older snapshots can't serve
+SCHEMA_VERSION = 4
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_version(source_sha256: str) -> str:
+    """Same schema and same source file always give the same version (and file name)."""
+    return f"v{SCHEMA_VERSION}-{source_sha256[:12]}"
+
+
+def index_path(snapshot_path: str) -> str:
+    """Path of the mapped FlightIndex that goes with a snapshot."""
+    return os.path.splitext(snapshot_path)[0] + ".idx"
+
+
+def write_index(db_path: str, output_path: str, version: str) -> int:
+    """Builds the FlightIndex of the database at `db_path` and saves it for mapping. Returns its row count."""
+    engine = create_engine(f"sqlite:///{db_path}")
+    try:
+        with Session(engine) as db:
+            index = FlightIndex.build(db)
+    finally:
+        engine.dispose()
+    index.save(output_path, version)
+    logger.info("Wrote flight index %s with %d rows to %s.", version, len(index), output_path)
+    return len(index)
+
+
+@contextmanager
+def build_lock(path: str):
+    """
+    Exclusive lock on `<path>.lock`, held while one process builds the snapshot at `path`.
+    Workers refreshing from the same file at once queue here, and all but the first find
+    the snapshot already built. The lock file is left in place for the next build.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def build_snapshot(json_path: str, output_dir: str = "snapshots", batch_size: int = BATCH_SIZE) -> str:
+    """
+    Ingests `json_path` into a fresh database with every index and the fare calendar,
+    runs ANALYZE, compacts it and moves it into place atomically, after its mapped
+    FlightIndex. Returns its path. An existing snapshot of the same version is reused
+    as is, gaining an index file if it doesn't have one yet. Concurrent calls for the
+    same version build it once (see build_lock); the others wait and then reuse it.
+    """
+    source_sha256 = file_sha256(json_path)
+    version = snapshot_version(source_sha256)
+    path = os.path.join(output_dir, f"flight-{version}.db")
+    if os.path.exists(path) and os.path.exists(index_path(path)):
+        logger.info("Snapshot %s already exists at %s.", version, path)
+        return path
+
+    os.makedirs(output_dir, exist_ok=True)
+    with build_lock(path):
+        if os.path.exists(path):
+            logger.info("Snapshot %s already exists at %s.", version, path)
+            if not os.path.exists(index_path(path)):
+                write_index(path, index_path(path), version)
+            return path
+        return _build(json_path, path, version, source_sha256, batch_size)
+
+
+def _build(json_path: str, path: str, version: str, source_sha256: str, batch_size: int) -> str:
+    """Builds the snapshot at `path` from scratch. Callers hold its build_lock."""
+    # Per process, so a build without the lock (no fcntl) can't collide with another
+    building = f"{path}.{os.getpid()}.building"
+    for leftover in (building, building + "-wal", building + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+    engine = create_engine(f"sqlite:///{building}")
+    models.Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        count = ingest_json(db, json_path, batch_size)
+        db.add(models.SnapshotInfo(
+            version=version,
+            schema_version=SCHEMA_VERSION,
+            source_path=os.path.abspath(json_path),
+            source_sha256=source_sha256,
+            flight_count=count,
+            built_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        ))
+        db.commit()
+
+    # Planner statistics, then fold the WAL back into a single self-contained file:
+    # immutable read-only opens ignore any -wal file next to the database
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("ANALYZE")
+        conn.exec_driver_sql("PRAGMA journal_mode=DELETE")
+        conn.exec_driver_sql("VACUUM")
+    engine.dispose()
+
+    # The index goes into place first, so a worker that sees the snapshot can map it
+    write_index(building, index_path(path), version)
+    os.replace(building, path)
+    logger.info("Built snapshot %s with %d flights at %s.", version, count, path)
+    return path
+
+
+def read_snapshot_info(db: Session):
+    """The snapshot's SnapshotInfo row, or None for a regular (non-snapshot) database."""
+    return db.scalars(select(models.SnapshotInfo)).first()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect prebuilt flight database snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Build a snapshot from a flight JSON file.")
+    build.add_argument("json_path", nargs="?", default="flight-price.json")
+    build.add_argument("--output-dir", default="snapshots")
+    build.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    info = commands.add_parser("info", help="Show a snapshot's version and contents.")
+    info.add_argument("path")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "build":
+        snapshot_path = build_snapshot(args.json_path, args.output_dir, args.batch_size)
+        print(f"Serve it with FLIGHT_DB_SNAPSHOT={snapshot_path}")
+    else:
+        engine = create_engine(f"sqlite:///file:{os.path.abspath(args.path)}?mode=ro&uri=true")
+        with Session(engine) as db:
+            row = read_snapshot_info(db)
+        if row is None:
+            print(f"{args.path} is not a snapshot.")
+        else:
+            for column in models.SnapshotInfo.__table__.columns:
+                print(f"{column.name}: {getattr(row, column.name)}")
+            mapped = index_path(args.path)
+            if os.path.exists(mapped):
+                index = FlightIndex.open_mapped(mapped)
+                print(f"index: {mapped} ({index.version}, {len(index)} rows, {os.path.getsize(mapped)} bytes)")
+            else:
+                print("index: none (workers build it in memory)")
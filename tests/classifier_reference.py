@@ -0,0 +1,30 @@
+# tests/classifier_reference.py
+"""
+Reference oracle for query_classifier, shared by tests/test_query_classifier.py and the
+classifier benchmark (benchmarks/micro.py).
+"""
+
+from query_classifier import FLIGHT_KEYWORDS, LOCATION_INDICATORS, PRICE_SYMBOLS, TIME_KEYWORDS, get_fuzzy_matches
+
+
+def reference_is_flight_related_query(query: str) -> bool:
+    """The classifier as originally written, scoring every keyword with get_fuzzy_matches."""
+    query = query.lower().strip()
+    query_words = query.split()
+    for word in query_words:
+        clean_word = ''.join(char for char in word if char.isalnum())
+        if clean_word in LOCATION_INDICATORS:
+            return True
+        if get_fuzzy_matches(clean_word, FLIGHT_KEYWORDS):
+            return True
+    if any(char in query for char in PRICE_SYMBOLS):
+        for word in query_words:
+            clean_word = ''.join(char for char in word if char.isalnum())
+            if (clean_word in LOCATION_INDICATORS or
+                get_fuzzy_matches(clean_word, FLIGHT_KEYWORDS | TIME_KEYWORDS, threshold=0.8)):
+                return True
+    if 'to' in query_words:
+        to_index = query_words.index('to')
+        if to_index > 0 and to_index < len(query_words) - 1:
+            return True
+    return False
@@ -0,0 +1,14 @@
+# tests/conftest.py
+"""
+Shared setup for the test suite. Run from the repository root with `python -m pytest`.
+"""
+
+import os
+import sys
+
+# The modules are imported flat (import crud, import main), as the app runs them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Spans stay local; database.py configures logfire at import
+os.environ.setdefault("LOGFIRE_SEND_TO_LOGFIRE", "false")
+os.environ.setdefault("LOGFIRE_CONSOLE", "false")
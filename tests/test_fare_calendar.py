@@ -0,0 +1,78 @@
+# tests/test_fare_calendar.py
+
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import crud
+import models
+from locations import LocationCatalog
+
+CALENDAR = [
+    ("New Delhi", "Hanoi", date(2025, 3, 1), 9000),
+    ("New Delhi", "Hanoi", date(2025, 3, 2), 7000),
+    ("New Delhi", "Da Nang", date(2025, 3, 1), 6000),
+    ("Mumbai", "Hanoi", date(2025, 3, 1), 5000),
+]
+
+
+@pytest.fixture(scope="module")
+def calendar_db(tmp_path_factory):
+    path = tmp_path_factory.mktemp("calendar") / "flights.db"
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.FareCalendarDay), [
+            {"origin": o, "destination": d, "date": day, "min_price": price, "median_price": price, "flight_count": 1}
+            for o, d, day, price in CALENDAR
+        ])
+    engine.dispose()
+    previous = crud.location_catalog
+    crud.set_location_catalog(LocationCatalog([
+        ("New Delhi", "India"), ("Mumbai", "India"), ("Hanoi", "Vietnam"), ("Da Nang", "Vietnam")
+    ]))
+    yield path
+    crud.set_location_catalog(previous)
+
+
+def query(path, search):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with AsyncSession(engine) as db:
+            result = await search(db)
+        await engine.dispose()
+        return result
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("origin, destination, expected", [
+    ("New Delhi", "Hanoi", [("New Delhi", "Hanoi", date(2025, 3, 1)), ("New Delhi", "Hanoi", date(2025, 3, 2))]),
+    ("delhi", "HANOI", [("New Delhi", "Hanoi", date(2025, 3, 1)), ("New Delhi", "Hanoi", date(2025, 3, 2))]),
+    ("Delhi", "Vietnam", [
+        ("New Delhi", "Da Nang", date(2025, 3, 1)),
+        ("New Delhi", "Hanoi", date(2025, 3, 1)),
+        ("New Delhi", "Hanoi", date(2025, 3, 2)),
+    ]),
+    ("anywhere", "hanoi", [
+        ("Mumbai", "Hanoi", date(2025, 3, 1)),
+        ("New Delhi", "Hanoi", date(2025, 3, 1)),
+        ("New Delhi", "Hanoi", date(2025, 3, 2)),
+    ]),
+])
+def test_calendar_resolves_places_like_search(calendar_db, origin, destination, expected):
+    rows = query(calendar_db, lambda db: crud.aget_fare_calendar(db, origin, destination))
+    assert [(r.origin, r.destination, r.date) for r in rows] == expected
+
+
+@pytest.mark.parametrize("origin, destination, start, end, expected", [
+    ("delhi", "hanoi", None, None, 7000),
+    ("delhi", "hanoi", date(2025, 3, 1), date(2025, 3, 1), 9000),
+    ("Delhi", "Vietnam", None, None, 6000),
+    ("India", "Hanoi", date(2025, 3, 2), date(2025, 3, 5), 7000),
+    ("India", "Hanoi", date(2025, 4, 1), date(2025, 4, 5), None),
+])
+def test_cheapest_fare_resolves_places_like_search(calendar_db, origin, destination, start, end, expected):
+    assert query(calendar_db, lambda db: crud.aget_cheapest_fare(db, origin, destination, start, end)) == expected
@@ -0,0 +1,33 @@
+# tests/test_fast_intent.py
+
+from datetime import date
+
+import pytest
+
+import llm_logic
+from fast_intent import FastIntentParser
+from schemas import CHEAPEST_LIMIT_PER_LEG, DEFAULT_LIMIT_PER_LEG
+
+TODAY = date(2026, 3, 1)
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return FastIntentParser(["New Delhi", "Hanoi", "Mumbai"], ["India", "Vietnam"])
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("one way flight from delhi to hanoi on 5 april", DEFAULT_LIMIT_PER_LEG),
+    ("one way flight options from delhi to hanoi on 5 april", DEFAULT_LIMIT_PER_LEG),
+    ("cheapest one way flight from delhi to hanoi on 5 april", CHEAPEST_LIMIT_PER_LEG),
+    ("one way from delhi to hanoi on 5 april, top 5 options", 5),
+])
+def test_fast_path_limit_matches_the_prompt_rules(parser, query, expected):
+    params, _ = parser.parse(query, TODAY)
+    assert params.limit_per_leg == expected
+
+
+def test_prompt_states_the_same_defaults():
+    text = llm_logic.compile_prompt(TODAY).text
+    assert f"default {DEFAULT_LIMIT_PER_LEG}" in text
+    assert f"'lowest price' → {CHEAPEST_LIMIT_PER_LEG}" in text
@@ -0,0 +1,31 @@
+# tests/test_flight_index.py
+
+from datetime import date
+
+from flight_index import FlightIndex
+
+ROWS = [
+    # id, uuid, date, origin, destination, airline, duration, flight_type, price, link, countries
+    (1, "a", date(2025, 3, 1), "New Delhi", "Hanoi", "IndiGo", "5 hr", "Nonstop", 9000, None, "India", "Vietnam"),
+    (2, "b", date(2025, 3, 2), "New Delhi", "Da Nang", "IndiGo", "6 hr", "1 stop", 8000, None, "India", "Vietnam"),
+    (3, "c", date(2025, 3, 3), "Mumbai", "Hanoi", "VietJet", "6 hr", "1 stop", 7000, None, "India", "Vietnam"),
+    (4, "d", date(2025, 3, 9), "Hanoi", "New Delhi", "VietJet", "5 hr", "Nonstop", 9500, None, "Vietnam", "India"),
+]
+
+
+def test_matching_routes_resolves_countries_aliases_and_wildcards():
+    index = FlightIndex(ROWS)
+    assert index.matching_routes("New Delhi", "Hanoi") == [("New Delhi", "Hanoi")]
+    assert sorted(index.matching_routes("delhi", "Vietnam")) == [("New Delhi", "Da Nang"), ("New Delhi", "Hanoi")]
+    assert sorted(index.matching_routes("India", "hanoi")) == [("Mumbai", "Hanoi"), ("New Delhi", "Hanoi")]
+    assert index.matching_routes("anywhere", "India") == [("Hanoi", "New Delhi")]
+    assert index.matching_routes("Atlantis", "Hanoi") == []
+
+
+def test_matching_routes_cache_is_bounded_by_the_catalog():
+    index = FlightIndex(ROWS)
+    for i in range(1000):
+        assert index.matching_routes(f"nowhere {i}", "Vietnam") == []
+    for spelling in ("delhi", "New Delhi", "NEW DELHI", "new delhi "):
+        index.matching_routes(spelling, "vietnam")
+    assert len(index._matching_routes) == 1
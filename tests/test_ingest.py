@@ -0,0 +1,48 @@
+# tests/test_ingest.py
+
+import json
+
+import pytest
+
+from ingest import iter_json_records
+
+RECORDS = [{"uuid": f"flight-{i}", "origin": "New Delhi", "note": "a } and a ] in a string"} for i in range(40)]
+
+
+def write(tmp_path, text):
+    path = tmp_path / "flights.json"
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 20])
+def test_records_straddling_chunks_are_decoded(tmp_path, chunk_size):
+    path = write(tmp_path, json.dumps(RECORDS, indent=2))
+    assert list(iter_json_records(path, chunk_size)) == RECORDS
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 20])
+def test_malformed_records_are_skipped(tmp_path, chunk_size, caplog):
+    good = [json.dumps(record) for record in RECORDS[:3]]
+    text = "[" + ", ".join([
+        good[0], '{"uuid": "bad", "price": 12 34}', good[1], '{"uuid": "also bad",, "x": [1]}', good[2],
+    ]) + "]"
+    path = write(tmp_path, text)
+    assert list(iter_json_records(path, chunk_size)) == RECORDS[:3]
+    assert caplog.text.count("Skipping malformed record") == 2
+
+
+def test_record_that_never_closes_raises(tmp_path):
+    # An unclosed list swallows the rest of the file
+    text = "[" + json.dumps(RECORDS[0]) + ', {"uuid": "bad", "stops": [' + ", ".join(json.dumps(r) for r in RECORDS) + "]"
+    path = write(tmp_path, text)
+    records = iter_json_records(path, chunk_size=16, max_record_chars=256)
+    assert next(records) == RECORDS[0]
+    with pytest.raises(ValueError, match="still open"):
+        next(records)
+
+
+def test_truncated_file_raises(tmp_path):
+    path = write(tmp_path, json.dumps(RECORDS)[:-40])
+    with pytest.raises(ValueError):
+        list(iter_json_records(path, chunk_size=64))
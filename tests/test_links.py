@@ -0,0 +1,92 @@
+# tests/test_links.py
+
+import base64
+import random
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import links
+import models
+from links import HEADERS, LINK_TEMPLATE, LinkCodec
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def urls(count: int, seed: int = 1) -> list[str]:
+    """Links in the scraped template, with random session values."""
+    rng = random.Random(seed)
+
+    def b64(size):
+        return base64.urlsafe_b64encode(rng.randbytes(size)).decode().rstrip("=")
+
+    return [
+        LINK_TEMPLATE.format("%016x" % rng.getrandbits(64), b64(24), rng.randrange(10**12, 10**13), b64(150))
+        for _ in range(count)
+    ]
+
+
+def test_pack_round_trips_without_a_dictionary():
+    codec = LinkCodec()
+    for url in urls(50):
+        packed = codec.pack(url)
+        assert isinstance(packed, bytes) and len(packed) < len(url)
+        assert codec.unpack(packed) == url
+
+
+def test_pack_round_trips_with_a_trained_dictionary(db):
+    codec = LinkCodec()
+    sample = urls(200)
+    dictionary_id = codec.train(db, sample)
+    assert dictionary_id == links.dictionary_id(codec.dictionaries[dictionary_id])
+    assert LinkCodec.load(db).dictionaries == codec.dictionaries
+    for url in sample:
+        assert codec.unpack(codec.pack(url)) == url
+
+
+@pytest.mark.parametrize("value", [
+    None,
+    "https://example.com/flights?id=1",
+    urls(1)[0].replace("ictx=111", "ictx=112"),
+])
+def test_non_template_links_are_kept_as_is(value):
+    codec = LinkCodec()
+    assert codec.pack(value) == value
+    assert codec.unpack(value) == value
+
+
+def test_union_expands_links_from_either_snapshot(db):
+    old, new = LinkCodec(), LinkCodec()
+    old.train(db, urls(100, seed=1))
+    new.train(db, urls(100, seed=2))
+    url = urls(1, seed=3)[0]
+    old_link, new_link = old.pack(url), new.pack(url)
+
+    merged = LinkCodec.union((old, new))
+    assert merged.current == new.current
+    assert merged.unpack(old_link) == merged.unpack(new_link) == url
+    # A codec that doesn't hold the dictionary refuses rather than decoding garbage
+    with pytest.raises(KeyError):
+        new.unpack(old_link)
+
+
+def test_version_1_links_are_still_read():
+    codec = LinkCodec()
+    url = urls(1)[0]
+    packed = codec.pack(url)
+    _, _, sca_esv, timestamp, token_length = HEADERS[2].unpack_from(packed)
+    legacy = HEADERS[1].pack(1, 0, sca_esv, timestamp, token_length) + packed[HEADERS[2].size:]
+    assert codec.unpack(legacy) == url
+
+
+def test_unknown_format_is_an_error():
+    with pytest.raises(ValueError):
+        LinkCodec().unpack(b"\x09" + bytes(20))
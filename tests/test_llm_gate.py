@@ -0,0 +1,143 @@
+# tests/test_llm_gate.py
+
+import asyncio
+
+import pytest
+
+from llm_gate import LLMBusyError, LLMGate, LLMTimeoutError
+
+
+def test_same_key_shares_one_inference():
+    async def scenario():
+        gate = LLMGate(max_concurrency=2, max_queue=4)
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "intent"
+
+        results = await asyncio.gather(*(gate.run("same query", call) for _ in range(5)))
+        return gate, calls, results
+
+    gate, calls, results = asyncio.run(scenario())
+    assert results == ["intent"] * 5
+    assert calls == 1
+    assert gate.stats()["coalesced"] == 4
+    assert gate.depth == 0
+
+
+def test_concurrency_is_capped():
+    async def scenario():
+        gate = LLMGate(max_concurrency=2, max_queue=10)
+        running = peak = 0
+
+        async def call():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(gate.run(f"query {i}", call) for i in range(8)))
+        return peak
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_full_queue_rejects_immediately():
+    async def scenario():
+        gate = LLMGate(max_concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return "done"
+
+        admitted = [asyncio.ensure_future(gate.run(f"query {i}", call)) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(LLMBusyError):
+            await gate.run("one too many", call)
+        release.set()
+        return gate, await asyncio.gather(*admitted)
+
+    gate, results = asyncio.run(scenario())
+    assert results == ["done", "done"]
+    assert gate.stats()["rejected"] == 1
+    assert gate.depth == 0
+
+
+def test_slow_inference_times_out_and_frees_its_slot():
+    async def scenario():
+        gate = LLMGate(max_concurrency=1, max_queue=0, timeout_seconds=0.01)
+
+        async def slow():
+            await asyncio.sleep(1)
+
+        async def fast():
+            return "ok"
+
+        with pytest.raises(LLMTimeoutError):
+            await gate.run("slow", slow)
+        return gate, await gate.run("fast", fast)
+
+    gate, result = asyncio.run(scenario())
+    assert result == "ok"
+    assert gate.stats()["timeouts"] == 1
+    assert gate.depth == 0
+
+
+def test_queue_wait_counts_against_the_timeout():
+    async def scenario():
+        gate = LLMGate(max_concurrency=1, max_queue=4, timeout_seconds=0.05)
+        release = asyncio.Event()
+
+        async def blocking():
+            # A model call that keeps its slot for a while after being abandoned
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                await release.wait()
+                raise
+
+        async def fast():
+            return "ok"
+
+        # Each queued call would finish well inside the timeout once it got the slot, but
+        # none gets it in time; together they wait about one timeout, not one per call
+        blocked = asyncio.ensure_future(gate.run("blocking", blocking))
+        await asyncio.sleep(0)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        # Outer bound so an unbounded queue wait fails the test instead of hanging it
+        queued = await asyncio.wait_for(
+            asyncio.gather(*(gate.run(f"queued {i}", fast) for i in range(4)), return_exceptions=True), 1
+        )
+        elapsed = loop.time() - started
+        release.set()
+        with pytest.raises(LLMTimeoutError):
+            await blocked
+        return gate, queued, elapsed
+
+    gate, queued, elapsed = asyncio.run(scenario())
+    assert all(isinstance(result, LLMTimeoutError) for result in queued)
+    assert "slot" in str(queued[0])
+    assert elapsed < 0.15
+    assert gate.stats()["timeouts"] == 5
+    assert gate.depth == 0
+
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        gate = LLMGate()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("model crashed")
+
+        return gate, await asyncio.gather(*(gate.run("key", failing) for _ in range(3)), return_exceptions=True)
+
+    gate, results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert gate.depth == 0
@@ -0,0 +1,36 @@
+# tests/test_llm_logic.py
+
+from datetime import date
+
+import llm_logic
+from llm_logic import PROMPT_SECTIONS, compile_prompt, count_tokens, schema_text
+
+TODAY = date(2026, 3, 1)
+
+
+def test_full_prompt_fits_the_default_budget():
+    prompt = compile_prompt(TODAY)
+    assert prompt.dropped == ()
+    assert prompt.tokens <= llm_logic.PROMPT_TOKEN_BUDGET
+
+
+def test_budget_counts_the_schema():
+    prompt = compile_prompt(TODAY)
+    assert prompt.tokens == count_tokens(prompt.text) + count_tokens(schema_text())
+
+
+def test_optional_sections_are_dropped_least_important_first():
+    full = compile_prompt(TODAY)
+    optional = sorted((s for s in PROMPT_SECTIONS if s.priority), key=lambda s: -s.priority)
+    assert [s.title for s in optional][:3] == ["clarification example", "checks", "filters and sort_by (leave null unless asked for)"]
+
+    prompt = compile_prompt(TODAY, budget=full.tokens - 1)
+    assert prompt.dropped == (optional[0].title,)
+    assert prompt.tokens <= full.tokens - 1
+
+    smallest = compile_prompt(TODAY, budget=0)
+    assert smallest.dropped == tuple(s.title for s in optional)
+    for section in PROMPT_SECTIONS:
+        if not section.priority:
+            assert all(rule in smallest.text for rule in section.rules)
+    assert smallest.text.endswith(llm_logic.date_rules(TODAY))
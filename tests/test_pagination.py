@@ -0,0 +1,70 @@
+# tests/test_pagination.py
+
+import base64
+from datetime import date
+
+import orjson
+import pytest
+
+import pagination
+import schemas
+from flight_index import FlightRow
+from pagination import MAX_PAGE_SIZE, InvalidCursorError, decode_cursor, encode_cursor, next_cursor, page_size
+
+
+def params(**overrides) -> schemas.FlightSearchParameters:
+    fields = {"trip_type": "one_way", "origin": "New Delhi", "destination": "Hanoi", "limit_per_leg": 2}
+    return schemas.FlightSearchParameters(**{**fields, **overrides})
+
+
+def flight(flight_id: int, price: int) -> FlightRow:
+    return FlightRow(
+        flight_id, f"uuid-{flight_id}", date(2025, 3, 1), "New Delhi", "Hanoi", "IndiGo",
+        "5 hr", "Nonstop", price, None,
+    )
+
+
+def test_cursor_round_trip():
+    search = params(departure_date_start="2025-03-01", departure_date_end="2025-03-31")
+    decoded, after = decode_cursor(encode_cursor(search, (9000, 42)))
+    assert decoded == search
+    assert after == (9000, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "e30", base64.urlsafe_b64encode(b"[1, 2]").decode()])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_other_version_is_rejected():
+    payload = {"v": pagination.CURSOR_VERSION + 1, "params": params().model_dump(), "after": [1, 2]}
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(base64.urlsafe_b64encode(orjson.dumps(payload)).decode())
+
+
+def test_next_cursor_resumes_after_the_last_flight():
+    cursor = next_cursor(params(), [flight(7, 5000), flight(3, 6000)], [], 2)
+    assert decode_cursor(cursor)[1] == (6000, 3)
+
+
+@pytest.mark.parametrize("search, outbound, inbound", [
+    (params(), [flight(7, 5000)], []),                                          # short page: nothing more
+    (params(), [], []),
+    (params(trip_type="round_trip"), [flight(7, 5000), flight(3, 6000)], [flight(9, 4000)]),
+    (params(flexible_days=3), [flight(7, 5000), flight(3, 6000)], []),
+    (params(sort_by="duration"), [flight(7, 5000), flight(3, 6000)], []),
+])
+def test_no_cursor_when_results_cannot_be_paged(search, outbound, inbound):
+    assert next_cursor(search, outbound, inbound, 2) is None
+
+
+@pytest.mark.parametrize("requested, limit_per_leg, expected", [
+    (None, 2, 2),
+    (10, 2, 10),
+    (None, 10**9, MAX_PAGE_SIZE),  # a hand-edited cursor can't ask for the whole table
+    (None, -5, 1),
+    (None, 0, 1),
+])
+def test_page_size_is_clamped(requested, limit_per_leg, expected):
+    assert page_size(requested, params(limit_per_leg=limit_per_leg)) == expected
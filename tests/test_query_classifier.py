@@ -0,0 +1,39 @@
+# tests/test_query_classifier.py
+
+import pytest
+
+import query_classifier
+from benchmarks.synthetic import add_typos, perturbed_words
+from query_classifier import FLIGHT_KEYWORDS, TIME_KEYWORDS, KeywordMatcher, get_fuzzy_matches
+from tests.classifier_reference import reference_is_flight_related_query
+
+KEYWORDS = FLIGHT_KEYWORDS | TIME_KEYWORDS
+
+
+@pytest.mark.parametrize("threshold", [0.75, 0.8])
+def test_keyword_matcher_matches_get_fuzzy_matches(threshold):
+    matcher = KeywordMatcher(KEYWORDS)
+    words = perturbed_words(KEYWORDS, 2000) + sorted(KEYWORDS) + ["", "a", "X", "FLIGHT", "non-stop"]
+    mismatches = [
+        word for word in words
+        if matcher.matches(word, threshold) != get_fuzzy_matches(word, KEYWORDS, threshold)
+    ]
+    assert mismatches == []
+
+
+def test_classifier_matches_reference():
+    queries = [
+        "cheapest flights from delhi to mumbai next week",
+        "fligth to hanoi",
+        "how much is a ticket ₹",
+        "what's the weather like",
+        "tell me a joke about cats",
+        "₹5000 tomorow",
+        "$ 300 for a burger",
+        "delhi to",
+        "paris to london",
+        "",
+    ]
+    queries += add_typos(queries * 20, rate=0.4)
+    for query in queries:
+        assert query_classifier.is_flight_related_query(query) == reference_is_flight_related_query(query), query
@@ -0,0 +1,17 @@
+# tests/test_query_plans.py
+
+from sqlalchemy import create_engine
+
+import crud
+from query_plans import build_synthetic_db, check_query_plans
+
+
+def test_every_query_uses_an_index_without_a_sort(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    previous_catalog = crud.location_catalog
+    try:
+        build_synthetic_db(engine, rows=20_000)
+        assert check_query_plans(engine) == {}
+    finally:
+        crud.set_location_catalog(previous_catalog)
+        engine.dispose()
@@ -0,0 +1,134 @@
+# tests/test_round_trip.py
+
+import asyncio
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+import crud
+import models
+from flexible_dates import FlexibleDates
+from flight_index import FlightIndex
+from locations import LocationCatalog
+from ranking import RankingOptions
+from round_trip import cheapest_round_trips
+
+CITIES = [("Delhi", "India"), ("Mumbai", "India"), ("Hanoi", "Vietnam"), ("Da Nang", "Vietnam"), ("Paris", "France")]
+
+
+def brute_force(out_dates, out_prices, in_dates, in_prices, limit, trip_duration_days):
+    """(total, outbound date, outbound position) of the best pair per outbound flight, best first."""
+    best = []
+    for o, (out_date, out_price) in enumerate(zip(out_dates, out_prices)):
+        returns = [
+            price for in_date, price in zip(in_dates, in_prices)
+            if (in_date == out_date + trip_duration_days if trip_duration_days is not None else in_date > out_date)
+        ]
+        if returns:
+            best.append((out_price + min(returns), out_date, o))
+    return sorted(best)[:limit]
+
+
+@pytest.mark.parametrize("trip_duration_days", [None, 0, 3])
+def test_cheapest_round_trips_matches_brute_force(trip_duration_days):
+    rng = np.random.default_rng(4)
+    for _ in range(300):
+        n_out, n_in = rng.integers(0, 30, 2)
+        # Few distinct dates and prices, so ties are everywhere
+        out_dates, in_dates = rng.integers(0, 10, n_out), rng.integers(0, 10, n_in)
+        out_prices, in_prices = rng.integers(1, 5, n_out) * 1000, rng.integers(1, 5, n_in) * 1000
+        limit = int(rng.integers(0, 12))
+        out_pos, in_pos, totals = cheapest_round_trips(
+            out_dates, out_prices, in_dates, in_prices, limit, trip_duration_days
+        )
+        expected = brute_force(out_dates, out_prices, in_dates, in_prices, limit, trip_duration_days)
+        assert list(zip(totals.tolist(), out_dates[out_pos].tolist(), out_pos.tolist())) == expected
+        assert (out_prices[out_pos] + in_prices[in_pos] == totals).all()
+        if trip_duration_days is None:
+            assert (in_dates[in_pos] > out_dates[out_pos]).all()
+        else:
+            assert (in_dates[in_pos] == out_dates[out_pos] + trip_duration_days).all()
+
+
+def test_ties_are_broken_by_outbound_id():
+    out_dates, out_prices = np.array([5, 5, 5]), np.array([1000, 1000, 1000])
+    in_dates, in_prices = np.array([6]), np.array([500])
+    out_pos, _, _ = cheapest_round_trips(out_dates, out_prices, in_dates, in_prices, 2, out_ids=np.array([30, 10, 20]))
+    assert out_pos.tolist() == [1, 2]
+
+
+@pytest.fixture(scope="module")
+def tied_db(tmp_path_factory):
+    """Flights over a few routes with coarse prices, so SQL and index results hinge on tie-breaks."""
+    path = tmp_path_factory.mktemp("tied") / "flights.db"
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(3)
+    rows = []
+    for i in range(3000):
+        (origin, origin_country), (destination, destination_country) = rng.sample(CITIES, 2)
+        rows.append(models.Flight(
+            uuid=f"tied-{i}", date=date(2025, 9, 1) + timedelta(days=rng.randrange(40)),
+            origin=origin, destination=destination, origin_country=origin_country,
+            destination_country=destination_country, airline="IndiGo", duration="2 hr", flight_type="Nonstop",
+            price_inr=rng.randrange(1000, 6000, 1000), duration_minutes=rng.choice([120, 180]),
+            stops=rng.choice([0, 1]), free_meal=True, rain_probability=10, total_with_min_luggage=5000,
+        ))
+    # Inserted out of id order relative to (date, price), as a real scrape would be
+    rng.shuffle(rows)
+    db = Session(engine)
+    db.add_all(rows)
+    db.commit()
+    previous_catalog, previous_index = crud.location_catalog, crud.flight_index
+    crud.set_location_catalog(LocationCatalog.build(db))
+    index = FlightIndex.build(db)
+    db.close()
+    engine.dispose()
+    yield path, index
+    crud.set_location_catalog(previous_catalog)
+    crud.set_flight_index(previous_index)
+
+
+def test_index_and_sql_round_trips_agree(tied_db):
+    path, index = tied_db
+    rng = random.Random(5)
+    places = [city for city, _ in CITIES] + ["India", "Vietnam", "anywhere"]
+
+    async def both(search):
+        crud.set_flight_index(None)
+        from_sql = await search()
+        crud.set_flight_index(index)
+        from_index = await search()
+        return [(o.id, i.id) for o, i in from_sql], [(o.id, i.id) for o, i in from_index]
+
+    async def compare():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with AsyncSession(engine) as db:
+            for _ in range(150):
+                origin, destination = rng.sample(places, 2)
+                limit, stay = rng.choice([1, 3, 10]), rng.choice([None, 3, 7])
+                start = date(2025, 9, 1) + timedelta(days=rng.randrange(30))
+                end = start + timedelta(days=rng.choice([0, 10]))
+                flex = FlexibleDates(start, end, rng.choice([None, (5, 6)]), rng.choice([None, (3, 8)]))
+                options = RankingOptions(
+                    nonstop_only=rng.random() < 0.3, sort_by=rng.choice(["price", "duration", "score"])
+                )
+
+                sql, indexed = await both(lambda: crud.aget_round_trip_flights(
+                    db, origin, destination, limit, start, end, stay
+                ))
+                assert sql == indexed
+                sql, indexed = await both(lambda: crud.aget_flexible_round_trips(db, origin, destination, limit, flex))
+                assert sql == indexed
+                sql, indexed = await both(lambda: crud.aget_ranked_round_trips(
+                    db, origin, destination, limit, options, start, end, stay
+                ))
+                assert sql == indexed
+        await engine.dispose()
+
+    asyncio.run(compare())
@@ -0,0 +1,47 @@
+# tests/test_snapshot.py
+
+import json
+import os
+import threading
+
+import pytest
+
+import snapshot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def small_json(tmp_path):
+    with open(os.path.join(ROOT, "flight-price.json")) as f:
+        records = json.load(f)[:50]
+    path = tmp_path / "flight-price.json"
+    path.write_text(json.dumps(records))
+    return str(path)
+
+
+@pytest.mark.skipif(snapshot.fcntl is None, reason="build_lock needs fcntl")
+def test_concurrent_builds_of_one_version_build_it_once(small_json, tmp_path, monkeypatch):
+    builds = []
+    build = snapshot._build
+
+    def counting_build(*args):
+        builds.append(args[1])
+        return build(*args)
+
+    monkeypatch.setattr(snapshot, "_build", counting_build)
+    output_dir = str(tmp_path / "snapshots")
+    paths = []
+    workers = [
+        threading.Thread(target=lambda: paths.append(snapshot.build_snapshot(small_json, output_dir)))
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(builds) == 1
+    assert paths == [builds[0]] * 4
+    assert os.path.exists(snapshot.index_path(builds[0]))
+    assert not [name for name in os.listdir(output_dir) if name.endswith(".building")]